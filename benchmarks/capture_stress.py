@@ -0,0 +1,171 @@
+"""Stress benchmark: in-process vs process-isolated capture under CPU load.
+
+A synthetic input device drives the real ``CaptureEngine`` callback on a
+fixed clock. Like PortAudio it buffers only ``--buffer-ms`` of audio, so
+a callback that runs late loses audio and reports an input overflow.
+Meanwhile load threads in the session process hold the GIL the way
+typing and Tk redraws do: Python work interleaved with long C calls that
+never release it. Each mode runs with the same load, and the overruns
+and dropped frames are compared.
+
+Usage:
+    python -m benchmarks.capture_stress
+    python -m benchmarks.capture_stress --seconds 20 --threads 4 --hold-ms 40
+"""
+import argparse
+import functools
+import logging
+import random
+import threading
+import time
+
+import numpy as np
+
+from transcription.capture import CaptureEngine
+from transcription.capture_process import IsolatedCapture
+
+DEVICE_RATE = 48000
+PA_INPUT_OVERFLOW = 0x2
+
+
+class SyntheticDevice:
+    """Stands in for a PortAudio input stream: a clocked thread calling the stream callback"""
+
+    def __init__(self, callback, rate, frame_samples, buffer_ms):
+        self.callback = callback
+        self.rate = rate
+        self.frame_samples = frame_samples
+        self.buffer = buffer_ms / 1000
+        self._running = False
+        self._thread = None
+
+    def start_stream(self):
+        self._running = True
+        self._thread = threading.Thread(target=self._run, name="SyntheticDevice", daemon=True)
+        self._thread.start()
+
+    def stop_stream(self):
+        self._running = False
+        if self._thread:
+            self._thread.join()
+
+    def close(self):
+        pass
+
+    def is_active(self):
+        return self._running
+
+    def _run(self):
+        period = self.frame_samples / self.rate
+        tone = (3000 * np.sin(2 * np.pi * 440 * np.arange(self.rate) / self.rate)).astype(np.int16)
+        position = 0
+        due = time.monotonic() + period
+        while self._running:
+            delay = due - time.monotonic()
+            if delay > 0:
+                time.sleep(delay)
+            status = 0
+            late = time.monotonic() - due
+            if late > self.buffer:
+                # The device buffer overflowed while the callback was held up
+                skipped = int(late / period)
+                due += skipped * period
+                position += skipped * self.frame_samples
+                status = PA_INPUT_OVERFLOW
+            start = position % (self.rate - self.frame_samples)
+            self.callback(tone[start:start + self.frame_samples].tobytes(), self.frame_samples, None, status)
+            position += self.frame_samples
+            due += period
+
+
+class SyntheticCaptureEngine(CaptureEngine):
+    """``CaptureEngine`` reading from a ``SyntheticDevice`` instead of PyAudio"""
+
+    def __init__(self, push_callback, buffer_ms=60, **kwargs):
+        super().__init__(push_callback, **kwargs)
+        self.buffer_ms = buffer_ms
+
+    def _open_device(self):
+        self.device_name = "synthetic device"
+        self.native_rate = DEVICE_RATE
+        self.channels = 1
+        self._frame_samples = self.native_rate * self.frame_ms // 1000
+        return SyntheticDevice(self._callback, self.native_rate, self._frame_samples, self.buffer_ms)
+
+
+def _gil_load(stop, hold_ms):
+    """Python work interleaved with sorts that hold the GIL for about ``hold_ms``"""
+    size = 1000
+    sample = [random.random() for _ in range(size)]
+    started = time.perf_counter()
+    sorted(sample)
+    size = int(size * hold_ms / 1000 / max(time.perf_counter() - started, 1e-6))
+    data = [random.random() for _ in range(size)]
+    while not stop.is_set():
+        total = 0
+        for i in range(20000):
+            total += i * i
+        sorted(data)
+
+
+def run_mode(isolated, seconds, threads, hold_ms, buffer_ms, frame_ms):
+    frames = []
+
+    def consume(data):
+        # Roughly what the VAD does per frame
+        samples = np.frombuffer(data, dtype=np.int16).astype(np.float32)
+        frames.append(float(np.sqrt(np.mean(samples ** 2))))
+
+    factory = functools.partial(SyntheticCaptureEngine, buffer_ms=buffer_ms)
+    if isolated:
+        source = IsolatedCapture(consume, frame_ms=frame_ms, engine_factory=factory)
+    else:
+        source = factory(consume, frame_ms=frame_ms)
+    if not source.start():
+        raise SystemExit("capture did not start")
+
+    stop = threading.Event()
+    load = [threading.Thread(target=_gil_load, args=(stop, hold_ms), daemon=True) for _ in range(threads)]
+    for thread in load:
+        thread.start()
+    time.sleep(seconds)
+    stop.set()
+    for thread in load:
+        thread.join()
+    source.finish()
+
+    return {
+        "mode": "isolated" if isolated else "in-process",
+        "expected": int(seconds * 1000 / frame_ms),
+        "delivered": len(frames),
+        "overruns": source.overruns,
+        "dropped": source.dropped_frames,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare in-process and isolated capture under GIL load")
+    parser.add_argument("--seconds", type=float, default=10, help="Capture time per mode")
+    parser.add_argument("--threads", type=int, default=2, help="Load threads in the session process")
+    parser.add_argument("--hold-ms", type=float, default=80, help="GIL hold per long call in the load threads")
+    parser.add_argument("--buffer-ms", type=float, default=60, help="Audio the synthetic device buffers")
+    parser.add_argument("--frame-ms", type=int, default=20, help="Capture frame size")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.WARNING)
+    results = [
+        run_mode(isolated, args.seconds, args.threads, args.hold_ms, args.buffer_ms, args.frame_ms)
+        for isolated in (False, True)
+    ]
+
+    print()
+    print(f"{'mode':<12} {'expected':>10} {'delivered':>10} {'overruns':>10} {'dropped':>10}")
+    for r in results:
+        print(
+            f"{r['mode']:<12} {r['expected']:>10} {r['delivered']:>10} "
+            f"{r['overruns']:>10} {r['dropped']:>10}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,158 @@
+"""Load test: how many concurrent sessions one daemon process sustains.
+
+Starts the fake Deepgram server (every connection plays the whole script)
+and a daemon subprocess, then runs 1, 2, 4, ... sessions at once, each
+streaming the same synthetic WAV in real time into its own file sink. A
+level is sustained when every session typed exactly the script and
+was saved within ``--max-lag`` seconds of its scheduled stop. Reports the
+daemon's CPU use and memory at each level and stops at the first level
+that is not sustained.
+
+Usage:
+    python -m benchmarks.daemon_load
+    python -m benchmarks.daemon_load --levels 1 4 16 32 --max-lag 2
+"""
+import argparse
+import os
+import subprocess
+import sys
+import tempfile
+import time
+import wave
+
+from benchmarks.replay_harness import DEFAULT_TEXT, write_synthetic_wav
+from transcription.fake_server import FakeDeepgramServer, build_script
+from config import DAEMON_FILE_DRAIN_SECONDS
+
+CLOCK_TICKS = os.sysconf("SC_CLK_TCK") if hasattr(os, "sysconf") else 100
+
+
+def process_usage(pid):
+    """CPU seconds used so far and resident memory in MB, from /proc"""
+    with open(f"/proc/{pid}/stat", "r") as f:
+        fields = f.read().rsplit(")", 1)[1].split()
+    cpu = (int(fields[11]) + int(fields[12])) / CLOCK_TICKS  # utime + stime
+    rss = 0.0
+    with open(f"/proc/{pid}/status", "r") as f:
+        for line in f:
+            if line.startswith("VmRSS:"):
+                rss = int(line.split()[1]) / 1024
+    return cpu, rss
+
+
+def run_level(client, pid, count, wav_path, audio_seconds, expected, work_dir, max_lag):
+    names = [f"load{count}_{i}" for i in range(count)]
+    outputs = {name: os.path.join(work_dir, f"{name}.txt") for name in names}
+    cpu_before, _ = process_usage(pid)
+    started = time.monotonic()
+    for name in names:
+        client.start(name, wav_path, sink="file", sink_path=outputs[name])
+
+    peak_rss = 0.0
+    finished = {}
+    while len(finished) < count:
+        time.sleep(0.1)
+        _, rss = process_usage(pid)
+        peak_rss = max(peak_rss, rss)
+        for status in client.status():
+            if status["session"] in outputs and not status["running"] and status["session"] not in finished:
+                finished[status["session"]] = time.monotonic()
+        if time.monotonic() - started > audio_seconds + max_lag + 30:
+            break
+    wall = time.monotonic() - started
+    cpu_after, _ = process_usage(pid)
+
+    matched = 0
+    for path in outputs.values():
+        if os.path.exists(path):
+            with open(path, "r", encoding="utf-8") as f:
+                matched += f.read().strip() == expected
+    # The daemon stops a file session a fixed drain time after the audio ends
+    lags = [at - started - audio_seconds - DAEMON_FILE_DRAIN_SECONDS for at in finished.values()]
+    lag = max(lags) if len(lags) == count else float("inf")
+    return {
+        "sessions": count,
+        "matched": matched,
+        "lag": lag,
+        "cpu": (cpu_after - cpu_before) / wall * 100,
+        "rss": peak_rss,
+        "sustained": matched == count and lag <= max_lag,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Find how many sessions one daemon sustains")
+    parser.add_argument("--levels", type=int, nargs="+", default=[1, 2, 4, 8, 16], help="Session counts")
+    parser.add_argument("--text", nargs="+", default=DEFAULT_TEXT, help="Scripted utterances")
+    parser.add_argument("--max-lag", type=float, default=2.0,
+                        help="Seconds a session may take to save after its drain time")
+    args = parser.parse_args()
+    if not os.path.exists("/proc/self/stat"):
+        raise SystemExit("This benchmark reads process usage from /proc (Linux only)")
+
+    script = build_script(args.text)
+    work_dir = tempfile.mkdtemp(prefix="stt_daemon_load_")
+    wav_path = os.path.join(work_dir, "input.wav")
+    write_synthetic_wav(wav_path, script)
+    with wave.open(wav_path, "rb") as wav:
+        audio_seconds = wav.getnframes() / wav.getframerate()
+    expected = " ".join(
+        " ".join(w["punctuated_word"] for w in e["words"])
+        for e in script
+        if e["type"] == "Results" and e.get("is_final")
+    )
+
+    server = FakeDeepgramServer(script, independent=True).start()
+    socket_path = os.path.join(work_dir, "daemon.sock")
+    env = dict(
+        os.environ,
+        DEEPGRAM_API_KEY="fake-key",
+        DEEPGRAM_URL=server.url,
+        LOG_DIR=os.path.join(work_dir, "logs"),
+        TRANSCRIPT_DIR=os.path.join(work_dir, "transcripts"),
+        DAEMON_SOCKET=socket_path,
+    )
+    daemon = subprocess.Popen(
+        [sys.executable, "-m", "transcription.daemon", "--max-sessions", str(max(args.levels))],
+        env=env,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+
+    from transcription.daemon_client import DaemonClient
+
+    client = DaemonClient(socket_path)
+    deadline = time.monotonic() + 30
+    while not client.is_available():
+        if daemon.poll() is not None or time.monotonic() > deadline:
+            server.stop()
+            raise SystemExit(f"Daemon did not start; see {env['LOG_DIR']}")
+        time.sleep(0.2)
+
+    _, idle_rss = process_usage(daemon.pid)
+    print(f"Work directory: {work_dir}")
+    print(f"Audio per session: {audio_seconds:.1f}s, daemon idle RSS {idle_rss:.0f} MB")
+    print()
+    print(f"{'sessions':>8} {'matched':>8} {'max lag':>9} {'cpu %':>7} {'rss MB':>8}  sustained")
+    best = 0
+    try:
+        for count in args.levels:
+            r = run_level(client, daemon.pid, count, wav_path, audio_seconds, expected, work_dir, args.max_lag)
+            print(
+                f"{r['sessions']:>8} {r['matched']:>8} {r['lag']:>8.2f}s {r['cpu']:>7.1f} "
+                f"{r['rss']:>8.0f}  {'yes' if r['sustained'] else 'no'}",
+                flush=True,
+            )
+            if not r["sustained"]:
+                break
+            best = count
+    finally:
+        client.shutdown()
+        daemon.wait(timeout=30)
+        server.stop()
+    print()
+    print(f"Sustained up to {best} concurrent session(s) on {os.cpu_count()} CPU(s)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,147 @@
+"""Deterministic end-to-end replay of a session without network or sound card.
+
+Starts the fake Deepgram server, streams a WAV file through a headless
+TranscriptionAgent and reports what was typed, the saved transcript and
+timing figures.
+
+Usage:
+    python -m benchmarks.replay_harness
+    python -m benchmarks.replay_harness --wav session.wav --text "hello world" "second line"
+    python -m benchmarks.replay_harness --fast --delay 0.2 --drop-at 4.0
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+import wave
+
+import numpy as np
+
+from transcription.fake_server import FakeDeepgramServer, build_script
+
+SAMPLE_RATE = 16000
+DEFAULT_TEXT = [
+    "The quick brown fox jumps over the lazy dog.",
+    "Pack my box with five dozen liquor jugs.",
+    "How vexingly quick daft zebras jump.",
+]
+
+
+def write_synthetic_wav(path, script, tail=3.0, seed=0):
+    """Write a WAV with loud voice-like bursts where the script has speech"""
+    rng = np.random.default_rng(seed)
+    finals = [e for e in script if e["type"] == "Results" and e.get("is_final")]
+    duration = max(e["at"] for e in script) + tail
+    samples = rng.normal(0, 30, int(duration * SAMPLE_RATE))
+    t = np.arange(len(samples)) / SAMPLE_RATE
+    for event in finals:
+        start = int(event["start"] * SAMPLE_RATE)
+        end = int((event["start"] + event["duration"]) * SAMPLE_RATE)
+        voice = np.sin(2 * np.pi * 180 * t[start:end]) * 6000
+        samples[start:end] += voice * (0.6 + 0.4 * np.sin(2 * np.pi * 4 * t[start:end]))
+    with wave.open(path, "wb") as wav:
+        wav.setnchannels(1)
+        wav.setsampwidth(2)
+        wav.setframerate(SAMPLE_RATE)
+        wav.writeframes(np.clip(samples, -32768, 32767).astype(np.int16).tobytes())
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay a session against a fake Deepgram server")
+    parser.add_argument("--wav", help="16-bit mono 16 kHz WAV (synthesized from --text if omitted)")
+    parser.add_argument("--text", nargs="+", default=DEFAULT_TEXT, help="Scripted utterances")
+    parser.add_argument("--script", help="JSON file with fake server events (overrides --text)")
+    parser.add_argument("--fast", action="store_true", help="Stream audio faster than real time")
+    parser.add_argument("--delay", type=float, default=0.0, help="Server response delay in seconds")
+    parser.add_argument("--drop-rate", type=float, default=0.0, help="Fraction of messages dropped")
+    parser.add_argument("--drop-at", type=float, help="Drop the connection at this audio offset")
+    parser.add_argument("--drain", type=float, default=2.0, help="Seconds to wait after the audio ends")
+    args = parser.parse_args()
+
+    if args.script:
+        with open(args.script, "r", encoding="utf-8") as f:
+            script = json.load(f)
+    else:
+        script = build_script(args.text)
+    if args.drop_at is not None:
+        script.append({"at": args.drop_at, "type": "Drop"})
+
+    work_dir = tempfile.mkdtemp(prefix="stt_replay_")
+    wav_path = args.wav or os.path.join(work_dir, "input.wav")
+    if not args.wav:
+        write_synthetic_wav(wav_path, script)
+
+    server = FakeDeepgramServer(script, delay=args.delay, drop_rate=args.drop_rate).start()
+
+    # Configuration is read from the environment at import time
+    output_path = os.path.join(work_dir, "typed.txt")
+    os.environ.setdefault("DEEPGRAM_API_KEY", "fake-key")
+    os.environ["DEEPGRAM_URL"] = server.url
+    os.environ["OUTPUT_SINK"] = "file"
+    os.environ["OUTPUT_FILE_PATH"] = output_path
+    os.environ["LOG_DIR"] = os.path.join(work_dir, "logs")
+    os.environ["TRANSCRIPT_DIR"] = os.path.join(work_dir, "transcripts")
+
+    from transcription.agent import TranscriptionAgent
+    from transcription.audio_sources import WavFileSource
+    from ui.headless import HeadlessGUI
+
+    gui = HeadlessGUI()
+
+    def finish():
+        agent.stop()
+        wait_until_saved()
+
+    def wait_until_saved():
+        # stop() returns at once; the session saves the transcript in the background
+        if agent.is_running:
+            gui.schedule_task(50, wait_until_saved)
+        else:
+            gui.quit()
+
+    def on_audio_finished():
+        gui.schedule_task(int(args.drain * 1000), finish)
+
+    agent = TranscriptionAgent(
+        gui,
+        audio_source_factory=lambda push: WavFileSource(
+            push, wav_path, realtime=not args.fast, on_finished=on_audio_finished
+        ),
+    )
+
+    started = time.perf_counter()
+    gui.schedule_task(0, agent.start)
+    gui.start()
+    elapsed = time.perf_counter() - started
+    server.stop()
+
+    typed = ""
+    if os.path.exists(output_path):
+        with open(output_path, "r", encoding="utf-8") as f:
+            typed = f.read().strip()
+    expected = " ".join(
+        " ".join(w["punctuated_word"] for w in e["words"])
+        for e in script
+        if e["type"] == "Results" and e.get("is_final")
+    )
+
+    print()
+    print(f"Work directory:     {work_dir}")
+    print(f"Wall time:          {elapsed:.2f}s")
+    print(f"Connections:        {server.connections}")
+    print(f"Audio streamed:     {server.audio_bytes / (SAMPLE_RATE * 2):.2f}s")
+    if server.audio_messages:
+        print(
+            f"Audio messages:     {server.audio_messages} "
+            f"(avg {server.audio_bytes / server.audio_messages:.0f} bytes)"
+        )
+    print(f"Control messages:   {', '.join(server.control_messages) or 'none'}")
+    print(f"Typed:              {typed}")
+    print(f"Matches script:     {typed == expected}")
+    sys.exit(0 if typed == expected else 1)
+
+
+if __name__ == "__main__":
+    main()
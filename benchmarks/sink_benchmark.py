@@ -0,0 +1,124 @@
+"""Micro-benchmark for output sinks.
+
+Measures raw injection throughput (chars/s) and the latency from handing a
+finished utterance to the output queue until the sink has made it visible.
+
+Usage:
+    python -m benchmarks.sink_benchmark --sinks file stdout
+    python -m benchmarks.sink_benchmark --sinks typewrite bulk paste
+
+Keyboard sinks type into the focused window, so focus a scratch editor
+during the countdown.
+"""
+import argparse
+import os
+import statistics
+import tempfile
+import threading
+import time
+
+from transcription.output_queue import OutputQueue
+from transcription.sinks import create_sink
+
+KEYBOARD_SINKS = ("typewrite", "bulk", "paste")
+
+
+class _TimedSink:
+    """Wraps a sink and signals when each write has completed"""
+
+    def __init__(self, sink):
+        self.sink = sink
+        self.done = threading.Event()
+
+    def write(self, text):
+        self.sink.write(text)
+        self.done.set()
+
+    def close(self):
+        self.sink.close()
+
+
+def _make_utterance(chars):
+    words = ("alpha", "bravo", "charlie", "delta", "echo", "foxtrot")
+    text = ""
+    i = 0
+    while len(text) < chars:
+        text += words[i % len(words)] + " "
+        i += 1
+    return text[:chars].strip()
+
+
+def _percentile(values, pct):
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def bench_sink(name, chars, count, path=None):
+    """Return throughput and latency figures for one sink"""
+    utterance = _make_utterance(chars)
+
+    # Throughput: one direct write of all utterances back-to-back
+    sink = create_sink(name, path)
+    bulk_text = " ".join([utterance] * count) + " "
+    started = time.perf_counter()
+    sink.write(bulk_text)
+    elapsed = time.perf_counter() - started
+    sink.close()
+
+    # Latency: end of utterance handed to the queue until the sink returns
+    timed = _TimedSink(create_sink(name, path))
+    output_queue = OutputQueue(sink=timed)
+    output_queue.start()
+    latencies = []
+    for _ in range(count):
+        timed.done.clear()
+        started = time.perf_counter()
+        output_queue.put(utterance)
+        timed.done.wait()
+        latencies.append(time.perf_counter() - started)
+    output_queue.stop()
+
+    return {
+        "sink": name,
+        "chars_per_sec": len(bulk_text) / elapsed if elapsed else float("inf"),
+        "latency_p50_ms": statistics.median(latencies) * 1000,
+        "latency_p95_ms": _percentile(latencies, 95) * 1000,
+        "latency_max_ms": max(latencies) * 1000,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark transcript output sinks")
+    parser.add_argument(
+        "--sinks",
+        nargs="+",
+        default=["file"],
+        choices=["typewrite", "bulk", "paste", "stdout", "file"],
+    )
+    parser.add_argument("--chars", type=int, default=200, help="Characters per utterance")
+    parser.add_argument("--count", type=int, default=10, help="Utterances per sink")
+    parser.add_argument("--countdown", type=int, default=5, help="Seconds before keyboard sinks start")
+    args = parser.parse_args()
+
+    if any(name in KEYBOARD_SINKS for name in args.sinks):
+        print(f"Focus a scratch text editor; typing starts in {args.countdown}s...")
+        time.sleep(args.countdown)
+
+    results = []
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        for name in args.sinks:
+            path = os.path.join(tmp_dir, f"{name}.txt") if name == "file" else None
+            results.append(bench_sink(name, args.chars, args.count, path))
+
+    print()
+    print(f"{'sink':<10} {'chars/s':>12} {'p50 ms':>10} {'p95 ms':>10} {'max ms':>10}")
+    for r in results:
+        print(
+            f"{r['sink']:<10} {r['chars_per_sec']:>12.0f} {r['latency_p50_ms']:>10.2f} "
+            f"{r['latency_p95_ms']:>10.2f} {r['latency_max_ms']:>10.2f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+"""Check that the VAD adapts to steady background noise.
+
+Feeds stationary white noise at several levels through ``VoiceActivityGate``
+in capture-sized chunks and reports where the noise floor settled, how much
+audio was streamed (overall and over the second half, once the floor has
+had time to adapt) and how often the gate reported speech. Noise at the
+``--check-db`` level must end up almost entirely gated.
+
+Usage:
+    python -m benchmarks.vad_noise
+    python -m benchmarks.vad_noise --levels -60 -50 -40 -30 --seconds 20
+"""
+import argparse
+import sys
+
+import numpy as np
+
+from transcription.vad import VoiceActivityGate
+from config import DG_SAMPLE_RATE, CAPTURE_FRAME_MS
+
+
+class _NullKeepAlive:
+    def tick(self, now):
+        pass
+
+    def mark_sent(self, now):
+        pass
+
+
+def run_level(level_db, seconds, frame_ms, seed=0):
+    rng = np.random.default_rng(seed)
+    rms = 32768.0 * 10 ** (level_db / 20)
+    samples = np.clip(rng.normal(0, rms, int(seconds * DG_SAMPLE_RATE)), -32768, 32767).astype(np.int16)
+    frame = DG_SAMPLE_RATE * frame_ms // 1000
+    frames = [samples[i:i + frame].tobytes() for i in range(0, len(samples) - frame + 1, frame)]
+
+    speech_calls = [0]
+    audio_time = [0.0]
+
+    def count_speech():
+        speech_calls[0] += 1
+
+    # The gate runs on audio time, so the hangover behaves as it would live
+    gate = VoiceActivityGate(lambda data: None, _NullKeepAlive(), on_speech=count_speech,
+                             clock=lambda: audio_time[0])
+    half = len(frames) // 2
+    sent_before_half = 0
+    for i, data in enumerate(frames):
+        if i == half:
+            sent_before_half = gate.sent_bytes
+        gate(data)
+        audio_time[0] += frame_ms / 1000
+    second_half_bytes = sum(len(f) for f in frames[half:])
+    return {
+        "level": level_db,
+        "floor": gate.noise_floor_db,
+        "streamed": gate.speech_ratio,
+        "streamed_late": (gate.sent_bytes - sent_before_half) / second_half_bytes,
+        "speech_calls": speech_calls[0],
+        "frames": len(frames),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Feed stationary noise through the VAD")
+    parser.add_argument("--levels", type=float, nargs="+", default=[-60, -52, -50, -46, -40, -30],
+                        help="Noise levels in dBFS")
+    parser.add_argument("--seconds", type=float, default=10, help="Noise duration per level")
+    parser.add_argument("--frame-ms", type=int, default=CAPTURE_FRAME_MS, help="Chunk size fed to the gate")
+    parser.add_argument("--check-db", type=float, default=-50, help="Level that must converge to ~0%% streamed")
+    parser.add_argument("--max-late-ratio", type=float, default=0.02,
+                        help="Largest streamed fraction allowed in the second half at --check-db")
+    args = parser.parse_args()
+
+    print(f"{'noise dBFS':>10} {'floor dB':>9} {'streamed':>9} {'2nd half':>9} {'on_speech':>10}")
+    results = [run_level(level, args.seconds, args.frame_ms) for level in args.levels]
+    for r in results:
+        print(
+            f"{r['level']:>10.0f} {r['floor']:>9.1f} {r['streamed']:>9.1%} "
+            f"{r['streamed_late']:>9.1%} {r['speech_calls']:>5}/{r['frames']}"
+        )
+
+    check = run_level(args.check_db, args.seconds, args.frame_ms)
+    passed = check["streamed_late"] <= args.max_late_ratio
+    print()
+    print(
+        f"Noise at {args.check_db:.0f} dBFS: {check['streamed_late']:.1%} streamed once adapted "
+        f"(limit {args.max_late_ratio:.0%}): {'PASS' if passed else 'FAIL'}"
+    )
+    sys.exit(0 if passed else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,4 +1,5 @@
 import os
+import tempfile
 from dotenv import load_dotenv
 
 load_dotenv()
@@ -8,11 +9,63 @@ HOTKEY = "ctrl+alt+\\"
 SILENCE_LIMIT_SECONDS = 20
 
 # Directory Configuration
-LOG_DIR = "logs"
-TRANSCRIPT_DIR = "transcripts"
+LOG_DIR = os.getenv("LOG_DIR", "logs")
+TRANSCRIPT_DIR = os.getenv("TRANSCRIPT_DIR", "transcripts")
 os.makedirs(LOG_DIR, exist_ok=True)
 os.makedirs(TRANSCRIPT_DIR, exist_ok=True)
 
+# Session logs: written by a background thread, rotated by size and gzipped when old
+LOG_FORMAT = os.getenv("LOG_FORMAT", "text")  # text | json (one JSON object per line)
+LOG_QUEUE_SIZE = 10000  # Records beyond this are dropped (and counted) rather than blocking
+LOG_BATCH_SIZE = 500  # Max records per write
+LOG_MAX_BYTES = 10 * 1024 * 1024  # Rotate a session log at this size
+LOG_BACKUP_COUNT = 5  # Rotated (gzipped) files kept per session
+LOG_MAX_TOTAL_MB = 500  # Oldest compressed logs are deleted beyond this
+
+# Transcript journal (crash-safe, appended as each utterance is finalized)
+JOURNAL_FSYNC_POLICY = "batch"  # always | batch | never
+JOURNAL_FSYNC_BATCH = 10  # Utterances between fsyncs in batch mode
+JOURNAL_FSYNC_INTERVAL = 5  # Max seconds between fsyncs in batch mode
+TRANSCRIPT_TAIL_SIZE = 200  # Recent utterances kept in memory
+
+# Session audio recording: what was streamed to Deepgram, saved next to the transcript
+RECORDING_ENABLED = os.getenv("RECORDING_ENABLED", "false").lower() in ("1", "true", "yes")
+RECORDING_FORMAT = os.getenv("RECORDING_FORMAT", "wav")  # wav (memory-mapped) | flac (needs pyflac)
+RECORDING_PREALLOCATE_SECONDS = 600  # WAV files are pre-sized and grow in steps of this much audio
+RECORDING_MAX_TOTAL_MB = 2048  # Oldest recordings are deleted beyond this
+RECORDING_MAX_AGE_DAYS = 30
+
+# Second-pass refinement of finished sessions from their recording (needs RECORDING_ENABLED)
+REFINE_ENABLED = os.getenv("REFINE_ENABLED", "false").lower() in ("1", "true", "yes")
+REFINE_MODEL = "nova-3"
+REFINE_UTT_SPLIT = 1.0  # Seconds of silence between refined transcript lines
+REFINE_WORKERS = 1  # Worker processes
+REFINE_NICE = 10  # Worker niceness (below-normal priority class on Windows)
+REFINE_IDLE_DELAY = 30  # Seconds after a session ends before refinement may start
+REFINE_ACTIVE_HOURS = os.getenv("REFINE_ACTIVE_HOURS", "")  # e.g. "22-7"; empty for any time
+
+# Transcript search index
+SEARCH_INDEX_PATH = os.path.join(TRANSCRIPT_DIR, "search_index.sqlite3")
+SEARCH_RESULT_LIMIT = 20
+
+# Batch transcription of recorded files (python -m transcription.batch)
+BATCH_CONCURRENCY = 4  # Prerecorded requests in flight
+BATCH_MAX_RETRIES = 4  # Per file, for rate limits, server errors and dropped connections
+BATCH_RETRY_INITIAL_DELAY = 1  # Doubles after each failed attempt
+BATCH_RETRY_MAX_DELAY = 30
+BATCH_REQUEST_TIMEOUT = 600  # Seconds; long recordings take a while to process
+BATCH_MANIFEST_PATH = os.path.join(TRANSCRIPT_DIR, "batch_manifest.jsonl")
+
+# Headless daemon (python -m transcription.daemon), controlled over a Unix-domain socket
+DAEMON_SOCKET_PATH = os.getenv(
+    "DAEMON_SOCKET",
+    os.path.join(tempfile.gettempdir(), f"myspeech2text-{os.getenv('USER') or os.getenv('USERNAME') or 'user'}.sock"),
+)
+DAEMON_MAX_SESSIONS = 16  # Sessions running at once
+DAEMON_SUBSCRIBER_QUEUE = 1000  # Events buffered per subscriber; a slow subscriber loses the excess
+DAEMON_FILE_DRAIN_SECONDS = 2  # A WAV-file session stops this long after the file ends
+DAEMON_GUI_SESSION = "gui"  # Session the GUI controls when it runs as a daemon client
+
 # UI Configuration
 UI_WIDTH = 150
 UI_HEIGHT = 70
@@ -24,6 +77,7 @@ BTN_STOP_ICON = "⬜"
 BTN_PAUSE_ICON = "⏯"
 BTN_PLAY_ICON = "⏯"
 BTN_TRANSCRIPT_ICON = "📄"
+BTN_SEARCH_ICON = "🔍"
 
 # Button Sizes
 BTN_RECORD_SIZE = 30
@@ -38,8 +92,94 @@ BTN_DISABLED_COLOR = "gray"
 BTN_PAUSED_COLOR = "green"
 
 # Deepgram Configuration
+DG_URL = os.getenv("DEEPGRAM_URL", "")  # Empty for api.deepgram.com; set for a local fake server
 DG_MODEL = "nova-3"
 DG_LANGUAGE = "en-US"
 DG_SAMPLE_RATE = 16000
 DG_UTTERANCE_END_MS = "1000"
-DG_ENDPOINTING = 300
\ No newline at end of file
+DG_ENDPOINTING = 300
+KEEPALIVE_INTERVAL_SECONDS = 5  # Deepgram closes idle sockets after ~10s
+SESSION_STOP_TIMEOUT = 5  # Seconds shutdown waits for a stopping session to finish
+STOP_FINALIZE_TIMEOUT = 2  # Seconds to wait for Deepgram's reply to Finalize on stop
+
+# Reconnect: replay audio Deepgram had not finalized when the socket dropped
+RECONNECT_ENABLED = True
+RECONNECT_BUFFER_SECONDS = 30
+RECONNECT_MAX_ATTEMPTS = 5
+RECONNECT_INITIAL_DELAY = 0.5  # Doubles after each failed attempt
+RECONNECT_MAX_DELAY = 8
+
+# Warm standby: keep a connection open between sessions for instant start
+WARM_STANDBY_ENABLED = False
+WARM_STANDBY_MICROPHONE = False  # Also keep the audio device open
+
+# Audio input: "microphone" or the path of a 16-bit mono WAV file to replay
+AUDIO_SOURCE = os.getenv("AUDIO_SOURCE", "microphone")
+WAV_CHUNK_MS = 100
+
+# Microphone capture: native-rate capture into a ring buffer, resampled to DG_SAMPLE_RATE
+AUDIO_DEVICE = os.getenv("AUDIO_DEVICE", "")  # Input device index or name substring; empty for the default
+CAPTURE_FRAME_MS = int(os.getenv("CAPTURE_FRAME_MS", "20"))  # Audio per PortAudio callback and per pushed frame
+CAPTURE_RING_SECONDS = 2  # Captured audio held for the worker; newer audio is dropped when full
+CAPTURE_ISOLATED = os.getenv("CAPTURE_ISOLATED", "false").lower() in ("1", "true", "yes")  # Capture in its own process
+CAPTURE_SHM_SECONDS = 5  # Shared-memory ring between the capture process and the session
+RESAMPLER_TAPS_PER_PHASE = 32  # Filter length per polyphase branch (quality vs CPU)
+RESAMPLER_KAISER_BETA = 8.6  # Kaiser window shape; ~85 dB stopband attenuation
+
+# Voice Activity Detection (client-side silence gate)
+VAD_ENABLED = True
+VAD_WINDOW_MS = 20
+VAD_ENERGY_THRESHOLD_DB = -45  # Minimum dBFS for a voiced window
+VAD_NOISE_MARGIN_DB = 10  # Required level above the tracked noise floor
+VAD_UNVOICED_DB_OFFSET = 6  # Fricatives may be this much quieter if ZCR is high
+VAD_UNVOICED_MARGIN_DB = 4  # ...but must still be this far above the noise floor
+VAD_NOISE_WINDOW_MS = 5000  # Recent audio the noise floor is estimated from
+VAD_NOISE_PERCENTILE = 10  # Low percentile of recent window levels taken as the floor
+VAD_NOISE_RISE_DB_PER_S = 8  # The floor falls at once but rises at most this fast
+VAD_ZCR_THRESHOLD = 0.25
+VAD_HANGOVER_MS = 1500  # Keep streaming after speech so endpointing still fires
+VAD_PREROLL_MS = 300
+
+# Output Configuration
+OUTPUT_QUEUE_SIZE = 64
+TYPING_INTERVAL = 0.01
+OUTPUT_SINK = os.getenv("OUTPUT_SINK", "typewrite")  # typewrite | bulk | paste | stdout | file
+OUTPUT_FILE_PATH = os.getenv("OUTPUT_FILE_PATH")  # Required when OUTPUT_SINK is "file"
+PASTE_RESTORE_DELAY = 0.1  # Seconds before the clipboard is restored
+
+# Transcript bus: every committed utterance (and draft) is published once to each subscriber's own queue
+TRANSCRIPT_BUS_QUEUE_SIZE = 256  # Events buffered per subscriber before its overflow policy applies
+TRANSCRIPT_JOURNAL_QUEUE_SIZE = 10000  # The journal only drops utterances if the disk stalls this long
+SEARCH_INDEX_LIVE = os.getenv("SEARCH_INDEX_LIVE", "true").lower() in ("1", "true", "yes")  # Searchable mid-session
+TRANSCRIPT_STREAM_PORT = int(os.getenv("TRANSCRIPT_STREAM_PORT", "0"))  # Server-Sent Events on 127.0.0.1; 0 = off
+TRANSCRIPT_STREAM_INTERIMS = os.getenv("TRANSCRIPT_STREAM_INTERIMS", "false").lower() in ("1", "true", "yes")
+TRANSCRIPT_STREAM_CLIENT_QUEUE = 256  # Events buffered per stream client; the oldest are dropped
+
+# Interim typing: type hypotheses as they arrive and correct them in place
+INTERIM_TYPING_ENABLED = os.getenv("INTERIM_TYPING", "false").lower() in ("1", "true", "yes")
+INTERIM_KEYSTROKE_RATE = 60  # Keystrokes/s budget for interim corrections (finals spend it too)
+INTERIM_MIN_INTERVAL = 0.15  # Minimum seconds between interim revisions
+
+# Latency tracing: per-utterance capture-to-keystroke timings in the session log
+LATENCY_TRACING_ENABLED = True
+
+# Runtime metrics: Prometheus endpoint and periodic log line (off by default)
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "false").lower() in ("1", "true", "yes")
+METRICS_PORT = int(os.getenv("METRICS_PORT", "9464"))
+METRICS_LOG_INTERVAL = 60  # Seconds between "Metrics:" lines in the session log
+
+# Upload encoding: "linear16" (raw PCM), "opus" (Ogg/Opus, needs opuslib) or "flac" (needs pyflac)
+AUDIO_ENCODING = os.getenv("AUDIO_ENCODING", "linear16")
+OPUS_BITRATE = 24000  # bits/s
+OPUS_FRAME_MS = 20
+FLAC_BLOCK_MS = 100  # FLAC output is emitted one block at a time
+FLAC_COMPRESSION_LEVEL = 5
+
+# Send packetization: frames are held briefly and sent as one websocket message
+SEND_PACKET_MS = int(os.getenv("SEND_PACKET_MS", "0"))  # Max hold of the oldest frame; 0 sends each frame alone
+SEND_PACKET_ADAPTIVE = os.getenv("SEND_PACKET_ADAPTIVE", "false").lower() in ("1", "true", "yes")
+SEND_PACKET_MIN_MS = 0  # Adaptive bounds on the hold time
+SEND_PACKET_MAX_MS = 200
+SEND_PACKET_MAX_BYTES = 32000  # Per message (1s of linear16); a backlog is split at this size
+SEND_PACKET_RTT_FRACTION = 0.2  # Adaptive target: this share of the measured result latency
+SEND_BACKPRESSURE_SECONDS = 0.05  # A send slower than this counts as socket backpressure
@@ -1,21 +1,39 @@
+import argparse
 import logging
+import multiprocessing
 import keyboard
 import sys
 
 from ui.gui import TranscriptionGUI
 from transcription.agent import TranscriptionAgent
-from config import HOTKEY, UI_WIDTH, UI_HEIGHT, UI_OPACITY
+from config import HOTKEY, UI_WIDTH, UI_HEIGHT, UI_OPACITY, DAEMON_SOCKET_PATH
 
 def main():
+    parser = argparse.ArgumentParser(description="Speech-to-text transcription agent")
+    parser.add_argument("--daemon", action="store_true", help="Run the headless daemon instead of the GUI")
+    parser.add_argument("--connect", action="store_true", help="Run the GUI as a client of a running daemon")
+    parser.add_argument("--socket", default=DAEMON_SOCKET_PATH, help="Daemon socket path")
+    args = parser.parse_args()
+
+    if args.daemon:
+        from transcription.daemon import TranscriptionDaemon
+        TranscriptionDaemon(args.socket).run()
+        return
+
     # Initialize GUI
     gui = TranscriptionGUI(UI_WIDTH, UI_HEIGHT, UI_OPACITY)
     
-    # Create transcription agent
-    agent = TranscriptionAgent(gui)
+    # Create transcription agent, or drive a daemon session instead
+    if args.connect:
+        from transcription.daemon_client import DaemonClient, RemoteAgent
+        agent = RemoteAgent(gui, DaemonClient(args.socket))
+    else:
+        agent = TranscriptionAgent(gui)
     
     # Register hotkey
     try:
-        keyboard.add_hotkey(HOTKEY, agent.toggle_start_stop)
+        # The hotkey fires on the keyboard hook thread; hop to the Tk thread
+        keyboard.add_hotkey(HOTKEY, lambda: gui.schedule_task(0, agent.toggle_start_stop))
         logging.info(f"Hotkey '{HOTKEY}' registered. Press it to toggle transcription.")
     except Exception as e:
         logging.error(f"Failed to register hotkey '{HOTKEY}'. Maybe run with sudo/admin privileges? Error: {e}")
@@ -23,7 +41,7 @@ def main():
     # Set up graceful shutdown
     def on_closing():
         logging.info("GUI closing. Stopping agent...")
-        agent.stop()
+        agent.shutdown()
         keyboard.remove_all_hotkeys()  # Clean up hotkeys
         gui.root.destroy()
     
@@ -35,4 +53,6 @@ def main():
     gui.start()
 
 if __name__ == "__main__":
+    # Refinement workers are spawned processes; needed for the frozen executable
+    multiprocessing.freeze_support()
     main()
\ No newline at end of file
@@ -1,3 +1,5 @@
+import asyncio
+import concurrent.futures
 import os
 import logging
 import threading
@@ -7,23 +9,119 @@ import subprocess
 import sys
 
 from transcription.deepgram_client import DeepgramTranscriptionClient
-from utils.logger import setup_session_logger
-from config import LOG_DIR, TRANSCRIPT_DIR, SILENCE_LIMIT_SECONDS
+from transcription.audio_sources import create_audio_source
+from transcription.standby import WarmStandby
+from transcription.session_loop import SessionLoop
+from transcription.journal import TranscriptJournal, journal_path_for, recover_journals
+from transcription.search_index import index_session, SearchIndexSubscriber
+from transcription.transcript_bus import CallbackSubscriber
+from transcription.transcript_stream import TranscriptStreamServer
+from transcription.recording import create_recorder, apply_retention
+from transcription.refine import RefinementScheduler
+from transcription import tracing
+from utils.logger import setup_session_logger, session_context
+from utils.metrics import registry, MetricsServer, MetricsLogger
+from config import (
+    LOG_DIR,
+    TRANSCRIPT_DIR,
+    SILENCE_LIMIT_SECONDS,
+    SESSION_STOP_TIMEOUT,
+    WARM_STANDBY_ENABLED,
+    RECORDING_ENABLED,
+    REFINE_ENABLED,
+    SEARCH_INDEX_LIVE,
+    TRANSCRIPT_STREAM_PORT,
+    LATENCY_TRACING_ENABLED,
+    DG_ENDPOINTING,
+    DG_UTTERANCE_END_MS,
+)
+
+
+def open_transcript(path):
+    """Open a transcript file in the system's default viewer"""
+    if path and os.path.exists(path):
+        try:
+            logging.info(f"Opening transcript file: {path}")
+            if sys.platform == "win32":
+                os.startfile(path)
+            elif sys.platform == "darwin":
+                subprocess.Popen(["open", path])
+            else:
+                subprocess.Popen(["xdg-open", path])
+        except Exception as e:
+            logging.error(f"Failed to open transcript file: {e}")
+    else:
+        logging.warning("No transcript available for the current/last session.")
 
 
 class TranscriptionAgent:
-    def __init__(self, gui):
+    """Runs transcription sessions for one GUI (or one daemon session slot).
+
+    A standalone agent owns the process: session logs, journal recovery,
+    metrics, refinement and its own session loop. With ``standalone=False``
+    it is one of several sessions in a daemon, which provides the session
+    loop, refinement scheduler and transcript stream and does all of that
+    once for the process. ``name`` is appended to the session's transcript
+    and log file names. ``on_transcript`` is called with every committed
+    utterance (a ``TranscriptEvent``) on its own thread.
+    """
+
+    def __init__(
+        self,
+        gui,
+        audio_source_factory=create_audio_source,
+        sink_factory=None,
+        name=None,
+        session_loop=None,
+        refiner=None,
+        standalone=True,
+        on_transcript=None,
+        stream_server=None,
+    ):
         self.gui = gui
+        self.audio_source_factory = audio_source_factory
+        self.sink_factory = sink_factory
+        self.name = name
+        self.on_transcript = on_transcript
+        self.standalone = standalone
         self.is_running = False
         self.is_paused = False
+        self.is_finishing = False
+        self.stop_requested_at = None
+        self.saved_at = None
         self.last_speech_time = 0
-        self.stop_event = None
-        self.transcription_thread = None
-        self.silence_check_thread = None
+        self.session = None
+        self._stop_requested = None
+        self._resumed = None
         self.deepgram_client = None
         self.log_file_handler = None
         self.current_log_file = None
         self.current_transcript_file = None
+        self.journal = None
+        self.recorder = None
+        self.requested_at = None
+        self.start_error = None  # Why the last session failed to start
+        # All websocket I/O, reconnects and the silence deadline run here
+        self._owns_loop = session_loop is None
+        self.session_loop = session_loop or SessionLoop()
+        self.session_loop.start()
+        self.standby = (
+            WarmStandby(self._create_client, self.session_loop)
+            if WARM_STANDBY_ENABLED and standalone else None
+        )
+        # Re-transcribes recordings for accuracy while no session is live
+        self.refiner = refiner
+        if standalone and REFINE_ENABLED and RECORDING_ENABLED:
+            self.refiner = RefinementScheduler().start()
+        # Local Server-Sent Events feed of transcripts for other apps
+        self.stream_server = stream_server
+        if standalone and TRANSCRIPT_STREAM_PORT:
+            self.stream_server = TranscriptStreamServer()
+            if not self.stream_server.start():
+                self.stream_server = None
+        self.metrics_server = None
+        self.metrics_logger = None
+        self._sessions = registry.counter("sessions_total", "Transcription sessions started")
 
         # Set up GUI callbacks
         self.gui.set_command_callbacks(
@@ -33,9 +131,24 @@ class TranscriptionAgent:
             stop_func=self.stop,
         )
 
+        # Finish transcripts of sessions that were cut short by a crash
+        if standalone:
+            recovered = recover_journals(TRANSCRIPT_DIR)
+            if recovered:
+                self.current_transcript_file = recovered[-1]
+
+        if registry.enabled and standalone:
+            self._register_gauges()
+            self.metrics_server = MetricsServer(registry)
+            self.metrics_server.start()
+            self.metrics_logger = MetricsLogger(registry)
+
         # Initial UI update
         self.update_gui_state()
 
+        if self.standby:
+            self.standby.prepare()
+
     def toggle_start_stop(self):
         """Toggle between starting and stopping transcription"""
         if self.is_running:
@@ -45,15 +158,20 @@ class TranscriptionAgent:
 
     def toggle_pause(self):
         """Toggle between pausing and resuming transcription"""
-        if not self.is_running:
+        if not self.is_running or self.is_finishing:
             return
 
         self.is_paused = not self.is_paused
         logging.info(f"Transcription {'paused' if self.is_paused else 'resumed'}")
+        if not self.is_paused:
+            # Time spent paused must not count towards the silence limit
+            self.last_speech_time = time.time()
 
         # Update deepgram client pause state
         if self.deepgram_client:
             self.deepgram_client.pause(self.is_paused)
+        if self._resumed:
+            self.session_loop.call_soon(self._resumed.clear if self.is_paused else self._resumed.set)
 
         self.update_gui_state()
 
@@ -62,75 +180,90 @@ class TranscriptionAgent:
         if self.is_running:
             logging.warning("Transcription already running.")
             return
+        self.requested_at = time.monotonic()
+        self.start_error = None
 
         # Setup logging and transcript files
         timestamp = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
-        self.current_log_file = os.path.join(LOG_DIR, f"session_{timestamp}.log")
+        if self.name:
+            timestamp += f"_{self.name}"
         self.current_transcript_file = os.path.join(
             TRANSCRIPT_DIR, f"transcript_{timestamp}.txt"
         )
-        self.log_file_handler = setup_session_logger(self.current_log_file)
+        # A daemon's sessions share its log
+        if self.standalone:
+            self.current_log_file = os.path.join(LOG_DIR, f"session_{timestamp}.log")
+            self.log_file_handler = setup_session_logger(self.current_log_file)
+        self.journal = TranscriptJournal(journal_path_for(self.current_transcript_file))
+        if RECORDING_ENABLED:
+            try:
+                apply_retention()
+                self.recorder = create_recorder(self.current_transcript_file)
+            except Exception as e:
+                logging.error(f"Failed to start session audio recording: {e}")
 
         logging.info("=" * 20 + " Starting Transcription Session " + "=" * 20)
+        if LATENCY_TRACING_ENABLED:
+            tracing.log_settings(DG_ENDPOINTING, DG_UTTERANCE_END_MS)
+        self._sessions.inc()
+        if self.refiner:
+            self.refiner.session_started()
+        if self.metrics_logger:
+            self.metrics_logger.start()
         self.is_running = True
         self.is_paused = False
         self.last_speech_time = time.time()
-        self.stop_event = threading.Event()
-
-        try:
-            # Create deepgram client
-            self.deepgram_client = DeepgramTranscriptionClient(
-                on_speech_detected=self.on_speech_detected,
-                on_speech_end=None,  # Not used currently
-            )
-
-            # Start transcription thread
-            self.transcription_thread = threading.Thread(
-                target=self._transcription_worker, daemon=True
-            )
-            self.transcription_thread.start()
-
-            # Start silence checker thread
-            self.silence_check_thread = threading.Thread(
-                target=self._check_silence_loop, daemon=True
-            )
-            self.silence_check_thread.start()
+        self._stop_requested = asyncio.Event()
+        self._resumed = asyncio.Event()
+        self._resumed.set()
 
-        except Exception as e:
-            logging.error(f"Failed to start transcription thread: {e}")
-            self.is_running = False
+        self.session = self.session_loop.submit(self._run_session())
 
         self.update_gui_state()
 
     def stop(self):
-        """Stop the transcription process"""
+        """Ask the running session to stop; returns without waiting.
+
+        The session task flushes the last words, closes the socket and saves
+        the transcript, then ``_on_session_finished`` resets state on the
+        GUI thread. Until then the GUI shows a "finishing" state.
+        """
         if not self.is_running:
             logging.warning("Transcription not running.")
             return
+        if self.is_finishing:
+            logging.info("Transcription session is already finishing.")
+            return
 
         logging.info("=" * 20 + " Stopping Transcription Session " + "=" * 20)
-        if self.stop_event:
-            self.stop_event.set()
-
-        # Wait for threads to finish
-        if self.transcription_thread and self.transcription_thread.is_alive():
-            self.transcription_thread.join(timeout=5)
-            if self.transcription_thread and self.transcription_thread.is_alive():
-                logging.warning("Transcription thread did not terminate gracefully.")
-
-        if self.silence_check_thread and self.silence_check_thread.is_alive():
-            self.silence_check_thread.join(timeout=1)
+        self.is_finishing = True
+        self.stop_requested_at = time.monotonic()
+        self.session_loop.call_soon(self._stop_requested.set)
+        self.update_gui_state()
 
-        # Save transcript
-        self._save_transcript()
+    def _on_session_finished(self):
+        """Reset state once the session task has saved the transcript"""
+        if not self.is_running:
+            return
+        if self.stop_requested_at is not None and self.saved_at is not None:
+            latency_ms = (self.saved_at - self.stop_requested_at) * 1000
+            logging.info(f"Stop-to-saved latency: {latency_ms:.0f} ms")
 
         # Reset state
         self.is_running = False
         self.is_paused = False
+        self.is_finishing = False
+        self.stop_requested_at = None
+        self.saved_at = None
         self.deepgram_client = None
-        self.transcription_thread = None
-        self.silence_check_thread = None
-        self.stop_event = None
+        self.journal = None
+        self.recorder = None
+        self.session = None
+        self._stop_requested = None
+        self._resumed = None
+
+        if self.metrics_logger:
+            self.metrics_logger.stop()
 
         # Close log file handler
         if self.log_file_handler:
@@ -140,100 +273,233 @@ class TranscriptionAgent:
 
         self.update_gui_state()
 
+        # Rebuild the standby connection for the next session
+        if self.standby:
+            self.standby.prepare()
+        if self.refiner:
+            self.refiner.session_finished()
+
+    def shutdown(self):
+        """Stop any running session, close the standby connection and the session loop"""
+        if self.is_running:
+            # The GUI is going away, so wait here instead of on a scheduled task
+            self.stop()
+            try:
+                self.session.result(timeout=SESSION_STOP_TIMEOUT)
+            except concurrent.futures.TimeoutError:
+                logging.warning("Transcription session did not terminate gracefully.")
+                self.session.cancel()
+            except Exception as e:
+                logging.error(f"Transcription session failed: {e}")
+            self._on_session_finished()
+        if self.standby:
+            try:
+                self.session_loop.submit(self.standby.shutdown()).result(timeout=SESSION_STOP_TIMEOUT)
+            except Exception as e:
+                logging.warning(f"Failed to close standby connection: {e}")
+        if self._owns_loop:
+            self.session_loop.stop()
+        if self.refiner and self.standalone:
+            self.refiner.shutdown()
+        if self.stream_server and self.standalone:
+            self.stream_server.stop()
+        if self.metrics_server:
+            self.metrics_server.stop()
+
     def on_speech_detected(self):
         """Called when speech is detected to reset the silence timer"""
         self.last_speech_time = time.time()
 
     def view_transcript(self):
         """Open the current or last transcript file"""
-        if self.current_transcript_file and os.path.exists(
-            self.current_transcript_file
-        ):
-            try:
-                logging.info(f"Opening transcript file: {self.current_transcript_file}")
-                if sys.platform == "win32":
-                    os.startfile(self.current_transcript_file)
-                elif sys.platform == "darwin":
-                    subprocess.Popen(["open", self.current_transcript_file])
-                else:
-                    subprocess.Popen(["xdg-open", self.current_transcript_file])
-            except Exception as e:
-                logging.error(f"Failed to open transcript file: {e}")
-        else:
-            logging.warning("No transcript available for the current/last session.")
+        open_transcript(self.current_transcript_file)
 
     def update_gui_state(self):
         """Update the GUI state based on agent state"""
         self.gui.update_state(
             is_running=self.is_running,
             is_paused=self.is_paused,
+            is_finishing=self.is_finishing,
             has_transcript_file=(
                 self.current_transcript_file is not None
                 and os.path.exists(self.current_transcript_file)
             ),
         )
 
-    def _check_silence_loop(self):
-        """Check for silence and auto-stop if silence threshold is reached"""
-        while self.is_running and not self.stop_event.is_set():
-            if not self.is_paused:
-                silent_duration = time.time() - self.last_speech_time
-                if silent_duration > SILENCE_LIMIT_SECONDS:
-                    logging.info(
-                        f"Silence limit ({SILENCE_LIMIT_SECONDS}s) reached. Auto-stopping."
-                    )
-                    # Schedule the stop call in the main GUI thread
-                    self.gui.schedule_task(0, self.stop)
-                    break
-            time.sleep(1)
-
-    def _transcription_worker(self):
-        """Worker thread for handling transcription"""
+    def _register_gauges(self):
+        """Expose live session state, read from whichever client is current"""
+        def client_value(fn):
+            return lambda: fn(self.deepgram_client) if self.deepgram_client else 0
+
+        registry.gauge("session_active", "1 while a session is running", fn=lambda: int(self.is_running))
+        registry.gauge(
+            "silence_seconds", "Seconds since speech was last detected",
+            fn=lambda: round(time.time() - self.last_speech_time, 1) if self.is_running else 0,
+        )
+        registry.gauge("session_paused", "1 while the session is paused", fn=lambda: int(self.is_paused))
+        registry.gauge(
+            "deepgram_connected", "1 while the websocket is open",
+            fn=client_value(lambda c: int(bool(c.is_connected()))),
+        )
+        registry.gauge(
+            "output_queue_depth", "Utterances waiting to be typed",
+            fn=client_value(lambda c: c.output_queue.depth),
+        )
+        registry.gauge(
+            "output_queue_lag_seconds", "Age of the oldest utterance waiting to be typed",
+            fn=client_value(lambda c: c.output_queue.lag),
+        )
+        registry.gauge(
+            "replay_unacked_seconds", "Audio sent but not yet finalized by Deepgram",
+            fn=client_value(
+                lambda c: (c.replay_buffer.end - c.replay_buffer.acked) / c.replay_buffer.bytes_per_second
+                if c.replay_buffer else 0
+            ),
+        )
+
+    def _create_client(self):
+        """Create a transcription client wired to this agent"""
+        return DeepgramTranscriptionClient(
+            on_speech_detected=self.on_speech_detected,
+            on_speech_end=None,  # Not used currently
+            audio_source_factory=self.audio_source_factory,
+            sink_factory=self.sink_factory,
+            name=self.name,
+        )
+
+    def _session_subscribers(self):
+        """Transcript bus subscribers for this session, besides typing and the journal"""
+        subscribers = []
+        if SEARCH_INDEX_LIVE and self.current_transcript_file:
+            subscribers.append(SearchIndexSubscriber(self.current_transcript_file))
+        if self.stream_server:
+            subscribers.append(self.stream_server.feed())
+        if self.on_transcript:
+            subscribers.append(CallbackSubscriber(self.on_transcript))
+        return subscribers
+
+    async def _watch_silence(self):
+        """Return once the silence limit is reached.
+
+        Sleeps until the current deadline instead of polling; speech moves
+        the deadline, so on waking it is recomputed. Paused time does not
+        count: the watcher waits for resume and the deadline restarts then.
+        """
+        while True:
+            if self.is_paused:
+                await self._resumed.wait()
+                continue
+            remaining = self.last_speech_time + SILENCE_LIMIT_SECONDS - time.time()
+            if remaining <= 0:
+                logging.info(f"Silence limit ({SILENCE_LIMIT_SECONDS}s) reached. Auto-stopping.")
+                return
+            await asyncio.sleep(remaining)
+
+    async def _run_session(self):
+        """Run one transcription session on the session loop"""
+        session_context.set(self.name)
+        client = None
         try:
-            # Start deepgram client
-            success = self.deepgram_client.start(self.stop_event)
-            if not success:
-                logging.error("Failed to start Deepgram client")
-                self.gui.schedule_task(0, self.stop)
+            # Take over the pre-warmed connection if one is ready
+            client = await self.standby.acquire() if self.standby else None
+            if client:
+                logging.info("Using pre-warmed Deepgram connection")
+            else:
+                client = self._create_client()
+            self.deepgram_client = client
+            client.pause(self.is_paused)
+
+            if not await client.start(
+                self.requested_at,
+                journal=self.journal,
+                recorder=self.recorder,
+                subscribers=self._session_subscribers(),
+            ):
+                self.start_error = client.start_error or "Failed to start Deepgram client"
+                logging.error(f"Transcription session did not start: {self.start_error}")
                 return
 
-            # Keep thread alive while running and connection is open
-            while self.deepgram_client.is_connected() and not self.stop_event.is_set():
-                time.sleep(0.1)
+            ending = {
+                asyncio.ensure_future(self._stop_requested.wait()),
+                asyncio.ensure_future(self._watch_silence()),
+            }
+            try:
+                # Reconnect whenever the socket closes, until the session ends
+                while True:
+                    closed = asyncio.ensure_future(client.closed.wait())
+                    done, _ = await asyncio.wait(ending | {closed}, return_when=asyncio.FIRST_COMPLETED)
+                    if closed not in done:
+                        closed.cancel()
+                        break
+                    reconnect = asyncio.ensure_future(client.reconnect())
+                    done, _ = await asyncio.wait(ending | {reconnect}, return_when=asyncio.FIRST_COMPLETED)
+                    if reconnect not in done:
+                        reconnect.cancel()
+                        break
+                    if not reconnect.result():
+                        break
+            finally:
+                for task in ending:
+                    task.cancel()
 
         except Exception as e:
-            logging.exception(f"Fatal error in transcription worker: {e}")
+            logging.exception(f"Fatal error in transcription session: {e}")
         finally:
-            # Clean up resources
-            if self.deepgram_client:
-                self.deepgram_client.stop()
-
-            # Ensure stop is called if worker exits unexpectedly
-            if self.is_running:
-                logging.warning(
-                    "Transcription worker exited unexpectedly. Stopping agent."
-                )
+            # Ended on its own (silence, failure, gave up reconnecting):
+            # show the finishing state while the last words are flushed
+            if not self._stop_requested.is_set():
                 self.gui.schedule_task(0, self.stop)
+            # The journal is complete after the flush, so save while the
+            # socket closes and typing drains
+            if client:
+                await client.flush()
+            saving = asyncio.ensure_future(asyncio.to_thread(self._save_transcript))
+            if client:
+                await client.close()
+            await saving
+            self.gui.schedule_task(0, self._on_session_finished)
 
     def _save_transcript(self):
-        """Save the accumulated transcript to a file"""
-        if not self.deepgram_client or not self.current_transcript_file:
+        """Close the session journal and export the plain-text transcript from it"""
+        self._save_recording()
+        if not self.journal or not self.current_transcript_file:
             return
 
-        session_transcript = self.deepgram_client.session_transcript
-
-        if session_transcript:
-            full_transcript = "\n".join(session_transcript).strip()
-            if full_transcript:
-                try:
-                    with open(self.current_transcript_file, "w", encoding="utf-8") as f:
-                        f.write(full_transcript)
-                    logging.info(
-                        f"Session transcript saved to: {self.current_transcript_file}"
-                    )
-                except Exception as e:
-                    logging.error(f"Failed to save transcript: {e}")
+        try:
+            self.journal.close()
+            if not self.journal.records:
+                logging.info("No transcribed text to save for this session.")
+                return
+
+            count = self.journal.export_text(self.current_transcript_file)
+            if count:
+                logging.info(
+                    f"Session transcript saved to: {self.current_transcript_file}"
+                )
+                threading.Thread(
+                    target=index_session,
+                    args=(self.current_transcript_file,),
+                    daemon=True,
+                ).start()
             else:
                 logging.info("No transcribed text to save for this session.")
-        else:
-            logging.info("No transcribed text to save for this session.")
+        except Exception as e:
+            logging.error(f"Failed to save transcript: {e}")
+        finally:
+            self.saved_at = time.monotonic()
+
+    def _save_recording(self):
+        """Finish the session audio recording; empty recordings are removed"""
+        recorder = self.recorder
+        if not recorder:
+            return
+        try:
+            recorder.close()
+            if not recorder.size:
+                os.remove(recorder.path)
+                return
+            logging.info(f"Session audio saved to: {recorder.path} ({recorder.seconds:.1f}s)")
+            if self.refiner:
+                self.refiner.submit(recorder.path, self.current_transcript_file)
+        except Exception as e:
+            logging.error(f"Failed to save session audio: {e}")
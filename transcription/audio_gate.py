@@ -0,0 +1,76 @@
+import logging
+import threading
+import time
+
+from config import DG_SAMPLE_RATE
+
+BYTES_PER_SAMPLE = 2  # linear16
+
+
+class AudioGate:
+    """Open/close switch placed directly on the capture callback.
+
+    While closed, captured frames are dropped instead of being uploaded and
+    the socket is kept alive with KeepAlive messages, so reopening the gate
+    resumes streaming immediately without reconnecting.
+    """
+
+    def __init__(self, send, keepalive_timer, sample_rate=DG_SAMPLE_RATE, is_open=True):
+        self.send = send
+        self.keepalive_timer = keepalive_timer
+        self.sample_rate = sample_rate
+        self.withheld_bytes = 0
+        self._open = threading.Event()
+        self._closed_at = None
+        self._closed_bytes = 0
+        if is_open:
+            self._open.set()
+        else:
+            self._closed_at = time.monotonic()
+
+    def __call__(self, data):
+        """Forward a captured frame if the gate is open, otherwise drop it"""
+        if self._open.is_set():
+            self.send(data)
+            return
+
+        self.withheld_bytes += len(data)
+        self.keepalive_timer.tick()
+
+    @property
+    def is_open(self):
+        return self._open.is_set()
+
+    @property
+    def withheld_seconds(self):
+        """Seconds of captured audio that were not uploaded"""
+        return self.withheld_bytes / (self.sample_rate * BYTES_PER_SAMPLE)
+
+    def reset_counters(self):
+        """Forget audio withheld so far"""
+        self.withheld_bytes = 0
+        self._closed_bytes = 0
+
+    def open(self):
+        """Resume forwarding captured audio"""
+        if self._open.is_set():
+            return
+        self._open.set()
+        closed_for = time.monotonic() - self._closed_at
+        withheld = self.withheld_bytes - self._closed_bytes
+        log = logging.info if withheld else logging.debug
+        log(
+            f"Audio gate opened after {closed_for:.1f}s; "
+            f"withheld {withheld} bytes "
+            f"({withheld / (self.sample_rate * BYTES_PER_SAMPLE):.1f}s of audio)"
+        )
+
+    def close(self):
+        """Stop forwarding captured audio"""
+        if not self._open.is_set():
+            return
+        self._closed_at = time.monotonic()
+        self._closed_bytes = self.withheld_bytes
+        self._open.clear()
+        # Audio was flowing until now, so the idle clock starts here
+        self.keepalive_timer.mark_sent()
@@ -0,0 +1,109 @@
+import asyncio
+import logging
+
+from config import SEND_PACKET_MAX_BYTES
+
+
+class AudioSender:
+    """Moves audio frames from the capture thread onto one websocket connection.
+
+    Calling the sender from any thread queues the frame on the session loop;
+    a single task drains the queue and awaits each send, so frames go out
+    in capture order. With a ``packetizer`` whose hold is non-zero, the
+    task waits that long after the first frame and sends what is queued by
+    then, up to the packetizer's ``max_bytes``, as one message. Anything
+    larger than ``max_bytes`` (a replayed backlog, a burst of encoded
+    audio) is split into messages of at most that size. Each connection
+    gets its own sender, which makes swapping connections on reconnect a
+    matter of swapping senders.
+    """
+
+    def __init__(self, connection, loop, on_sent=None, packetizer=None):
+        self.connection = connection
+        self.loop = loop
+        self.on_sent = on_sent
+        self.packetizer = packetizer
+        self.max_bytes = packetizer.max_bytes if packetizer else SEND_PACKET_MAX_BYTES
+        self.failed = 0
+        self._queue = asyncio.Queue()
+        self._task = None
+
+    def start(self):
+        """Start the send task; must be called on the loop thread"""
+        self._task = asyncio.ensure_future(self._run())
+        return self
+
+    def __call__(self, data):
+        """Queue a frame for sending; safe to call from any thread"""
+        self.loop.call_soon_threadsafe(self._put, data, False)
+
+    def resend(self, data):
+        """Queue audio replayed after a reconnect, in messages of at most ``max_bytes``"""
+        self.loop.call_soon_threadsafe(self._put, data, True)
+
+    @property
+    def backlog(self):
+        """Frames queued but not yet sent"""
+        return self._queue.qsize()
+
+    async def drain(self):
+        """Wait until every queued frame has been sent"""
+        await self._queue.join()
+
+    async def stop(self):
+        """Cancel the send task, discarding queued frames"""
+        if self._task:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    def _put(self, data, replayed):
+        if len(data) <= self.max_bytes:
+            self._queue.put_nowait((data, replayed))
+            return
+        view = memoryview(data)
+        for start in range(0, len(data), self.max_bytes):
+            self._queue.put_nowait((bytes(view[start:start + self.max_bytes]), replayed))
+
+    async def _run(self):
+        carry = None  # Taken off the queue but too big for the last message
+        while True:
+            if carry:
+                batch, carry = [carry], None
+                backlog = True
+            else:
+                batch = [await self._queue.get()]
+                backlog = not self._queue.empty()
+            hold = self.packetizer.hold if self.packetizer else 0
+            waited = 0
+            try:
+                if hold > 0:
+                    # A backlog goes out at once; otherwise wait for more frames
+                    if not backlog:
+                        await asyncio.sleep(hold)
+                        waited = hold
+                    size = len(batch[0][0])
+                    while not self._queue.empty():
+                        item = self._queue.get_nowait()
+                        if size + len(item[0]) > self.max_bytes:
+                            carry = item
+                            break
+                        batch.append(item)
+                        size += len(item[0])
+                if self.on_sent:
+                    for data, replayed in batch:
+                        self.on_sent(data, replayed)
+                payload = batch[0][0] if len(batch) == 1 else b"".join(data for data, _ in batch)
+                started = self.loop.time()
+                if not await self.connection.send(payload):
+                    self.failed += 1
+                if self.packetizer:
+                    self.packetizer.on_packet(
+                        len(payload), len(batch), waited, self.loop.time() - started, self._queue.qsize()
+                    )
+            except Exception as e:
+                self.failed += 1
+                logging.error(f"Failed to send audio: {e}")
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
@@ -0,0 +1,80 @@
+import logging
+import threading
+import time
+import wave
+
+from transcription.capture import CaptureEngine
+from transcription.capture_process import IsolatedCapture
+from config import AUDIO_SOURCE, CAPTURE_ISOLATED, DG_SAMPLE_RATE, WAV_CHUNK_MS
+
+
+class WavFileSource:
+    """Streams a 16-bit mono WAV file in place of the microphone.
+
+    Mirrors the ``CaptureEngine`` interface (start/finish/is_active) and pushes
+    fixed-size chunks to the callback from its own thread, either paced in
+    real time or as fast as the callback accepts them.
+    """
+
+    def __init__(self, push_callback, path, chunk_ms=WAV_CHUNK_MS, realtime=True, on_finished=None):
+        self.push_callback = push_callback
+        self.path = path
+        self.chunk_ms = chunk_ms
+        self.realtime = realtime
+        self.on_finished = on_finished
+        self.finished = threading.Event()
+        self._exit = threading.Event()
+        self._thread = None
+
+        with wave.open(path, "rb") as wav:
+            if wav.getsampwidth() != 2 or wav.getnchannels() != 1:
+                raise ValueError(f"{path}: expected 16-bit mono audio")
+            if wav.getframerate() != DG_SAMPLE_RATE:
+                raise ValueError(f"{path}: expected {DG_SAMPLE_RATE} Hz, got {wav.getframerate()} Hz")
+            self.duration = wav.getnframes() / wav.getframerate()
+
+    def start(self):
+        """Start streaming the file"""
+        self._exit.clear()
+        self._thread = threading.Thread(target=self._stream, name="WavFileSource", daemon=True)
+        self._thread.start()
+        return True
+
+    def finish(self):
+        """Stop streaming"""
+        self._exit.set()
+        if self._thread and self._thread is not threading.current_thread():
+            self._thread.join(timeout=5)
+        return True
+
+    def is_active(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    def _stream(self):
+        with wave.open(self.path, "rb") as wav:
+            frames_per_chunk = int(wav.getframerate() * self.chunk_ms / 1000)
+            started = time.monotonic()
+            sent_seconds = 0.0
+            while not self._exit.is_set():
+                data = wav.readframes(frames_per_chunk)
+                if not data:
+                    break
+                if self.realtime:
+                    # Pace by audio time so chunks arrive as a live device would
+                    delay = started + sent_seconds - time.monotonic()
+                    if delay > 0:
+                        time.sleep(delay)
+                self.push_callback(data)
+                sent_seconds += len(data) / 2 / wav.getframerate()
+
+        logging.info(f"Finished streaming {self.path} ({sent_seconds:.1f}s)")
+        self.finished.set()
+        if self.on_finished:
+            self.on_finished()
+
+
+def create_audio_source(push_callback, source=AUDIO_SOURCE, isolated=CAPTURE_ISOLATED):
+    """Create the capture source selected in config ("microphone" or a WAV path)"""
+    if source == "microphone":
+        return IsolatedCapture(push_callback) if isolated else CaptureEngine(push_callback)
+    return WavFileSource(push_callback, source)
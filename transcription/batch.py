@@ -0,0 +1,345 @@
+"""Headless batch transcription of recorded audio through Deepgram's prerecorded API.
+
+Files are sent over a bounded pool of concurrent requests that share one
+HTTP connection pool. Each transcript is written to TRANSCRIPT_DIR in the
+same journal + text format as live sessions and added to the search index.
+Completed inputs are recorded in a manifest, so an interrupted run picks
+up where it left off.
+
+Usage:
+    python -m transcription.batch meeting.wav recordings/
+    python -m transcription.batch recordings/ --concurrency 8 --retries 5
+    python -m transcription.batch recordings/ --force
+"""
+import argparse
+import asyncio
+import datetime
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+
+import httpx
+from deepgram import DeepgramApiError, DeepgramClient, DeepgramClientOptions, PrerecordedOptions
+
+from transcription.journal import TranscriptJournal, journal_path_for
+from transcription.search_index import TranscriptIndex
+from transcription.segments import Segment
+from config import (
+    DG_URL,
+    DG_MODEL,
+    DG_LANGUAGE,
+    TRANSCRIPT_DIR,
+    BATCH_CONCURRENCY,
+    BATCH_MAX_RETRIES,
+    BATCH_RETRY_INITIAL_DELAY,
+    BATCH_RETRY_MAX_DELAY,
+    BATCH_REQUEST_TIMEOUT,
+    BATCH_MANIFEST_PATH,
+)
+
+AUDIO_EXTENSIONS = {".wav", ".mp3", ".flac", ".ogg", ".opus", ".m4a", ".mp4", ".aac", ".webm", ".wma"}
+
+# HTTP statuses worth retrying: rate limiting and server-side failures
+RETRY_STATUSES = {"408", "429", "500", "502", "503", "504"}
+
+
+class BatchManifest:
+    """Append-only JSONL record of inputs that were transcribed.
+
+    An input counts as done while its size and mtime match the record, so
+    a re-recorded file with the same name is transcribed again.
+    """
+
+    def __init__(self, path=BATCH_MANIFEST_PATH):
+        self.path = path
+        self._done = {}
+        self._lock = threading.Lock()
+        if os.path.exists(path):
+            with open(path, "r", encoding="utf-8", errors="replace") as f:
+                for line in f:
+                    try:
+                        record = json.loads(line)
+                    except json.JSONDecodeError:
+                        continue
+                    self._done[record["input"]] = record
+
+    def is_done(self, path):
+        record = self._done.get(os.path.abspath(path))
+        if not record:
+            return False
+        stat = os.stat(path)
+        return record["size"] == stat.st_size and record["mtime"] == stat.st_mtime
+
+    def record(self, path, transcript, audio_seconds):
+        stat = os.stat(path)
+        record = {
+            "input": os.path.abspath(path),
+            "size": stat.st_size,
+            "mtime": stat.st_mtime,
+            "transcript": transcript,
+            "audio_seconds": round(audio_seconds, 3),
+            "completed_at": round(time.time(), 3),
+        }
+        with self._lock:
+            self._done[record["input"]] = record
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(json.dumps(record, ensure_ascii=False) + "\n")
+
+
+class _SharedTransport(httpx.AsyncHTTPTransport):
+    """Connection pool that outlives the per-request clients the SDK creates"""
+
+    async def __aexit__(self, *exc_info):
+        pass
+
+    async def close(self):
+        await super().__aexit__(None, None, None)
+
+
+class BatchTranscriber:
+    """Transcribes files through a bounded pool of concurrent prerecorded requests"""
+
+    def __init__(
+        self,
+        manifest,
+        concurrency=BATCH_CONCURRENCY,
+        retries=BATCH_MAX_RETRIES,
+        output_dir=TRANSCRIPT_DIR,
+        force=False,
+    ):
+        self.manifest = manifest
+        self.concurrency = concurrency
+        self.retries = retries
+        self.output_dir = output_dir
+        self.force = force
+        self.completed = 0
+        self.failed = 0
+        self.skipped = 0
+        self.retried = 0
+        self.audio_seconds = 0.0
+        self.elapsed = 0.0
+        self._client = None
+        self._transport = None
+
+    async def run(self, files):
+        """Transcribe ``files``; returns the list of transcripts written"""
+        pending = []
+        for path in files:
+            if not self.force and self.manifest.is_done(path):
+                self.skipped += 1
+            else:
+                pending.append(path)
+        if self.skipped:
+            logging.info(f"Skipping {self.skipped} file(s) already in the manifest")
+        if not pending:
+            return []
+
+        self._transport = _SharedTransport(
+            limits=httpx.Limits(max_connections=self.concurrency, max_keepalive_connections=self.concurrency)
+        )
+        config = DeepgramClientOptions(url=DG_URL, verbose=logging.CRITICAL)
+        self._client = DeepgramClient(api_key=os.getenv("DEEPGRAM_API_KEY"), config=config)
+
+        queue = asyncio.Queue()
+        for path in pending:
+            queue.put_nowait(path)
+        transcripts = []
+
+        async def worker():
+            while True:
+                try:
+                    path = queue.get_nowait()
+                except asyncio.QueueEmpty:
+                    return
+                transcript = await self._process(path)
+                if transcript:
+                    transcripts.append(transcript)
+
+        started = time.monotonic()
+        try:
+            await asyncio.gather(*(worker() for _ in range(min(self.concurrency, len(pending)))))
+        finally:
+            self.elapsed = time.monotonic() - started
+            await self._transport.close()
+        return transcripts
+
+    @property
+    def speedup(self):
+        """Audio-hours transcribed per wall-clock hour"""
+        return self.audio_seconds / self.elapsed if self.elapsed else 0.0
+
+    def log_summary(self):
+        logging.info(
+            f"Batch: {self.completed} transcribed, {self.failed} failed, {self.skipped} skipped, "
+            f"{self.retried} retries; {self.audio_seconds / 3600:.2f} audio-hours in "
+            f"{self.elapsed:.1f}s wall ({self.speedup:.0f} audio-hours per wall-hour)"
+        )
+
+    async def _process(self, path):
+        try:
+            started = time.monotonic()
+            response = await self._transcribe(path)
+            transcript, duration = await asyncio.to_thread(self._save, path, response)
+        except Exception as e:
+            self.failed += 1
+            logging.error(f"Failed to transcribe {path}: {e}")
+            return None
+
+        self.completed += 1
+        self.audio_seconds += duration
+        elapsed = time.monotonic() - started
+        logging.info(
+            f"Transcribed {path} ({duration:.0f}s of audio in {elapsed:.1f}s) -> "
+            f"{transcript or 'no speech'}"
+        )
+        return transcript
+
+    async def _transcribe(self, path):
+        options = PrerecordedOptions(
+            model=DG_MODEL,
+            language=DG_LANGUAGE,
+            smart_format=True,
+            utterances=True,
+        )
+        return await transcribe_file(
+            self._client, path, options, retries=self.retries, transport=self._transport,
+            on_retry=self._on_retry,
+        )
+
+    def _on_retry(self):
+        self.retried += 1
+
+    def _save(self, path, response):
+        """Write the journal and text transcript, then record the input as done"""
+        txt_path = self._transcript_path(path)
+        written, duration = save_response(response, txt_path, endpoint="batch")
+        transcript = txt_path if written else None
+        self.manifest.record(path, transcript, duration)
+        return transcript, duration
+
+    def _transcript_path(self, path):
+        """transcript_<recording time>_<name>_<hash>.txt, so batch and live transcripts sort together.
+
+        The hash of the input's absolute path keeps ``a.wav`` and ``a.mp3``,
+        or same-named files from different directories, from overwriting
+        each other's transcript; rerunning one input still replaces its own.
+        """
+        recorded = datetime.datetime.fromtimestamp(os.stat(path).st_mtime)
+        stem = os.path.splitext(os.path.basename(path))[0]
+        source = hashlib.sha1(os.path.abspath(path).encode("utf-8")).hexdigest()[:8]
+        return os.path.join(self.output_dir, f"transcript_{recorded:%Y%m%d_%H%M%S}_{stem}_{source}.txt")
+
+
+async def transcribe_file(client, path, options, retries=BATCH_MAX_RETRIES, transport=None, on_retry=None):
+    """Send one file, retrying rate limits, server errors and dropped connections"""
+    payload = {"buffer": await asyncio.to_thread(_read_file, path)}
+    timeout = httpx.Timeout(BATCH_REQUEST_TIMEOUT, connect=10.0)
+    kwargs = {"transport": transport} if transport else {}
+
+    delay = BATCH_RETRY_INITIAL_DELAY
+    for attempt in range(1, retries + 2):
+        try:
+            return await client.listen.asyncrest.v("1").transcribe_file(
+                payload, options, timeout=timeout, **kwargs
+            )
+        except (DeepgramApiError, httpx.TransportError) as e:
+            retryable = not isinstance(e, DeepgramApiError) or str(e.status) in RETRY_STATUSES
+            if not retryable or attempt > retries:
+                raise
+            if on_retry:
+                on_retry()
+            logging.warning(f"Retrying {path} in {delay:.1f}s (attempt {attempt} failed: {e})")
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, BATCH_RETRY_MAX_DELAY)
+
+
+def save_response(response, txt_path, endpoint):
+    """Write a prerecorded response as a journal plus text transcript.
+
+    Returns ``(segments written, audio seconds)``; nothing is written when
+    there was no speech.
+    """
+    duration = response.metadata.duration if response.metadata else 0.0
+    segments = [
+        Segment.from_utterance(utterance)
+        for utterance in (response.results.utterances or ())
+        if utterance.transcript.strip()
+    ]
+    if not segments:
+        return 0, duration
+
+    journal_path = journal_path_for(txt_path)
+    if os.path.exists(journal_path):
+        os.remove(journal_path)  # Left by an interrupted run
+    journal = TranscriptJournal(journal_path, fsync_policy="never")
+    for segment in segments:
+        journal.append_utterance([segment], endpoint)
+    journal.close()
+    journal.export_text(txt_path)
+    return len(segments), duration
+
+
+def _read_file(path):
+    with open(path, "rb") as f:
+        return f.read()
+
+
+def collect_inputs(paths):
+    """Expand files and directories (recursively) into a sorted list of audio files"""
+    files = []
+    for path in paths:
+        if os.path.isdir(path):
+            for root, _, names in os.walk(path):
+                for name in names:
+                    if os.path.splitext(name)[1].lower() in AUDIO_EXTENSIONS:
+                        files.append(os.path.join(root, name))
+        elif os.path.isfile(path):
+            files.append(path)
+        else:
+            logging.warning(f"Input not found: {path}")
+    return sorted(set(files))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Transcribe recorded audio files with Deepgram")
+    parser.add_argument("inputs", nargs="+", help="Audio files or directories")
+    parser.add_argument("--concurrency", type=int, default=BATCH_CONCURRENCY, help="Requests in flight")
+    parser.add_argument("--retries", type=int, default=BATCH_MAX_RETRIES, help="Retries per file")
+    parser.add_argument("--manifest", default=BATCH_MANIFEST_PATH, help="Manifest of completed inputs")
+    parser.add_argument("--force", action="store_true", help="Transcribe inputs already in the manifest")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+    logging.getLogger("httpx").setLevel(logging.WARNING)  # One line per request otherwise
+    if not os.getenv("DEEPGRAM_API_KEY"):
+        parser.error("DEEPGRAM_API_KEY is not set")
+
+    files = collect_inputs(args.inputs)
+    if not files:
+        print("No audio files found.")
+        return
+
+    transcriber = BatchTranscriber(
+        BatchManifest(args.manifest),
+        concurrency=max(1, args.concurrency),
+        retries=max(0, args.retries),
+        force=args.force,
+    )
+    transcripts = asyncio.run(transcriber.run(files))
+    if transcripts:
+        index = TranscriptIndex()
+        try:
+            for txt_path in transcripts:
+                index.index_file(txt_path)
+        finally:
+            index.close()
+    transcriber.log_summary()
+    if transcriber.failed:
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,294 @@
+"""Microphone capture at the device's native rate.
+
+PortAudio delivers audio in the device's own format (often 44.1 or
+48 kHz). The stream callback only copies each buffer into a preallocated
+ring and returns; a worker thread downmixes, resamples to DG_SAMPLE_RATE
+and pushes fixed-size linear16 frames downstream. Overruns reported by
+PortAudio and frames dropped because the ring was full are counted.
+
+Usage:
+    python -m transcription.capture --list
+    python -m transcription.capture --seconds 10 --device "USB"
+"""
+import argparse
+import logging
+import threading
+
+import numpy as np
+
+from transcription.resampler import PolyphaseResampler
+from utils.metrics import registry
+from config import (
+    AUDIO_DEVICE,
+    DG_SAMPLE_RATE,
+    CAPTURE_FRAME_MS,
+    CAPTURE_RING_SECONDS,
+)
+
+_overruns = registry.counter("capture_overruns_total", "Input overflows reported by the audio device")
+_dropped_frames = registry.counter(
+    "capture_dropped_frames_total", "Captured frames dropped because the capture ring was full"
+)
+
+
+class AudioRingBuffer:
+    """Fixed-capacity int16 sample ring for one writer and one reader thread.
+
+    The writer only advances ``_write_pos`` and the reader only advances
+    ``_read_pos``, so neither blocks the other. Samples that do not fit
+    are dropped and their count returned.
+    """
+
+    def __init__(self, capacity):
+        self.capacity = capacity
+        self._buffer = np.zeros(capacity, dtype=np.int16)
+        self._write_pos = 0  # Total samples written
+        self._read_pos = 0  # Total samples read
+
+    @property
+    def available(self):
+        return self._write_pos - self._read_pos
+
+    def write(self, samples):
+        free = self.capacity - self.available
+        count = min(len(samples), free)
+        start = self._write_pos % self.capacity
+        first = min(count, self.capacity - start)
+        self._buffer[start:start + first] = samples[:first]
+        self._buffer[:count - first] = samples[first:count]
+        self._write_pos += count
+        return len(samples) - count
+
+    def read(self, count):
+        """Copy out and consume ``count`` samples (at most ``available``)"""
+        count = min(count, self.available)
+        start = self._read_pos % self.capacity
+        first = min(count, self.capacity - start)
+        out = np.concatenate((self._buffer[start:start + first], self._buffer[:count - first]))
+        self._read_pos += count
+        return out
+
+
+def list_input_devices(audio=None):
+    """Input devices as dicts with ``index``, ``name``, ``channels``, ``rate`` and ``default``"""
+    import pyaudio
+
+    owned = audio is None
+    audio = audio or pyaudio.PyAudio()
+    try:
+        try:
+            default = audio.get_default_input_device_info()["index"]
+        except OSError:
+            default = None
+        devices = []
+        for i in range(audio.get_device_count()):
+            info = audio.get_device_info_by_index(i)
+            if info["maxInputChannels"] < 1:
+                continue
+            devices.append({
+                "index": info["index"],
+                "name": info["name"],
+                "channels": info["maxInputChannels"],
+                "rate": int(info["defaultSampleRate"]),
+                "default": info["index"] == default,
+            })
+        return devices
+    finally:
+        if owned:
+            audio.terminate()
+
+
+def find_input_device(audio, device=AUDIO_DEVICE):
+    """Device info for an index, a case-insensitive name substring, or the default when empty"""
+    if not device:
+        return audio.get_default_input_device_info()
+    devices = list_input_devices(audio)
+    if str(device).isdigit():
+        matches = [d for d in devices if d["index"] == int(device)]
+    else:
+        matches = [d for d in devices if str(device).lower() in d["name"].lower()]
+    if not matches:
+        raise ValueError(f"No input device matches {device!r}")
+    return audio.get_device_info_by_index(matches[0]["index"])
+
+
+class CaptureEngine:
+    """Captures the microphone at its native rate and pushes DG_SAMPLE_RATE linear16 frames.
+
+    Drop-in replacement for the SDK's ``Microphone`` (start/finish/is_active). Each
+    pushed frame holds ``frame_ms`` of audio.
+    """
+
+    def __init__(
+        self,
+        push_callback,
+        device=AUDIO_DEVICE,
+        frame_ms=CAPTURE_FRAME_MS,
+        ring_seconds=CAPTURE_RING_SECONDS,
+        target_rate=DG_SAMPLE_RATE,
+    ):
+        self.push_callback = push_callback
+        self.device = device
+        self.frame_ms = frame_ms
+        self.ring_seconds = ring_seconds
+        self.target_rate = target_rate
+        self.device_name = None
+        self.native_rate = None
+        self.channels = 1
+        self.frames = 0
+        self.overruns = 0
+        self.dropped_frames = 0
+        self._audio = None
+        self._stream = None
+        self._ring = None
+        self._resampler = None
+        self._frame_samples = 0
+        self._ready = threading.Event()
+        self._exit = threading.Event()
+        self._thread = None
+
+    def start(self):
+        """Open the device and start capturing; returns False if it could not be opened"""
+        try:
+            self._stream = self._open_device()
+        except Exception as e:
+            logging.error(f"Could not open audio input device: {e}")
+            self._close_audio()
+            return False
+
+        self._ring = AudioRingBuffer(int(self.native_rate * self.ring_seconds) * self.channels)
+        self._resampler = PolyphaseResampler(self.native_rate, self.target_rate)
+        self._exit.clear()
+        self._thread = threading.Thread(target=self._worker, name="CaptureEngine", daemon=True)
+        self._thread.start()
+        self._stream.start_stream()
+        logging.info(
+            f"Capturing from {self.device_name} at {self.native_rate} Hz, {self.channels} channel(s), "
+            f"{self.frame_ms} ms frames, resampled to {self.target_rate} Hz"
+        )
+        return True
+
+    def finish(self):
+        """Stop capturing and close the device"""
+        self._close_audio()
+        self._exit.set()
+        self._ready.set()
+        if self._thread and self._thread is not threading.current_thread():
+            self._thread.join(timeout=5)
+        self._thread = None
+        if self.native_rate:
+            self.log_summary()
+        return True
+
+    def is_active(self):
+        return self._stream is not None and self._stream.is_active()
+
+    def log_summary(self):
+        seconds = self.frames * self.frame_ms / 1000
+        logging.info(
+            f"Capture: {self.frames} frames ({seconds:.1f}s), {self.overruns} device overrun(s), "
+            f"{self.dropped_frames} frame(s) dropped"
+        )
+
+    def _open_device(self):
+        """Open the input stream (not yet started) with ``_callback`` as its callback"""
+        import pyaudio
+
+        self._audio = pyaudio.PyAudio()
+        info = find_input_device(self._audio, self.device)
+        self.device_name = info["name"]
+        self.native_rate = int(info["defaultSampleRate"])
+        self._frame_samples = self.native_rate * self.frame_ms // 1000
+        kwargs = {
+            "format": pyaudio.paInt16,
+            "rate": self.native_rate,
+            "input": True,
+            "input_device_index": info["index"],
+            "frames_per_buffer": self._frame_samples,
+            "stream_callback": self._callback,
+            "start": False,
+        }
+        try:
+            self.channels = 1
+            return self._audio.open(channels=1, **kwargs)
+        except OSError:
+            # Some devices only open in stereo; the worker downmixes
+            self.channels = min(2, int(info["maxInputChannels"]))
+            if self.channels == 1:
+                raise
+            return self._audio.open(channels=self.channels, **kwargs)
+
+    def _callback(self, in_data, frame_count, time_info, status):
+        """PortAudio thread: copy into the ring and return immediately"""
+        if status & 0x2:  # paInputOverflow
+            self.overruns += 1
+            _overruns.inc()
+        dropped = self._ring.write(np.frombuffer(in_data, dtype=np.int16))
+        if dropped:
+            frames = -(-dropped // (self._frame_samples * self.channels))
+            self.dropped_frames += frames
+            _dropped_frames.inc(frames)
+        self._ready.set()
+        return None, 0  # paContinue
+
+    def _worker(self):
+        block = self._frame_samples * self.channels
+        while not self._exit.is_set():
+            self._ready.wait(0.5)
+            self._ready.clear()
+            while self._ring.available >= block and not self._exit.is_set():
+                samples = self._ring.read(block)
+                if self.channels > 1:
+                    samples = samples.reshape(-1, self.channels).mean(axis=1)
+                self.frames += 1
+                try:
+                    self.push_callback(self._resampler.process(samples).tobytes())
+                except Exception as e:
+                    logging.error(f"Error handling captured audio: {e}")
+
+    def _close_audio(self):
+        if self._stream:
+            try:
+                self._stream.stop_stream()
+                self._stream.close()
+            except OSError as e:
+                logging.warning(f"Error closing audio stream: {e}")
+            self._stream = None
+        if self._audio:
+            self._audio.terminate()
+            self._audio = None
+
+
+def main():
+    parser = argparse.ArgumentParser(description="List input devices or test microphone capture")
+    parser.add_argument("--list", action="store_true", help="List input devices and their native rates")
+    parser.add_argument("--device", default=AUDIO_DEVICE, help="Device index or name substring")
+    parser.add_argument("--seconds", type=float, default=5, help="Test capture length")
+    parser.add_argument("--frame-ms", type=int, default=CAPTURE_FRAME_MS, help="Capture frame size")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+    if args.list:
+        for d in list_input_devices():
+            marker = "*" if d["default"] else " "
+            print(f"{marker} {d['index']:>3}  {d['name']}  ({d['channels']} ch, {d['rate']} Hz)")
+        return
+
+    levels = []
+
+    def on_frame(data):
+        samples = np.frombuffer(data, dtype=np.int16).astype(np.float32)
+        levels.append(float(np.sqrt(np.mean(samples ** 2))) if len(samples) else 0.0)
+
+    engine = CaptureEngine(on_frame, device=args.device, frame_ms=args.frame_ms)
+    if not engine.start():
+        raise SystemExit(1)
+    threading.Event().wait(args.seconds)
+    engine.finish()
+    if levels:
+        peak = 20 * np.log10(max(levels) / 32768 + 1e-9)
+        print(f"{len(levels)} frames, peak frame level {peak:.1f} dBFS")
+
+
+if __name__ == "__main__":
+    main()
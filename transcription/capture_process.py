@@ -0,0 +1,255 @@
+"""Microphone capture in a separate process.
+
+Capture, the Deepgram handlers, typing and the Tk mainloop share one GIL,
+so a long-running call on any of them can delay the PortAudio callback
+long enough for the device buffer to overflow. ``IsolatedCapture`` runs
+the ``CaptureEngine`` (device callback, ring and resampler) in its own
+process. Resampled frames come back through a shared-memory ring whose
+read and write positions are each advanced by one side only, so neither
+process ever waits on a lock.
+"""
+import logging
+import multiprocessing
+import threading
+import time
+from multiprocessing import shared_memory
+
+import numpy as np
+
+from transcription.capture import CaptureEngine
+from config import (
+    AUDIO_DEVICE,
+    DG_SAMPLE_RATE,
+    CAPTURE_FRAME_MS,
+    CAPTURE_SHM_SECONDS,
+)
+
+BYTES_PER_SAMPLE = 2  # linear16
+
+# Header slots (uint64). The two positions sit on separate cache lines.
+_WRITE_POS = 0
+_OVERRUNS = 1
+_DROPPED_FRAMES = 2
+_FRAMES = 3
+_RING_DROPPED = 4
+_READ_POS = 8
+HEADER_SIZE = 128
+
+
+class SharedRingBuffer:
+    """Single-producer, single-consumer byte ring in ``multiprocessing.shared_memory``.
+
+    Positions are running byte totals stored as aligned 64-bit words. The
+    producer copies data in before publishing the new write position; the
+    consumer reads in place with ``peek()`` and releases the space with
+    ``consume()``. A write that does not fit is dropped whole and counted.
+    The producer also publishes its capture counters in the header.
+    """
+
+    def __init__(self, name=None, capacity=0):
+        create = name is None
+        self._shm = shared_memory.SharedMemory(name=name, create=create, size=HEADER_SIZE + capacity)
+        self.name = self._shm.name
+        self.capacity = self._shm.size - HEADER_SIZE if create else capacity
+        self._header = np.ndarray((HEADER_SIZE // 8,), dtype=np.uint64, buffer=self._shm.buf)
+        self._data = np.ndarray((self.capacity,), dtype=np.uint8, buffer=self._shm.buf, offset=HEADER_SIZE)
+        self._owner = create
+        if create:
+            self._header[:] = 0
+
+    @property
+    def available(self):
+        return int(self._header[_WRITE_POS]) - int(self._header[_READ_POS])
+
+    def write(self, data):
+        """Producer: append ``data``; returns False if it was dropped for lack of space"""
+        size = len(data)
+        write_pos = int(self._header[_WRITE_POS])
+        if size > self.capacity - (write_pos - int(self._header[_READ_POS])):
+            self._header[_RING_DROPPED] += 1
+            return False
+        source = np.frombuffer(data, dtype=np.uint8)
+        start = write_pos % self.capacity
+        first = min(size, self.capacity - start)
+        self._data[start:start + first] = source[:first]
+        self._data[:size - first] = source[first:]
+        self._header[_FRAMES] += 1
+        self._header[_WRITE_POS] = write_pos + size
+        return True
+
+    def peek(self, count):
+        """Consumer: the next ``count`` bytes, in place when they don't wrap; None if not yet written"""
+        if self.available < count:
+            return None
+        start = int(self._header[_READ_POS]) % self.capacity
+        if start + count <= self.capacity:
+            return self._shm.buf[HEADER_SIZE + start:HEADER_SIZE + start + count]
+        return np.concatenate((self._data[start:], self._data[:start + count - self.capacity])).tobytes()
+
+    def consume(self, count):
+        """Consumer: release ``count`` bytes returned by ``peek()``"""
+        self._header[_READ_POS] = int(self._header[_READ_POS]) + count
+
+    def set_counters(self, overruns, dropped_frames):
+        """Producer: publish the capture engine's own counters"""
+        self._header[_OVERRUNS] = overruns
+        self._header[_DROPPED_FRAMES] = dropped_frames
+
+    @property
+    def counters(self):
+        return {
+            "frames": int(self._header[_FRAMES]),
+            "overruns": int(self._header[_OVERRUNS]),
+            "dropped_frames": int(self._header[_DROPPED_FRAMES]) + int(self._header[_RING_DROPPED]),
+        }
+
+    def close(self):
+        if not self._shm:
+            return
+        # Views into the segment must go before it can be closed
+        self._header = self._data = None
+        self._shm.close()
+        if self._owner:
+            self._shm.unlink()
+        self._shm = None
+
+
+def _capture_main(ring_name, capacity, engine_factory, device, frame_ms, stop, conn):
+    """Capture process entry point: run the engine into the shared ring until ``stop`` is set"""
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+    ring = SharedRingBuffer(ring_name, capacity)
+    engine = engine_factory(ring.write, device=device, frame_ms=frame_ms)
+    try:
+        if not engine.start():
+            conn.send({"error": "could not open the audio input device"})
+            return
+        conn.send({"device": engine.device_name, "rate": engine.native_rate, "channels": engine.channels})
+        while not stop.wait(0.25):
+            ring.set_counters(engine.overruns, engine.dropped_frames)
+        engine.finish()
+        ring.set_counters(engine.overruns, engine.dropped_frames)
+    except Exception as e:
+        conn.send({"error": str(e)})
+    finally:
+        conn.close()
+        ring.close()
+
+
+class IsolatedCapture:
+    """Runs a ``CaptureEngine`` in a child process and streams its frames from shared memory.
+
+    Same interface as ``CaptureEngine`` (start/finish/is_active). A reader
+    thread in this process polls the ring every half frame and pushes
+    each frame downstream as bytes; that is its only copy, and it is
+    needed because the replay buffer keeps frames after they are sent.
+    """
+
+    def __init__(
+        self,
+        push_callback,
+        device=AUDIO_DEVICE,
+        frame_ms=CAPTURE_FRAME_MS,
+        shm_seconds=CAPTURE_SHM_SECONDS,
+        engine_factory=CaptureEngine,
+    ):
+        self.push_callback = push_callback
+        self.device = device
+        self.frame_ms = frame_ms
+        self.shm_seconds = shm_seconds
+        self.engine_factory = engine_factory
+        self.frame_bytes = DG_SAMPLE_RATE * frame_ms // 1000 * BYTES_PER_SAMPLE
+        self.frames = 0
+        self.overruns = 0
+        self.dropped_frames = 0
+        self._ring = None
+        self._process = None
+        self._stop = None
+        self._exit = threading.Event()
+        self._thread = None
+        # A fresh interpreter, so the child shares nothing with the GUI process
+        self._context = multiprocessing.get_context("spawn")
+
+    def start(self):
+        """Start the capture process; returns False if it could not open the device"""
+        self._ring = SharedRingBuffer(capacity=int(DG_SAMPLE_RATE * self.shm_seconds) * BYTES_PER_SAMPLE)
+        self._stop = self._context.Event()
+        parent, child = self._context.Pipe(duplex=False)
+        self._process = self._context.Process(
+            target=_capture_main,
+            args=(self._ring.name, self._ring.capacity, self.engine_factory, self.device,
+                  self.frame_ms, self._stop, child),
+            name="CaptureProcess",
+            daemon=True,
+        )
+        self._process.start()
+        child.close()
+
+        info = parent.recv() if parent.poll(15) else {"error": "capture process did not start"}
+        parent.close()
+        if "error" in info:
+            logging.error(f"Isolated capture failed: {info['error']}")
+            self._stop_process()
+            self._ring.close()
+            self._ring = None
+            return False
+
+        self._exit.clear()
+        self._thread = threading.Thread(target=self._reader, name="IsolatedCaptureReader", daemon=True)
+        self._thread.start()
+        logging.info(
+            f"Capturing from {info['device']} at {info['rate']} Hz in process {self._process.pid}"
+        )
+        return True
+
+    def finish(self):
+        """Stop the capture process, deliver what it captured and release the ring"""
+        if not self._process:
+            return True
+        self._stop_process()
+        self._exit.set()
+        if self._thread and self._thread is not threading.current_thread():
+            self._thread.join(timeout=5)
+        self._thread = None
+        counters = self._ring.counters
+        self.overruns = counters["overruns"]
+        self.dropped_frames = counters["dropped_frames"]
+        self._ring.close()
+        self._ring = None
+        self.log_summary()
+        return True
+
+    def is_active(self):
+        return self._process is not None and self._process.is_alive()
+
+    def log_summary(self):
+        seconds = self.frames * self.frame_ms / 1000
+        logging.info(
+            f"Isolated capture: {self.frames} frames ({seconds:.1f}s), {self.overruns} device "
+            f"overrun(s), {self.dropped_frames} frame(s) dropped"
+        )
+
+    def _reader(self):
+        poll = self.frame_ms / 2000
+        while True:
+            frame = self._ring.peek(self.frame_bytes)
+            if frame is None:
+                if self._exit.is_set():
+                    return
+                time.sleep(poll)
+                continue
+            data = bytes(frame)
+            frame = None  # Release the view before the space is reused
+            self._ring.consume(self.frame_bytes)
+            self.frames += 1
+            try:
+                self.push_callback(data)
+            except Exception as e:
+                logging.error(f"Error handling captured audio: {e}")
+
+    def _stop_process(self):
+        self._stop.set()
+        self._process.join(timeout=5)
+        if self._process.is_alive():
+            self._process.terminate()
+            self._process.join()
+        self._process = None
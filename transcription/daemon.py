@@ -0,0 +1,441 @@
+"""Headless transcription service controlled over a Unix-domain socket.
+
+Runs any number of named sessions in one process, each with its own
+audio source and output sink, and no Tk. Clients send one JSON object
+per line and get one JSON reply per line:
+
+    {"cmd": "start", "session": "notes", "source": "microphone", "sink": "file", "sink_path": "notes.txt"}
+    {"cmd": "stop", "session": "notes"}
+    {"cmd": "pause", "session": "notes", "paused": true}      # omit "paused" to toggle
+    {"cmd": "status"}                                         # or {"cmd": "status", "session": "notes"}
+    {"cmd": "subscribe", "session": "notes"}                  # then a stream of event lines
+    {"cmd": "shutdown"}
+
+Replies are ``{"ok": true, ...}`` or ``{"ok": false, "error": "..."}``, and
+echo the request's ``id`` if it had one. Subscribers receive ``state``
+events whenever a session changes state and a ``transcript`` event for
+every committed utterance. ``source`` is "microphone" or the path of
+a 16-bit mono WAV file; a file session stops by itself shortly after the
+file ends.
+
+Usage:
+    python -m transcription.daemon
+    python -m transcription.daemon --socket /tmp/stt.sock
+"""
+import argparse
+import asyncio
+import concurrent.futures
+import datetime
+import json
+import logging
+import os
+import re
+import signal
+import socket
+import time
+
+from transcription.agent import TranscriptionAgent
+from transcription.audio_sources import WavFileSource, create_audio_source
+from transcription.journal import recover_journals
+from transcription.refine import RefinementScheduler
+from transcription.session_loop import SessionLoop
+from transcription.sinks import create_sink
+from transcription.transcript_stream import TranscriptStreamServer
+from ui.headless import HeadlessGUI
+from utils.logger import setup_session_logger, session_context
+from config import (
+    LOG_DIR,
+    TRANSCRIPT_DIR,
+    OUTPUT_SINK,
+    RECORDING_ENABLED,
+    REFINE_ENABLED,
+    SESSION_STOP_TIMEOUT,
+    TRANSCRIPT_STREAM_PORT,
+    DAEMON_SOCKET_PATH,
+    DAEMON_MAX_SESSIONS,
+    DAEMON_SUBSCRIBER_QUEUE,
+    DAEMON_FILE_DRAIN_SECONDS,
+)
+
+SESSION_NAME = re.compile(r"^[A-Za-z0-9_-]{1,32}$")
+SINK_NAMES = ("typewrite", "bulk", "paste", "stdout", "file")
+
+
+class DaemonError(Exception):
+    """A request the daemon cannot carry out; reported to the client"""
+
+
+class _SessionView:
+    """The GUI interface TranscriptionAgent expects, for one daemon session.
+
+    Scheduled tasks run on the daemon's control thread, in the session's
+    logging context; state updates are published to subscribers.
+    """
+
+    def __init__(self, daemon, name):
+        self.daemon = daemon
+        self.name = name
+
+    def set_command_callbacks(self, toggle_func, pause_func, transcript_func, stop_func):
+        pass
+
+    def add_escape_handler(self, handler):
+        pass
+
+    def update_state(self, is_running, is_paused, has_transcript_file, is_finishing=False):
+        self.daemon.publish_state(self.name)
+
+    def schedule_task(self, delay, callback):
+        self.daemon.schedule(delay, self.name, callback)
+
+
+class SessionSlot:
+    """A named session and the agent running its current (or last) run"""
+
+    def __init__(self, name, source, sink, sink_path):
+        self.name = name
+        self.source = source
+        self.sink = sink
+        self.sink_path = sink_path
+        self.agent = None
+        self.started_at = None
+
+    @property
+    def running(self):
+        return bool(self.agent and self.agent.is_running)
+
+    def status(self):
+        agent = self.agent
+        client = agent.deepgram_client if agent else None
+        return {
+            "session": self.name,
+            "running": self.running,
+            "paused": bool(agent and agent.is_paused),
+            "finishing": bool(agent and agent.is_finishing),
+            "source": self.source,
+            "sink": self.sink,
+            "transcript": agent.current_transcript_file if agent else None,
+            "connected": bool(client and client.is_connected()),
+            "utterances": len(client.session_transcript) if client else 0,
+            "started_at": self.started_at,
+            "error": agent.start_error if agent else None,
+        }
+
+
+class TranscriptionDaemon:
+    """Hosts named transcription sessions and serves the socket API.
+
+    Agents are only touched from the control thread (the thread that calls
+    ``run()``), the same single-thread rule the GUI keeps. The socket
+    server and all sessions' websockets share one session loop.
+    """
+
+    def __init__(self, socket_path=DAEMON_SOCKET_PATH, max_sessions=DAEMON_MAX_SESSIONS):
+        self.socket_path = socket_path
+        self.max_sessions = max_sessions
+        self.sessions = {}
+        self.control = HeadlessGUI()
+        self.session_loop = SessionLoop()
+        self.refiner = None
+        self.stream_server = None
+        self.log_handler = None
+        self._subscribers = {}  # asyncio.Queue -> session name or None for all
+        self._server = None
+        self._stopping = False
+
+    def run(self):
+        """Serve until shut down by a client or a signal"""
+        timestamp = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
+        self.log_handler = setup_session_logger(
+            os.path.join(LOG_DIR, f"session_{timestamp}_daemon.log"), session_prefixes=True
+        )
+        self._prepare_socket()
+        recover_journals(TRANSCRIPT_DIR)
+        if REFINE_ENABLED and RECORDING_ENABLED:
+            self.refiner = RefinementScheduler().start()
+        if TRANSCRIPT_STREAM_PORT:
+            self.stream_server = TranscriptStreamServer()
+            if not self.stream_server.start():
+                self.stream_server = None
+
+        self.session_loop.start()
+        self._server = self.session_loop.submit(
+            asyncio.start_unix_server(self._serve_client, path=self.socket_path)
+        ).result()
+        os.chmod(self.socket_path, 0o600)
+        logging.info(f"Transcription daemon listening on {self.socket_path}")
+
+        for signum in (signal.SIGINT, signal.SIGTERM):
+            signal.signal(signum, lambda *_: self.control.schedule_task(0, self.shutdown))
+        self.control.start()
+        logging.info("Transcription daemon stopped")
+        self.log_handler.close()
+
+    def shutdown(self):
+        """Stop every session, close the socket and end ``run()``; control thread only"""
+        if self._stopping:
+            return
+        self._stopping = True
+        logging.info("Shutting down transcription daemon...")
+        for slot in self.sessions.values():
+            if slot.running:
+                self._call_in_session(slot.name, slot.agent.stop)
+        for slot in self.sessions.values():
+            if slot.agent:
+                self._call_in_session(slot.name, slot.agent.shutdown)
+
+        async def close_server():
+            self._server.close()
+            await self._server.wait_closed()
+
+        try:
+            self.session_loop.submit(close_server()).result(SESSION_STOP_TIMEOUT)
+        except Exception as e:
+            logging.warning(f"Daemon socket did not close cleanly: {e}")
+        self.session_loop.stop()
+        if self.refiner:
+            self.refiner.shutdown()
+        if self.stream_server:
+            self.stream_server.stop()
+        if os.path.exists(self.socket_path):
+            os.remove(self.socket_path)
+        self.control.quit()
+
+    def schedule(self, delay, name, callback):
+        """Run ``callback`` on the control thread in session ``name``'s logging context"""
+        self.control.schedule_task(delay, lambda: self._call_in_session(name, callback))
+
+    def publish(self, event):
+        """Queue an event for matching subscribers; safe to call from any thread"""
+        self.session_loop.call_soon(self._fan_out, event)
+
+    def publish_state(self, name):
+        slot = self.sessions.get(name)
+        if slot:
+            self.publish(dict(slot.status(), event="state"))
+
+    # Commands; these run on the control thread
+
+    def start_session(self, name="default", source="microphone", sink=OUTPUT_SINK, sink_path=None, realtime=True):
+        if not SESSION_NAME.match(name or ""):
+            raise DaemonError("session names are 1-32 letters, digits, '-' or '_'")
+        if self._stopping:
+            raise DaemonError("daemon is shutting down")
+        slot = self.sessions.get(name)
+        if slot and slot.running:
+            raise DaemonError(f"session {name} is already running")
+        running = sum(1 for s in self.sessions.values() if s.running)
+        if running >= self.max_sessions:
+            raise DaemonError(f"{running} sessions already running (limit {self.max_sessions})")
+        if source != "microphone" and not os.path.isfile(source):
+            raise DaemonError(f"audio source not found: {source}")
+        if sink not in SINK_NAMES:
+            raise DaemonError(f"unknown sink: {sink}")
+        if sink == "file" and not sink_path:
+            raise DaemonError("the file sink needs sink_path")
+
+        slot = SessionSlot(name, source, sink, sink_path)
+        slot.agent = TranscriptionAgent(
+            _SessionView(self, name),
+            audio_source_factory=self._audio_source_factory(slot, realtime),
+            sink_factory=lambda: create_sink(sink, sink_path),
+            name=name,
+            session_loop=self.session_loop,
+            refiner=self.refiner,
+            standalone=False,
+            on_transcript=lambda event: self.publish(dict(event.to_dict(), event="transcript")),
+            stream_server=self.stream_server,
+        )
+        self.sessions[name] = slot
+        slot.started_at = time.time()
+        slot.agent.start()
+        return slot.status()
+
+    def stop_session(self, name):
+        slot = self._running_slot(name)
+        slot.agent.stop()
+        return slot.status()
+
+    def pause_session(self, name, paused=None):
+        slot = self._running_slot(name)
+        if paused is None or bool(paused) != slot.agent.is_paused:
+            slot.agent.toggle_pause()
+        return slot.status()
+
+    def status(self, name=None):
+        if name is None:
+            return [slot.status() for slot in self.sessions.values()]
+        if name not in self.sessions:
+            raise DaemonError(f"no session named {name}")
+        return [self.sessions[name].status()]
+
+    # Internals
+
+    def _running_slot(self, name):
+        slot = self.sessions.get(name)
+        if not slot or not slot.running:
+            raise DaemonError(f"session {name} is not running")
+        return slot
+
+    def _audio_source_factory(self, slot, realtime):
+        if slot.source == "microphone":
+            return lambda push: create_audio_source(push, "microphone")
+
+        def on_finished():
+            # Give Deepgram time to return the last words, then stop
+            self.schedule(DAEMON_FILE_DRAIN_SECONDS * 1000, slot.name, lambda: self._stop_if_running(slot))
+
+        return lambda push: WavFileSource(push, slot.source, realtime=realtime, on_finished=on_finished)
+
+    def _stop_if_running(self, slot):
+        agent = slot.agent
+        if agent and agent.is_running and not agent.is_finishing:
+            agent.stop()
+
+    def _call_in_session(self, name, callback):
+        token = session_context.set(name)
+        try:
+            return callback()
+        finally:
+            session_context.reset(token)
+
+    def _prepare_socket(self):
+        """Refuse to start if another daemon is listening; remove a stale socket file"""
+        if not hasattr(socket, "AF_UNIX"):
+            raise SystemExit("The daemon needs Unix-domain sockets, which this platform lacks")
+        if not os.path.exists(self.socket_path):
+            return
+        probe = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        try:
+            probe.connect(self.socket_path)
+        except OSError:
+            os.remove(self.socket_path)
+            return
+        finally:
+            probe.close()
+        raise SystemExit(f"Another daemon is already listening on {self.socket_path}")
+
+    async def _on_control(self, fn, *args, **kwargs):
+        """Run ``fn`` on the control thread and await its result"""
+        future = concurrent.futures.Future()
+        session = kwargs.get("name")
+
+        def run():
+            try:
+                future.set_result(self._call_in_session(session, lambda: fn(*args, **kwargs)))
+            except Exception as e:
+                future.set_exception(e)
+
+        self.control.schedule_task(0, run)
+        return await asyncio.wrap_future(future)
+
+    def _fan_out(self, event):
+        name = event.get("session")
+        for queue, session in self._subscribers.items():
+            if session is not None and session != name:
+                continue
+            try:
+                queue.put_nowait(event)
+            except asyncio.QueueFull:
+                queue.dropped = getattr(queue, "dropped", 0) + 1
+
+    async def _serve_client(self, reader, writer):
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    return
+                try:
+                    request = json.loads(line)
+                    if not isinstance(request, dict):
+                        raise ValueError("expected a JSON object")
+                except ValueError as e:
+                    await self._reply(writer, {"ok": False, "error": f"bad request: {e}"})
+                    continue
+                if request.get("cmd") == "subscribe":
+                    await self._stream_events(request, writer)
+                    return
+                await self._reply(writer, await self._dispatch(request))
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        except asyncio.CancelledError:
+            # Shutdown cancels open connections; asyncio logs handlers that end cancelled
+            pass
+        except Exception as e:
+            logging.error(f"Daemon client error: {e}")
+        finally:
+            writer.close()
+
+    async def _dispatch(self, request):
+        cmd = request.get("cmd")
+        name = request.get("session")
+        reply = {"id": request["id"]} if "id" in request else {}
+        try:
+            if cmd == "start":
+                result = await self._on_control(
+                    self.start_session,
+                    name=name or "default",
+                    source=request.get("source", "microphone"),
+                    sink=request.get("sink", OUTPUT_SINK),
+                    sink_path=request.get("sink_path"),
+                    realtime=request.get("realtime", True),
+                )
+                reply.update(ok=True, session=result)
+            elif cmd == "stop":
+                reply.update(ok=True, session=await self._on_control(self.stop_session, name=name))
+            elif cmd == "pause":
+                result = await self._on_control(self.pause_session, name=name, paused=request.get("paused"))
+                reply.update(ok=True, session=result)
+            elif cmd == "status":
+                reply.update(ok=True, sessions=await self._on_control(self.status, name=name))
+            elif cmd == "shutdown":
+                self.control.schedule_task(0, self.shutdown)
+                reply.update(ok=True)
+            else:
+                reply.update(ok=False, error=f"unknown command: {cmd}")
+        except DaemonError as e:
+            reply.update(ok=False, error=str(e))
+        except Exception as e:
+            logging.exception(f"Daemon command {cmd} failed: {e}")
+            reply.update(ok=False, error=str(e))
+        return reply
+
+    async def _stream_events(self, request, writer):
+        """Send state snapshots, then every event for the session (or all) until the client leaves"""
+        name = request.get("session")
+        queue = asyncio.Queue(maxsize=DAEMON_SUBSCRIBER_QUEUE)
+        reply = {"id": request["id"]} if "id" in request else {}
+        await self._reply(writer, dict(reply, ok=True))
+        self._subscribers[queue] = name
+        try:
+            for status in await self._on_control(self.status):
+                if name is None or status["session"] == name:
+                    queue.put_nowait(dict(status, event="state"))
+            while True:
+                event = await queue.get()
+                dropped = getattr(queue, "dropped", 0)
+                if dropped:
+                    queue.dropped = 0
+                    await self._reply(writer, {"event": "dropped", "count": dropped})
+                await self._reply(writer, event)
+        finally:
+            self._subscribers.pop(queue, None)
+
+    async def _reply(self, writer, message):
+        writer.write(json.dumps(message, ensure_ascii=False).encode("utf-8") + b"\n")
+        await writer.drain()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the headless transcription daemon")
+    parser.add_argument("--socket", default=DAEMON_SOCKET_PATH, help="Unix-domain socket path")
+    parser.add_argument("--max-sessions", type=int, default=DAEMON_MAX_SESSIONS, help="Concurrent session limit")
+    args = parser.parse_args()
+
+    if not os.getenv("DEEPGRAM_API_KEY"):
+        parser.error("DEEPGRAM_API_KEY is not set")
+    TranscriptionDaemon(args.socket, max(1, args.max_sessions)).run()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,218 @@
+"""Client for the transcription daemon's socket API.
+
+Usage:
+    python -m transcription.daemon_client status
+    python -m transcription.daemon_client start notes --source meeting.wav --sink file --sink-path notes.txt
+    python -m transcription.daemon_client pause notes
+    python -m transcription.daemon_client stop notes
+    python -m transcription.daemon_client subscribe [notes]
+    python -m transcription.daemon_client shutdown
+"""
+import argparse
+import json
+import logging
+import socket
+import threading
+
+from transcription.agent import open_transcript
+from config import DAEMON_SOCKET_PATH, DAEMON_GUI_SESSION
+
+
+class DaemonError(Exception):
+    """The daemon refused a request or could not be reached"""
+
+
+class DaemonClient:
+    """Sends requests to a running daemon, one connection per request"""
+
+    def __init__(self, socket_path=DAEMON_SOCKET_PATH, timeout=10):
+        self.socket_path = socket_path
+        self.timeout = timeout
+
+    def request(self, cmd, **params):
+        """Send one command and return the daemon's reply; raises DaemonError on failure"""
+        message = dict(params, cmd=cmd)
+        with self._connect() as conn:
+            conn.sendall(json.dumps(message).encode("utf-8") + b"\n")
+            line = conn.makefile("rb").readline()
+        if not line:
+            raise DaemonError("daemon closed the connection")
+        reply = json.loads(line)
+        if not reply.get("ok"):
+            raise DaemonError(reply.get("error", "request failed"))
+        return reply
+
+    def start(self, session, source="microphone", sink=None, sink_path=None, realtime=True):
+        params = {"session": session, "source": source, "realtime": realtime}
+        if sink:
+            params["sink"] = sink
+        if sink_path:
+            params["sink_path"] = sink_path
+        return self.request("start", **params)["session"]
+
+    def stop(self, session):
+        return self.request("stop", session=session)["session"]
+
+    def pause(self, session, paused=None):
+        params = {"session": session}
+        if paused is not None:
+            params["paused"] = paused
+        return self.request("pause", **params)["session"]
+
+    def status(self, session=None):
+        params = {"session": session} if session else {}
+        return self.request("status", **params)["sessions"]
+
+    def shutdown(self):
+        self.request("shutdown")
+
+    def subscribe(self, session=None, stop=None):
+        """Yield events for ``session`` (or every session) until the daemon or ``stop`` ends it"""
+        conn = self._connect()
+        conn.settimeout(None)
+        params = {"session": session} if session else {}
+        try:
+            conn.sendall(json.dumps(dict(params, cmd="subscribe")).encode("utf-8") + b"\n")
+            stream = conn.makefile("rb")
+            reply = json.loads(stream.readline() or b"{}")
+            if not reply.get("ok"):
+                raise DaemonError(reply.get("error", "subscribe failed"))
+            if stop:
+                # Closing the socket wakes the blocked readline below
+                threading.Thread(target=lambda: (stop.wait(), conn.shutdown(socket.SHUT_RDWR)), daemon=True).start()
+            for line in stream:
+                yield json.loads(line)
+        except OSError:
+            if not (stop and stop.is_set()):
+                raise
+        finally:
+            conn.close()
+
+    def is_available(self):
+        try:
+            self.request("status")
+            return True
+        except (OSError, DaemonError):
+            return False
+
+    def _connect(self):
+        conn = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        conn.settimeout(self.timeout)
+        try:
+            conn.connect(self.socket_path)
+        except OSError as e:
+            conn.close()
+            raise DaemonError(f"no daemon at {self.socket_path}: {e}") from e
+        return conn
+
+
+class RemoteAgent:
+    """Drives one daemon session from the GUI, in place of a local TranscriptionAgent.
+
+    The GUI's buttons become daemon requests, and the daemon's state events
+    for the session are drawn through ``gui.schedule_task`` on the GUI thread.
+    """
+
+    def __init__(self, gui, client=None, session=DAEMON_GUI_SESSION):
+        self.gui = gui
+        self.client = client or DaemonClient()
+        self.session = session
+        self.state = {"running": False, "paused": False, "finishing": False, "transcript": None}
+        self._stop = threading.Event()
+        self.gui.set_command_callbacks(
+            toggle_func=self.toggle_start_stop,
+            pause_func=self.toggle_pause,
+            transcript_func=self.view_transcript,
+            stop_func=self.stop,
+        )
+        self._thread = threading.Thread(target=self._follow, name="DaemonSubscriber", daemon=True)
+        self._thread.start()
+
+    def toggle_start_stop(self):
+        if self.state["running"]:
+            self.stop()
+        else:
+            self._request(self.client.start, self.session)
+
+    def toggle_pause(self):
+        self._request(self.client.pause, self.session)
+
+    def stop(self):
+        self._request(self.client.stop, self.session)
+
+    def view_transcript(self):
+        open_transcript(self.state["transcript"])
+
+    def shutdown(self):
+        """Stop following the daemon; a running session is stopped, as it would be locally"""
+        self._stop.set()
+        if self.state["running"]:
+            self._request(self.client.stop, self.session)
+
+    def _request(self, method, *args):
+        try:
+            method(*args)
+        except DaemonError as e:
+            logging.error(f"Daemon request failed: {e}")
+
+    def _follow(self):
+        try:
+            for event in self.client.subscribe(self.session, stop=self._stop):
+                if event.get("event") == "state":
+                    self.gui.schedule_task(0, lambda event=event: self._apply_state(event))
+        except (OSError, DaemonError) as e:
+            logging.error(f"Lost connection to the daemon: {e}")
+
+    def _apply_state(self, event):
+        self.state = event
+        self.gui.update_state(
+            is_running=event["running"],
+            is_paused=event["paused"],
+            is_finishing=event["finishing"],
+            has_transcript_file=event["transcript"] is not None,
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Control the transcription daemon")
+    parser.add_argument("--socket", default=DAEMON_SOCKET_PATH, help="Unix-domain socket path")
+    commands = parser.add_subparsers(dest="cmd", required=True)
+    start = commands.add_parser("start", help="Start a session")
+    start.add_argument("session")
+    start.add_argument("--source", default="microphone", help='"microphone" or a WAV file path')
+    start.add_argument("--sink", help="typewrite | bulk | paste | stdout | file")
+    start.add_argument("--sink-path", help="Output file for the file sink")
+    start.add_argument("--fast", action="store_true", help="Stream a WAV source as fast as possible")
+    for name in ("stop", "pause"):
+        commands.add_parser(name, help=f"{name.capitalize()} a session").add_argument("session")
+    commands.add_parser("status", help="Show sessions").add_argument("session", nargs="?")
+    commands.add_parser("subscribe", help="Print session events").add_argument("session", nargs="?")
+    commands.add_parser("shutdown", help="Stop the daemon")
+    args = parser.parse_args()
+
+    client = DaemonClient(args.socket)
+    try:
+        if args.cmd == "start":
+            result = client.start(args.session, args.source, args.sink, args.sink_path, realtime=not args.fast)
+        elif args.cmd == "stop":
+            result = client.stop(args.session)
+        elif args.cmd == "pause":
+            result = client.pause(args.session)
+        elif args.cmd == "status":
+            result = client.status(args.session)
+        elif args.cmd == "shutdown":
+            result = client.shutdown()
+        else:
+            for event in client.subscribe(args.session):
+                print(json.dumps(event, ensure_ascii=False), flush=True)
+            return
+    except DaemonError as e:
+        raise SystemExit(f"Error: {e}")
+    except KeyboardInterrupt:
+        return
+    if result is not None:
+        print(json.dumps(result, indent=2, ensure_ascii=False))
+
+
+if __name__ == "__main__":
+    main()
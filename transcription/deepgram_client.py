@@ -1,32 +1,120 @@
+import asyncio
+import collections
 import logging
 import time
 import os
 from deepgram import (
     DeepgramClient,
+    DeepgramClientOptions,
     LiveTranscriptionEvents,
     LiveOptions,
-    Microphone,
 )
-import pyautogui
+from transcription.audio_sources import create_audio_source
+from transcription.audio_sender import AudioSender
+from transcription.encoders import create_encoder
+from transcription.encoder_stage import EncoderStage
+from transcription.output_queue import OutputQueue, TypingSubscriber
+from transcription.journal import JournalSubscriber
+from transcription.transcript_bus import TranscriptBus, FINAL, INTERIM
+from transcription.packetizer import SendPacketizer
+from transcription.vad import VoiceActivityGate
+from transcription.audio_gate import AudioGate
+from transcription.keepalive import KeepAliveTimer
+from transcription.replay_buffer import ReplayBuffer
+from transcription.segments import Segment
+from transcription.tracing import LatencyTracer
+from utils.metrics import registry
 from config import (
+    DG_URL,
     DG_MODEL,
     DG_LANGUAGE,
     DG_SAMPLE_RATE,
     DG_UTTERANCE_END_MS,
     DG_ENDPOINTING,
+    VAD_ENABLED,
+    TRANSCRIPT_TAIL_SIZE,
+    RECONNECT_ENABLED,
+    RECONNECT_MAX_ATTEMPTS,
+    RECONNECT_INITIAL_DELAY,
+    RECONNECT_MAX_DELAY,
+    STOP_FINALIZE_TIMEOUT,
+    LATENCY_TRACING_ENABLED,
+    SESSION_STOP_TIMEOUT,
 )
 
+# Seconds of slack when comparing final timestamps across a reconnect
+FINAL_OVERLAP_TOLERANCE = 0.05
+
+ENDPOINT_LABELS = {
+    "speech_final": "Speech Final",
+    "utterance_end": "Utterance End",
+    "stop": "Stop Flush",
+}
+
+BYTES_PER_SECOND = DG_SAMPLE_RATE * 2  # linear16
+
+_audio_captured = registry.counter("audio_captured_bytes_total", "Audio bytes from the capture callback")
+_audio_sent = registry.counter("audio_sent_bytes_total", "Audio bytes written to the websocket, replays included")
+_audio_seconds = registry.counter("audio_sent_seconds_total", "Seconds of audio streamed (billed)")
+_interim_results = registry.counter("results_total", "Transcript results received", {"kind": "interim"})
+_final_results = registry.counter("results_total", "Transcript results received", {"kind": "final"})
+_utterances = {
+    endpoint: registry.counter("utterances_total", "Utterances committed", {"endpoint": endpoint})
+    for endpoint in ENDPOINT_LABELS
+}
+_errors = registry.counter("deepgram_errors_total", "Error messages from Deepgram")
+_reconnects = registry.counter("reconnects_total", "Successful reconnects after a dropped socket")
+
 
 class DeepgramTranscriptionClient:
-    def __init__(self, on_speech_detected, on_speech_end):
+    def __init__(
+        self,
+        on_speech_detected,
+        on_speech_end,
+        audio_source_factory=create_audio_source,
+        sink_factory=None,
+        name=None,
+    ):
         self.is_paused = False
         self.is_finals = []
-        self.session_transcript = []
+        self.interim = ""  # Latest interim hypothesis after the pending finals
+        # Only the most recent utterances are kept in memory; the journal has them all
+        self.session_transcript = collections.deque(maxlen=TRANSCRIPT_TAIL_SIZE)
+        self.journal = None
+        self.recorder = None
         self.connection = None
+        self.closed = None
+        self.finalized = None
+        self.sender = None
+        self.encoder = None
+        self.encoder_stage = None
+        self.packetizer = SendPacketizer()
+        self.loop = None
         self.microphone = None
-        self.stop_event = None
+        self.start_error = None  # Why the last start failed, for the user
+        self.vad = None
+        self.audio_gate = None
+        self.keepalive_timer = None
+        self.replay_buffer = None
+        self.reconnect_count = 0
+        self.replayed_seconds = 0.0
+        self._finalized_until = 0.0
+        self._gate_downstream = None
+        self._stream_downstream = None
+        self._connected_at = None
+        self._requested_at = None
+        self.tracer = LatencyTracer() if LATENCY_TRACING_ENABLED else None
+        self.output_queue = OutputQueue(
+            sink=sink_factory() if sink_factory else None,
+            on_written=self.tracer.complete if self.tracer else None,
+        )
+        # Utterances and drafts are published once; typing, the journal and
+        # any other consumers each read them from their own queue
+        self.bus = TranscriptBus(session=name)
+        self.bus.subscribe(TypingSubscriber(self.output_queue))
         self.on_speech_detected = on_speech_detected
         self.on_speech_end = on_speech_end
+        self.audio_source_factory = audio_source_factory
 
         # Validate API key on initialization
         self._validate_api_key()
@@ -44,63 +132,343 @@ class DeepgramTranscriptionClient:
 
         logging.info("Deepgram API key validated successfully")
 
-    def start(self, stop_event):
-        """Start the Deepgram transcription"""
+    async def start(self, requested_at=None, journal=None, recorder=None, subscribers=()):
+        """Start the Deepgram transcription, reusing a pre-warmed connection if open.
+
+        ``subscribers`` are added to the transcript bus for this session, next
+        to typing and the journal.
+        """
+        self.journal = journal
+        self.recorder = recorder
+        if journal:
+            self.bus.subscribe(JournalSubscriber(journal))
+        for subscriber in subscribers:
+            self.bus.subscribe(subscriber)
+        if not self.is_connected() and not await self.connect(open_microphone=False):
+            return False
+        return self.activate(requested_at)
+
+    async def connect(self, open_microphone=True):
+        """Open the websocket and audio pipeline with the audio gate closed"""
         try:
-            self.stop_event = stop_event
+            self.loop = asyncio.get_running_loop()
+            if not await self._open_connection():
+                return False
+
+            # Start the output workers before any audio is sent
+            self.bus.start()
+
+            # Last stage before the socket: keeps audio for replay on reconnect
+            send = self._create_sender()
+            if RECONNECT_ENABLED:
+                self.replay_buffer = ReplayBuffer(send)
+                send = self.replay_buffer
+            self._stream_downstream = send
+            send = self._on_stream_audio
+
+            # Gate silence locally before it reaches the websocket
+            self.keepalive_timer = KeepAliveTimer(self._send_keep_alive)
+            if VAD_ENABLED:
+                self.vad = VoiceActivityGate(
+                    send, self.keepalive_timer, on_speech=self.on_speech_detected
+                )
+                send = self.vad
+            self._gate_downstream = send
+
+            # Pause gate sits first so withheld audio never leaves the capture
+            # callback. It stays closed until the session is activated.
+            self.audio_gate = AudioGate(
+                self._on_gate_output, self.keepalive_timer, is_open=False
+            )
+
+            if open_microphone and not self._start_microphone():
+                return False
+            return True
 
-            # Create Deepgram client with explicit API key
-            api_key = os.getenv("DEEPGRAM_API_KEY")
-            deepgram = DeepgramClient(api_key=api_key)
-            self.connection = deepgram.listen.websocket.v("1")
+        except Exception as e:
+            logging.exception(f"Error starting Deepgram transcription: {e}")
+            return False
 
-            # Set up event handlers
-            self._setup_event_handlers()
+    async def reconnect(self):
+        """Reopen a dropped websocket and replay audio Deepgram has not finalized.
 
-            # Configure options
-            options = self._get_transcription_options()
-            addons = {"no_delay": "true"}
+        Cancelling the calling task abandons the attempt.
+        """
+        if not self.replay_buffer:
+            return False
 
-            # Start connection
-            logging.info("Starting Deepgram connection...")
-            if self.connection.start(options, addons=addons) is False:
-                logging.error(
-                    "Failed to connect to Deepgram - check your API key and internet connection"
+        delay = RECONNECT_INITIAL_DELAY
+        for attempt in range(1, RECONNECT_MAX_ATTEMPTS + 1):
+            logging.warning(f"Deepgram connection lost; reconnecting (attempt {attempt})...")
+            old_connection, old_closed = self.connection, self.closed
+            try:
+                connected = await self._open_connection()
+            except Exception as e:
+                logging.error(f"Reconnect attempt {attempt} failed: {e}")
+                connected = False
+
+            if connected:
+                try:
+                    await old_connection.finish()
+                except Exception:
+                    pass
+                # A fresh sender per connection: the replay buffer swaps it in
+                # under its lock, so the backlog goes out before new frames.
+                old_sender, old_stage = self.sender, self.encoder_stage
+                send = self._create_sender()
+                replayed = self.replay_buffer.replay(send, resend=send.resend)
+                if old_stage:
+                    old_stage.stop()
+                    old_stage.log_summary(DG_SAMPLE_RATE)
+                await old_sender.stop()
+                self.reconnect_count += 1
+                _reconnects.inc()
+                self.replayed_seconds += replayed
+                logging.info(
+                    f"Reconnected to Deepgram; replayed {replayed:.1f}s of unacknowledged audio"
                 )
-                return False
+                return True
+
+            self.connection, self.closed = old_connection, old_closed
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, RECONNECT_MAX_DELAY)
+
+        logging.error(f"Giving up on Deepgram after {RECONNECT_MAX_ATTEMPTS} reconnect attempts")
+        return False
+
+    async def _open_connection(self):
+        """Create a websocket connection with handlers registered and start it"""
+        # Create Deepgram client with explicit API key
+        api_key = os.getenv("DEEPGRAM_API_KEY")
+        # The SDK prints to its own stderr handler and reports the listener
+        # cancellation every finish() performs as an error; the handlers
+        # below log everything we act on.
+        config = DeepgramClientOptions(url=DG_URL, verbose=logging.CRITICAL)
+        deepgram = DeepgramClient(api_key=api_key, config=config)
+        self.connection = deepgram.listen.asyncwebsocket.v("1")
+        self.closed = asyncio.Event()
+        # Compressed streams carry headers, so each connection gets a fresh encoder
+        self.encoder = create_encoder()
+
+        # Set up event handlers
+        self._setup_event_handlers()
+
+        # Configure options
+        options = self._get_transcription_options()
+        addons = {"no_delay": "true"}
+
+        # Start connection
+        logging.info("Starting Deepgram connection...")
+        if await self.connection.start(options, addons=addons) is False:
+            logging.error(
+                "Failed to connect to Deepgram - check your API key and internet connection"
+            )
+            return False
+        self._connected_at = time.monotonic()
+        return True
 
-            # Start microphone
-            self.microphone = Microphone(self.connection.send)
-            self.microphone.start()
-            logging.info("Microphone started")
+    def activate(self, requested_at=None):
+        """Open the audio gate so captured audio starts streaming"""
+        try:
+            self._requested_at = requested_at or time.monotonic()
+            if not self.is_paused:
+                self.audio_gate.open()
+            # Audio dropped while on standby is not pause time
+            self.audio_gate.reset_counters()
+            if not self.microphone and not self._start_microphone():
+                return False
             return True
 
         except Exception as e:
             logging.exception(f"Error starting Deepgram transcription: {e}")
             return False
 
+    def _start_microphone(self):
+        """Open the audio source; returns False if it could not be started"""
+        microphone = self.audio_source_factory(self._on_audio_captured)
+        if microphone.start() is False:
+            self.start_error = "Audio input could not be started (check AUDIO_DEVICE)"
+            logging.error(self.start_error)
+            return False
+        self.microphone = microphone
+        self.start_error = None
+        logging.info("Audio source started")
+        return True
+
+    def _on_audio_captured(self, data):
+        """Capture callback: stamp the frame for latency tracing, then gate it"""
+        _audio_captured.inc(len(data))
+        if self.tracer:
+            data = self.tracer.mark_captured(data)
+        self.audio_gate(data)
+
+    def _on_stream_audio(self, data):
+        """Stream audio that passed the VAD, then record it; its offsets match the transcript timeline"""
+        self._stream_downstream(data)
+        if self.recorder:
+            try:
+                self.recorder.write(data)
+            except Exception as e:
+                # The recording is a side feature; it must never cut the live stream
+                logging.error(f"Session audio recording failed, recording stopped: {e}")
+                self.recorder = None
+
+    def _create_sender(self):
+        """Build the send stage for the current connection and return its entry point.
+
+        Raw PCM goes straight to the AudioSender; anything else passes
+        through an EncoderStage on its own thread first.
+        """
+        self.packetizer.new_connection()
+        if self.encoder.name == "linear16":
+            self.sender = AudioSender(
+                self.connection, self.loop, on_sent=self._on_audio_sent, packetizer=self.packetizer
+            )
+            self.encoder_stage = None
+            return self.sender.start()
+
+        self.sender = AudioSender(
+            self.connection, self.loop, on_sent=self._on_wire_sent, packetizer=self.packetizer
+        ).start()
+        self.encoder_stage = EncoderStage(self.encoder, self.sender, on_encoded=self._on_pcm_sent)
+        return self.encoder_stage.start()
+
+    def _on_audio_sent(self, data, replayed):
+        self._on_pcm_sent(data, replayed)
+        self._on_wire_sent(data, replayed)
+
+    def _on_pcm_sent(self, data, replayed):
+        """Count captured audio going out; replayed audio is already on the traced timeline"""
+        self.packetizer.on_audio_sent(data)
+        if self.tracer and not replayed:
+            self.tracer.mark_sent(data)
+        _audio_seconds.inc(len(data) / BYTES_PER_SECOND)
+
+    def _on_wire_sent(self, data, replayed):
+        _audio_sent.inc(len(data))
+
+    def _send_keep_alive(self):
+        """KeepAlive from any thread; the send itself runs on the session loop"""
+        asyncio.run_coroutine_threadsafe(self.connection.keep_alive(), self.loop)
+
+    def _on_gate_output(self, data):
+        """Log hotkey-to-first-audio-byte latency, then pass audio downstream"""
+        requested_at = self._requested_at
+        if requested_at is not None:
+            self._requested_at = None
+            kind = "warm" if self._connected_at < requested_at else "cold"
+            latency_ms = (time.monotonic() - requested_at) * 1000
+            logging.info(
+                f"Hotkey-to-first-audio-byte latency: {latency_ms:.0f} ms ({kind} start)"
+            )
+        self._gate_downstream(data)
+
     def pause(self, is_paused):
-        """Set pause state"""
+        """Set pause state and gate audio upload at the source"""
         self.is_paused = is_paused
+        if self.audio_gate:
+            if is_paused:
+                self.audio_gate.close()
+            else:
+                self.audio_gate.open()
 
-    def stop(self):
+    async def stop(self, finalize=True):
         """Stop transcription and clean up resources"""
+        await self.flush(finalize)
+        return await self.close()
+
+    async def flush(self, finalize=True):
+        """Stop capture and commit the last words.
+
+        With ``finalize``, audio still queued is sent and Deepgram is asked to
+        finalize it. Finals that never got an endpoint are committed either
+        way, and the journal and search index have caught up once this returns.
+        """
         if self.microphone:
             self.microphone.finish()
+            self.microphone = None
             logging.info("Microphone finished.")
 
+        if finalize and self.is_connected() and self.sender:
+            await self._finalize()
+        self._commit_pending("stop")
+        await asyncio.to_thread(self.bus.drain, SESSION_STOP_TIMEOUT)
+
+    async def close(self):
+        """Close the socket, drain typing and log the session summaries"""
+        if self.encoder_stage:
+            self.encoder_stage.stop()
+            self.encoder_stage.log_summary(DG_SAMPLE_RATE)
+        if self.sender:
+            await self.sender.stop()
         if self.connection:
-            self.connection.finish()
+            await self.connection.finish()
             logging.info("Deepgram connection finished.")
 
+        if self.vad:
+            self.vad.log_summary()
+        if self.audio_gate and self.audio_gate.withheld_bytes:
+            logging.info(
+                f"Pause: {self.audio_gate.withheld_bytes} bytes "
+                f"({self.audio_gate.withheld_seconds:.1f}s of audio) not sent while paused"
+            )
+        if self.keepalive_timer:
+            logging.info(f"KeepAlive messages sent: {self.keepalive_timer.sent}")
+        self.packetizer.log_summary()
+        if self.reconnect_count:
+            logging.info(
+                f"Reconnects: {self.reconnect_count}, "
+                f"replayed {self.replayed_seconds:.1f}s of audio"
+            )
+
         self.connection = None
+        self.sender = None
+        self.encoder_stage = None
         self.microphone = None
 
+        # Flushing the queues completes the last traces before the summary.
+        # Typing can take a while, so wait for it off the loop.
+        await asyncio.to_thread(self.bus.stop)
+        if self.tracer:
+            self.tracer.log_summary()
+
         return self.session_transcript
 
+    async def _finalize(self, timeout=STOP_FINALIZE_TIMEOUT):
+        """Flush queued audio, send Finalize and wait for its reply within ``timeout``"""
+        started = time.monotonic()
+        deadline = started + timeout
+        try:
+            if self.encoder_stage:
+                await asyncio.to_thread(self.encoder_stage.flush, timeout)
+            await asyncio.wait_for(self.sender.drain(), timeout)
+            self.finalized = asyncio.Event()
+            if not await self.connection.finalize():
+                logging.warning("Failed to send Finalize; saving what was received")
+                return
+
+            waiters = {
+                asyncio.ensure_future(self.finalized.wait()),
+                asyncio.ensure_future(self.closed.wait()),
+            }
+            done, pending = await asyncio.wait(
+                waiters, timeout=max(0.0, deadline - time.monotonic()),
+                return_when=asyncio.FIRST_COMPLETED,
+            )
+            for task in pending:
+                task.cancel()
+            if self.finalized.is_set():
+                logging.info(f"Finalize flushed in {(time.monotonic() - started) * 1000:.0f} ms")
+            elif self.closed.is_set():
+                logging.warning("Connection closed before Finalize completed")
+            else:
+                logging.warning(f"No Finalize reply within {timeout}s; saving what was received")
+        except asyncio.TimeoutError:
+            logging.warning(f"Audio still queued after {timeout}s; skipping Finalize")
+
     def is_connected(self):
         """Check if connection is active"""
-        return self.connection and self.connection.is_connected()
+        return self.connection is not None and not self.closed.is_set()
 
     def _get_transcription_options(self):
         """Get Deepgram transcription options"""
@@ -108,75 +476,132 @@ class DeepgramTranscriptionClient:
             model=DG_MODEL,
             language=DG_LANGUAGE,
             smart_format=True,
-            encoding="linear16",
             channels=1,
-            sample_rate=DG_SAMPLE_RATE,
             interim_results=True,
             utterance_end_ms=DG_UTTERANCE_END_MS,
             vad_events=True,
             endpointing=DG_ENDPOINTING,
+            **self.encoder.live_options(),
+        )
+
+    def _commit_pending(self, endpoint):
+        """Commit the pending final segments as one utterance"""
+        segments, self.is_finals = self.is_finals, []
+        utterance = " ".join(segment.text for segment in segments).strip()
+        if utterance:
+            self._commit_utterance(utterance, segments, endpoint)
+        return bool(utterance)
+
+    def _show_draft(self):
+        """Publish the utterance in progress (pending finals plus interim) to subscribers that want drafts"""
+        if not self.bus.wants_interims:
+            return
+        parts = [segment.text for segment in self.is_finals]
+        if self.interim:
+            parts.append(self.interim)
+        self.bus.publish(INTERIM, " ".join(parts).strip())
+
+    def _commit_utterance(self, utterance, segments, endpoint):
+        """Publish a finished utterance to typing, the journal and other subscribers"""
+        reason = ENDPOINT_LABELS.get(endpoint, endpoint)
+        logging.info(
+            f"Typing ({reason}): {utterance} "
+            f"[queue depth={self.output_queue.depth}, lag={self.output_queue.lag:.2f}s]"
         )
+        trace = self.tracer.on_endpoint(endpoint) if self.tracer else None
+        self.bus.publish(FINAL, utterance, segments, endpoint, trace)
+        if endpoint in _utterances:
+            _utterances[endpoint].inc()
+        self.session_transcript.append(utterance)
+        if self.interim:
+            # Speech after the endpoint was already drafted; put it back on screen
+            self._show_draft()
+
+    def _dedupe_final(self, segment):
+        """Acknowledge a final and drop any part already committed before a reconnect"""
+        if not self.replay_buffer:
+            return segment
+
+        self.replay_buffer.acknowledge(segment.end - self.replay_buffer.connection_base_seconds)
+        if segment.end <= self._finalized_until + FINAL_OVERLAP_TOLERANCE:
+            logging.debug(f"Dropping replayed duplicate final: {segment.text}")
+            return None
+
+        if segment.start < self._finalized_until - FINAL_OVERLAP_TOLERANCE:
+            segment.trim_before(self._finalized_until - FINAL_OVERLAP_TOLERANCE)
+            logging.debug(f"Trimmed replayed overlap from final: {segment.text}")
+
+        self._finalized_until = segment.end
+        return segment
 
     def _setup_event_handlers(self):
-        """Set up Deepgram event handlers"""
+        """Set up Deepgram event handlers; they run on the session loop"""
+        closed = self.closed
 
-        def on_open(connection, open_event, **kwargs):
+        async def on_open(connection, open_event, **kwargs):
             logging.info("Deepgram Connection Open")
 
-        def on_message(connection, result, **kwargs):
-            if self.is_paused:
-                return
-
+        async def on_message(connection, result, **kwargs):
+            # Audio is gated at the source while paused, so results that still
+            # arrive belong to speech captured before the pause.
             try:
                 sentence = result.channel.alternatives[0].transcript
                 if len(sentence) > 0:
                     self.on_speech_detected()
 
+                base = 0.0
+                if self.replay_buffer:
+                    base = self.replay_buffer.connection_base_seconds
+                if self.tracer:
+                    self.tracer.on_result(base + result.start, result.is_final, bool(sentence))
+                self.packetizer.on_result(result.start + result.duration)
+
+                (_final_results if result.is_final else _interim_results).inc()
                 if result.is_final:
-                    self.is_finals.append(sentence)
+                    segment = self._dedupe_final(Segment.from_result(result, base))
+                    if segment and segment.text:
+                        self.is_finals.append(segment)
+                    self.interim = ""
                     if result.speech_final:
-                        utterance = " ".join(self.is_finals).strip()
-                        if utterance:
-                            logging.info(f"Typing (Speech Final): {utterance}")
-                            pyautogui.typewrite(utterance + " ", interval=0.01)
-                            self.session_transcript.append(utterance)
-                            self.is_finals = []
+                        self._commit_pending("speech_final")
+                    else:
+                        self._show_draft()
+                    if getattr(result, "from_finalize", False) and self.finalized:
+                        self.finalized.set()
+                elif sentence and base + result.start >= self._finalized_until - FINAL_OVERLAP_TOLERANCE:
+                    # Interims for replayed audio that is already committed are skipped
+                    self.interim = sentence
+                    self._show_draft()
 
             except Exception as e:
                 logging.error(f"Error processing message: {e} - Data: {result}")
 
-        def on_utterance_end(connection, utterance_end, **kwargs):
-            if self.is_paused:
-                return
-
+        async def on_utterance_end(connection, utterance_end, **kwargs):
             if self.is_finals:
-                utterance = " ".join(self.is_finals).strip()
-                if utterance:
-                    logging.info(f"Typing (Utterance End): {utterance}")
-                    pyautogui.typewrite(utterance + " ", interval=0.01)
-                    self.session_transcript.append(utterance)
-                self.is_finals = []
+                self._commit_pending("utterance_end")
                 self.on_speech_detected()
 
             logging.debug("Utterance End received")
 
-        def on_speech_started(connection, speech_started, **kwargs):
+        async def on_speech_started(connection, speech_started, **kwargs):
             if self.is_paused:
                 return
 
             logging.debug("Speech Started")
             self.on_speech_detected()
 
-        def on_metadata(connection, metadata, **kwargs):
+        async def on_metadata(connection, metadata, **kwargs):
             logging.debug(f"Metadata: {metadata}")
 
-        def on_close(connection, close, **kwargs):
+        async def on_close(connection, close, **kwargs):
             logging.info(f"Deepgram Connection Closed: {close}")
+            closed.set()
 
-        def on_error(connection, error, **kwargs):
+        async def on_error(connection, error, **kwargs):
+            _errors.inc()
             logging.error(f"Deepgram Error: {error}")
 
-        def on_unhandled(connection, unhandled, **kwargs):
+        async def on_unhandled(connection, unhandled, **kwargs):
             logging.warning(f"Unhandled Websocket Message: {unhandled}")
 
         # Register event handlers
@@ -0,0 +1,133 @@
+import logging
+import queue
+import threading
+import time
+
+from transcription.tracing import LatencyHistogram
+
+_STOP = object()
+
+
+class EncoderStage:
+    """Compresses captured audio on its own thread before it is sent.
+
+    The capture thread only enqueues PCM. Frames already waiting when the
+    worker wakes are encoded as one batch, and the output is handed to
+    ``send`` (the connection's AudioSender). ``on_encoded(pcm, replayed)``
+    is called for every input frame once its output has been queued.
+    """
+
+    def __init__(self, encoder, send, on_encoded=None):
+        self.encoder = encoder
+        self.send = send
+        self.on_encoded = on_encoded
+        self.input_bytes = 0
+        self.output_bytes = 0
+        self.frames = 0
+        self.encode_times = LatencyHistogram()  # Per input frame
+        self._queue = queue.Queue()
+        self._thread = None
+
+    def start(self):
+        self._thread = threading.Thread(target=self._worker, name="EncoderStage", daemon=True)
+        self._thread.start()
+        return self
+
+    def __call__(self, data):
+        """Queue captured PCM; never blocks"""
+        self._queue.put_nowait((data, False))
+
+    def resend(self, data):
+        """Queue PCM replayed after a reconnect"""
+        self._queue.put_nowait((data, True))
+
+    def flush(self, timeout=5):
+        """Encode everything queued, including the encoder's partial frame.
+
+        Blocks until done, so call it off the session loop.
+        """
+        done = threading.Event()
+        self._queue.put_nowait(done)
+        return done.wait(timeout)
+
+    def stop(self, timeout=5):
+        """Stop the worker, discarding frames not yet encoded"""
+        if not self._thread:
+            return
+        self._queue.put_nowait(_STOP)
+        self._thread.join(timeout)
+        self._thread = None
+
+    @property
+    def compression_ratio(self):
+        return self.input_bytes / self.output_bytes if self.output_bytes else 0.0
+
+    def log_summary(self, sample_rate):
+        if not self.frames:
+            return
+        seconds = self.input_bytes / (sample_rate * 2)
+        kbps = self.output_bytes * 8 / seconds / 1000 if seconds else 0.0
+        logging.info(
+            f"Encoder ({self.encoder.name}): {self.input_bytes} -> {self.output_bytes} bytes "
+            f"(ratio {self.compression_ratio:.1f}x, {kbps:.1f} kbit/s); encode time per frame "
+            f"p50 {self.encode_times.percentile(50) * 1000:.2f} ms, "
+            f"p95 {self.encode_times.percentile(95) * 1000:.2f} ms, "
+            f"max {self.encode_times.maximum * 1000:.2f} ms"
+        )
+
+    def _worker(self):
+        while True:
+            item = self._queue.get()
+            if item is _STOP:
+                return
+
+            # Batch whatever else is already waiting, up to a stop or flush marker
+            batch, marker = [], None
+            while True:
+                if item is _STOP or isinstance(item, threading.Event):
+                    marker = item
+                    break
+                batch.append(item)
+                try:
+                    item = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+
+            if batch:
+                self._encode(batch)
+            if isinstance(marker, threading.Event):
+                self._encode_tail()
+                marker.set()
+            elif marker is _STOP:
+                return
+
+    def _encode(self, batch):
+        pcm = b"".join(data for data, _ in batch)
+        started = time.perf_counter()
+        try:
+            output = self.encoder.encode(pcm)
+        except Exception as e:
+            logging.error(f"Audio encoding failed: {e}")
+            return
+        per_frame = (time.perf_counter() - started) / len(batch)
+        for _ in batch:
+            self.encode_times.add(per_frame)
+
+        self.input_bytes += len(pcm)
+        self.frames += len(batch)
+        if output:
+            self.output_bytes += len(output)
+            self.send(output)
+        if self.on_encoded:
+            for data, replayed in batch:
+                self.on_encoded(data, replayed)
+
+    def _encode_tail(self):
+        try:
+            output = self.encoder.flush()
+        except Exception as e:
+            logging.error(f"Audio encoder flush failed: {e}")
+            return
+        if output:
+            self.output_bytes += len(output)
+            self.send(output)
@@ -0,0 +1,216 @@
+"""Audio encoders for the upload path.
+
+Each encoder turns 16-bit mono PCM into the byte stream sent to Deepgram
+and knows the ``LiveOptions`` that describe it. Ogg/Opus and FLAC are
+containerized streams whose headers describe the audio, so Deepgram is
+not told an encoding or sample rate for them.
+
+Opus needs ``opuslib`` (and libopus); FLAC needs ``pyflac``. Both are only
+imported when selected.
+"""
+import struct
+
+import numpy as np
+
+from config import (
+    AUDIO_ENCODING,
+    DG_SAMPLE_RATE,
+    OPUS_BITRATE,
+    OPUS_FRAME_MS,
+    FLAC_BLOCK_MS,
+    FLAC_COMPRESSION_LEVEL,
+)
+
+BYTES_PER_SAMPLE = 2  # linear16
+
+
+class AudioEncoder:
+    """Converts PCM frames into the uploaded byte stream"""
+
+    name = "base"
+
+    def live_options(self):
+        """LiveOptions fields describing the encoded stream"""
+        return {}
+
+    def encode(self, pcm):
+        """Encode PCM bytes; returns whatever output is ready (possibly b"")"""
+        raise NotImplementedError
+
+    def flush(self):
+        """Encode buffered PCM, padding as needed; returns the output"""
+        return b""
+
+
+class Linear16Encoder(AudioEncoder):
+    """Raw PCM, sent as captured"""
+
+    name = "linear16"
+
+    def __init__(self, sample_rate=DG_SAMPLE_RATE):
+        self.sample_rate = sample_rate
+
+    def live_options(self):
+        return {"encoding": "linear16", "sample_rate": self.sample_rate}
+
+    def encode(self, pcm):
+        return pcm
+
+
+class OggOpusEncoder(AudioEncoder):
+    """Opus packets in an Ogg stream (RFC 7845), paged per encoded batch"""
+
+    name = "opus"
+    GRANULE_RATE = 48000  # Ogg Opus granule positions always count 48 kHz samples
+
+    def __init__(self, sample_rate=DG_SAMPLE_RATE, bitrate=OPUS_BITRATE, frame_ms=OPUS_FRAME_MS):
+        import opuslib
+
+        self.sample_rate = sample_rate
+        self.frame_samples = sample_rate * frame_ms // 1000
+        self.frame_bytes = self.frame_samples * BYTES_PER_SAMPLE
+        self._encoder = opuslib.Encoder(sample_rate, 1, opuslib.APPLICATION_VOIP)
+        self._encoder.bitrate = bitrate
+        self._pending = b""
+        self._ogg = _OggWriter()
+        self._granule = 0
+        self._header = self._headers()
+
+    def encode(self, pcm):
+        self._pending += pcm
+        packets = []
+        while len(self._pending) >= self.frame_bytes:
+            frame, self._pending = self._pending[:self.frame_bytes], self._pending[self.frame_bytes:]
+            packets.append(self._encoder.encode(frame, self.frame_samples))
+        return self._page(packets)
+
+    def flush(self):
+        if not self._pending:
+            return b""
+        # Pad the tail to a whole Opus frame with silence
+        self._pending += b"\0" * (self.frame_bytes - len(self._pending))
+        return self.encode(b"")
+
+    def _page(self, packets):
+        """Mux packets into as few pages as the 255-entry lacing table allows"""
+        pages = [self._header]
+        self._header = b""
+        group, lacing = [], 0
+        for packet in packets:
+            size = len(packet) // 255 + 1
+            if group and lacing + size > 255:
+                pages.append(self._emit(group))
+                group, lacing = [], 0
+            group.append(packet)
+            lacing += size
+        if group:
+            pages.append(self._emit(group))
+        return b"".join(pages)
+
+    def _emit(self, packets):
+        self._granule += len(packets) * self.frame_samples * self.GRANULE_RATE // self.sample_rate
+        return self._ogg.page(packets, self._granule)
+
+    def _headers(self):
+        pre_skip = 312  # libopus encoder lookahead at 48 kHz
+        opus_head = b"OpusHead" + struct.pack("<BBHIhB", 1, 1, pre_skip, self.sample_rate, 0, 0)
+        vendor = b"mySpeech2Text"
+        opus_tags = b"OpusTags" + struct.pack("<I", len(vendor)) + vendor + struct.pack("<I", 0)
+        return self._ogg.page([opus_head], 0, bos=True) + self._ogg.page([opus_tags], 0)
+
+
+class FlacEncoder(AudioEncoder):
+    """Streaming FLAC; frames are emitted as each block fills"""
+
+    name = "flac"
+
+    def __init__(
+        self,
+        sample_rate=DG_SAMPLE_RATE,
+        block_ms=FLAC_BLOCK_MS,
+        compression_level=FLAC_COMPRESSION_LEVEL,
+    ):
+        import pyflac
+
+        self.sample_rate = sample_rate
+        self._output = bytearray()
+        self._encoder = pyflac.StreamEncoder(
+            write_callback=self._on_write,
+            sample_rate=sample_rate,
+            blocksize=sample_rate * block_ms // 1000,
+            compression_level=compression_level,
+        )
+
+    def encode(self, pcm):
+        if pcm:
+            self._encoder.process(np.frombuffer(pcm, dtype=np.int16))
+        return self._take()
+
+    def flush(self):
+        self._encoder.finish()
+        return self._take()
+
+    def _on_write(self, buffer, num_bytes, num_samples, current_frame):
+        self._output += buffer
+
+    def _take(self):
+        data = bytes(self._output)
+        self._output.clear()
+        return data
+
+
+class _OggWriter:
+    """Minimal Ogg page muxer for a single logical stream"""
+
+    def __init__(self, serial=0x53545431):
+        self.serial = serial
+        self.sequence = 0
+
+    def page(self, packets, granule, bos=False):
+        lacing = bytearray()
+        for packet in packets:
+            lacing += b"\xff" * (len(packet) // 255) + bytes([len(packet) % 255])
+        if len(lacing) > 255:
+            raise ValueError("Too many packets for one Ogg page")
+        header = struct.pack(
+            "<4sBBqIIIB",
+            b"OggS", 0, 0x02 if bos else 0, granule, self.serial, self.sequence, 0, len(lacing),
+        )
+        page = bytearray(header + lacing + b"".join(packets))
+        struct.pack_into("<I", page, 22, _ogg_crc(page))
+        self.sequence += 1
+        return bytes(page)
+
+
+def _crc_table():
+    table = []
+    for i in range(256):
+        r = i << 24
+        for _ in range(8):
+            r = ((r << 1) ^ 0x04C11DB7) if r & 0x80000000 else (r << 1)
+        table.append(r & 0xFFFFFFFF)
+    return table
+
+
+_CRC_TABLE = _crc_table()
+
+
+def _ogg_crc(data):
+    crc = 0
+    for byte in data:
+        crc = ((crc << 8) & 0xFFFFFFFF) ^ _CRC_TABLE[((crc >> 24) & 0xFF) ^ byte]
+    return crc
+
+
+ENCODERS = {
+    "linear16": Linear16Encoder,
+    "opus": OggOpusEncoder,
+    "flac": FlacEncoder,
+}
+
+
+def create_encoder(name=AUDIO_ENCODING):
+    """Create the encoder selected in config"""
+    if name not in ENCODERS:
+        raise ValueError(f"Unknown audio encoding: {name}")
+    return ENCODERS[name]()
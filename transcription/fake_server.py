@@ -0,0 +1,265 @@
+"""Local stand-in for Deepgram's live transcription websocket.
+
+Speaks enough of the ``/v1/listen`` protocol for offline replay and
+benchmarks: it accepts binary audio and KeepAlive/Finalize/CloseStream
+control messages, and replays a script of Results, SpeechStarted,
+UtteranceEnd, Metadata and Error messages. Script events fire when the
+amount of audio received reaches their ``at`` offset, so a run is
+deterministic however fast the audio is streamed.
+
+Point the client at it with ``DEEPGRAM_URL=http://127.0.0.1:<port>``.
+"""
+import json
+import logging
+import random
+import threading
+import time
+import uuid
+from urllib.parse import parse_qs, urlparse
+
+from websockets.sync.server import serve
+
+BYTES_PER_SAMPLE = 2  # linear16
+
+
+def build_script(utterances, start=0.5, words_per_second=2.5, gap=1.5, interims=True):
+    """Build a script that speaks each utterance in turn.
+
+    Each utterance produces SpeechStarted, word-by-word interim results, a
+    speech_final Result and an UtteranceEnd, timed on the audio timeline.
+    """
+    events = []
+    t = start
+    for text in utterances:
+        words = text.split()
+        word_length = 1.0 / words_per_second
+        timed = [
+            {
+                "word": w.strip(".,!?").lower(),
+                "punctuated_word": w,
+                "start": round(t + i * word_length, 3),
+                "end": round(t + (i + 0.8) * word_length, 3),
+                "confidence": 0.98,
+            }
+            for i, w in enumerate(words)
+        ]
+        end = t + len(words) * word_length
+        events.append({"at": t, "type": "SpeechStarted", "timestamp": t})
+        if interims:
+            for i in range(1, len(words)):
+                events.append(
+                    {"at": timed[i - 1]["end"], "type": "Results", "words": timed[:i],
+                     "start": t, "duration": timed[i - 1]["end"] - t, "is_final": False}
+                )
+        events.append(
+            {"at": end, "type": "Results", "words": timed, "start": t,
+             "duration": end - t, "is_final": True, "speech_final": True}
+        )
+        events.append({"at": end + 1.0, "type": "UtteranceEnd", "last_word_end": timed[-1]["end"]})
+        t = end + gap
+    return events
+
+
+class FakeDeepgramServer:
+    """Scripted live-transcription websocket server running on a background thread.
+
+    Args:
+        script: list of event dicts (see ``build_script``). Each has an ``at``
+            audio offset in seconds and a ``type``: "Results", "SpeechStarted",
+            "UtteranceEnd", "Metadata", "Error" or "Drop" (abruptly close the
+            socket to simulate an outage). An optional ``delay`` adds seconds
+            of wall-clock latency before the message is sent.
+        delay: latency added to every message, in seconds.
+        drop_rate: probability that a message is silently dropped.
+        seed: random seed for ``drop_rate`` so runs are reproducible.
+    """
+
+    def __init__(self, script, host="127.0.0.1", port=0, delay=0.0, drop_rate=0.0, seed=0, independent=False):
+        self.script = sorted(script, key=lambda e: e["at"])
+        self.host = host
+        self.port = port
+        self.delay = delay
+        self.drop_rate = drop_rate
+        self.independent = independent  # Every connection plays the whole script (concurrent sessions)
+        self.connections = 0
+        self.audio_bytes = 0
+        self.audio_messages = 0
+        self.control_messages = []
+        self._random = random.Random(seed)
+        self._server = None
+        self._thread = None
+        self._fired = set()  # Script events are only delivered once across reconnects
+        self._acked = 0.0  # Script offset covered by the finals sent so far
+        self._lock = threading.Lock()
+
+    @property
+    def url(self):
+        return f"http://{self.host}:{self.port}"
+
+    def start(self):
+        """Start serving on a background thread"""
+        self._server = serve(self._handle, self.host, self.port)
+        self.port = self._server.socket.getsockname()[1]
+        self._thread = threading.Thread(
+            target=self._server.serve_forever, name="FakeDeepgramServer", daemon=True
+        )
+        self._thread.start()
+        logging.info(f"Fake Deepgram server listening on {self.url}")
+        return self
+
+    def stop(self):
+        """Shut the server down"""
+        if self._server:
+            self._server.shutdown()
+            self._thread.join(timeout=5)
+            self._server = None
+
+    def _handle(self, websocket):
+        with self._lock:
+            self.connections += 1
+        params = parse_qs(urlparse(websocket.request.path).query)
+        sample_rate = int(params.get("sample_rate", ["16000"])[0])
+        bytes_per_second = sample_rate * BYTES_PER_SAMPLE
+        request_id = str(uuid.uuid4())
+        received = 0
+        # Offsets restart at zero on every connection. Like the real client,
+        # assume a reconnect replays audio from the end of the last final we
+        # sent, and shift the script by that much. Events already delivered
+        # on an earlier connection are skipped via _fired.
+        fired = set() if self.independent else self._fired
+        base = 0.0 if self.independent else self._acked
+        pending = [(i, e) for i, e in enumerate(self.script)]
+
+        try:
+            for message in websocket:
+                if isinstance(message, bytes):
+                    received += len(message)
+                    with self._lock:
+                        self.audio_bytes += len(message)
+                        self.audio_messages += 1
+                    pending = self._fire_due(
+                        websocket, pending, base + received / bytes_per_second, base, request_id, fired
+                    )
+                    if pending is None:
+                        return
+                    continue
+
+                control = json.loads(message).get("type")
+                self.control_messages.append(control)
+                position = received / bytes_per_second
+                if control == "Finalize":
+                    flushed = {"words": [], "start": position, "duration": 0, "is_final": True}
+                    self._send(websocket, _results_message(flushed, request_id, from_finalize=True))
+                elif control == "CloseStream":
+                    self._send(websocket, _metadata_message(request_id, position))
+                    websocket.close()
+                    return
+        except Exception as e:
+            logging.debug(f"Fake Deepgram connection ended: {e}")
+
+    def _fire_due(self, websocket, pending, audio_seconds, base, request_id, fired):
+        """Send every pending event whose offset has been reached"""
+        remaining = []
+        for index, event in pending:
+            if event["at"] > audio_seconds:
+                remaining.append((index, event))
+                continue
+            with self._lock:
+                if index in fired:
+                    continue
+                fired.add(index)
+
+            if event["type"] == "Drop":
+                logging.info(f"Fake Deepgram dropping connection at {audio_seconds:.2f}s")
+                websocket.close_socket()
+                return None
+
+            if event["type"] == "Results" and event.get("is_final") and not self.independent:
+                self._acked = max(self._acked, event["start"] + event["duration"])
+            message = _event_message(_shift(event, base), request_id)
+            if self.drop_rate and self._random.random() < self.drop_rate:
+                continue
+            delay = self.delay + event.get("delay", 0.0)
+            if delay:
+                threading.Timer(delay, self._send, args=(websocket, message)).start()
+            else:
+                self._send(websocket, message)
+        return remaining
+
+    def _send(self, websocket, message):
+        try:
+            websocket.send(json.dumps(message))
+        except Exception as e:
+            logging.debug(f"Fake Deepgram send failed: {e}")
+
+
+def _shift(event, base):
+    """Move an event's timestamps onto a connection that starts at ``base``"""
+    if not base or event["type"] != "Results":
+        return event
+    shifted = dict(event, start=event["start"] - base)
+    shifted["words"] = [
+        dict(w, start=round(w["start"] - base, 3), end=round(w["end"] - base, 3))
+        for w in event.get("words", [])
+    ]
+    return shifted
+
+
+def _event_message(event, request_id):
+    kind = event["type"]
+    if kind == "Results":
+        return _results_message(event, request_id)
+    if kind == "SpeechStarted":
+        timestamp = event.get("timestamp", event["at"])
+        return {"type": "SpeechStarted", "channel": [0], "timestamp": timestamp}
+    if kind == "UtteranceEnd":
+        last_word_end = event.get("last_word_end", event["at"])
+        return {"type": "UtteranceEnd", "channel": [0, 1], "last_word_end": last_word_end}
+    if kind == "Metadata":
+        return _metadata_message(request_id, event["at"])
+    if kind == "Error":
+        return {
+            "type": "Error",
+            "description": event.get("description", "Scripted error"),
+            "message": event.get("message", ""),
+            "variant": event.get("variant", "scripted"),
+        }
+    raise ValueError(f"Unknown fake Deepgram event type: {kind}")
+
+
+def _results_message(event, request_id, from_finalize=False):
+    words = event.get("words", [])
+    transcript = event.get("transcript", " ".join(w["punctuated_word"] for w in words))
+    return {
+        "type": "Results",
+        "channel_index": [0, 1],
+        "duration": round(event.get("duration", 0.0), 3),
+        "start": round(event.get("start", 0.0), 3),
+        "is_final": event.get("is_final", False),
+        "speech_final": event.get("speech_final", False),
+        "from_finalize": from_finalize,
+        "channel": {
+            "alternatives": [
+                {"transcript": transcript, "confidence": 0.98 if words else 0.0, "words": words}
+            ]
+        },
+        "metadata": {
+            "request_id": request_id,
+            "model_info": {"name": "fake", "version": "0", "arch": "fake"},
+            "model_uuid": "00000000-0000-0000-0000-000000000000",
+        },
+    }
+
+
+def _metadata_message(request_id, duration):
+    return {
+        "type": "Metadata",
+        "transaction_key": "deprecated",
+        "request_id": request_id,
+        "sha256": "",
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S.000Z", time.gmtime()),
+        "duration": round(duration, 3),
+        "channels": 1,
+        "models": [],
+        "model_info": {},
+    }
@@ -0,0 +1,121 @@
+import logging
+import time
+
+from config import INTERIM_KEYSTROKE_RATE, INTERIM_MIN_INTERVAL
+from utils.metrics import registry
+
+_keystrokes = {
+    kind: registry.counter("interim_keystrokes_total", "Keystrokes sent by interim typing", {"kind": kind})
+    for kind in ("typed", "backspace")
+}
+_saved = registry.counter(
+    "interim_keystrokes_saved_total", "Keystrokes avoided versus erasing and retyping each revision"
+)
+_revisions = {
+    outcome: registry.counter("interim_revisions_total", "Interim revisions", {"outcome": outcome})
+    for outcome in ("typed", "superseded")
+}
+
+
+def minimal_edit(old, new):
+    """Return ``(backspaces, suffix)`` that turns typed text ``old`` into ``new``"""
+    prefix = 0
+    limit = min(len(old), len(new))
+    while prefix < limit and old[prefix] == new[prefix]:
+        prefix += 1
+    return len(old) - prefix, new[prefix:]
+
+
+class InterimTypist:
+    """Types the in-progress utterance as it is recognized and corrects it in place.
+
+    ``typed`` mirrors the draft on screen. Each revision is applied as the
+    minimal edit from it: backspace to the common prefix, then type the new
+    suffix. A keystroke budget of ``rate`` per second (with one second of
+    burst) plus ``min_interval`` between revisions bound the traffic;
+    committing the final text is never delayed but still spends the budget.
+    """
+
+    def __init__(self, sink, rate=INTERIM_KEYSTROKE_RATE, min_interval=INTERIM_MIN_INTERVAL):
+        self.sink = sink
+        self.rate = rate
+        self.min_interval = min_interval
+        self.typed = ""
+        self.keystrokes = 0
+        self.naive_keystrokes = 0  # Erasing the whole draft and retyping it every time
+        self.revisions = 0
+        self.superseded = 0
+        self._tokens = float(rate)
+        self._refilled_at = time.monotonic()
+        self._revised_at = 0.0
+
+    def delay(self, text):
+        """Seconds until revising the draft to ``text`` fits the rate limits"""
+        now = self._refill()
+        backspaces, suffix = minimal_edit(self.typed, text)
+        wait = max(0.0, self._revised_at + self.min_interval - now)
+        shortfall = backspaces + len(suffix) - self._tokens
+        if shortfall > 0:
+            wait = max(wait, shortfall / self.rate)
+        return wait
+
+    def revise(self, text):
+        """Bring the draft on screen to ``text``"""
+        self._apply(text)
+        self.revisions += 1
+        self._revised_at = time.monotonic()
+        _revisions["typed"].inc()
+
+    def supersede(self, count=1):
+        """Record revisions replaced by a newer one before being typed"""
+        self.superseded += count
+        _revisions["superseded"].inc(count)
+
+    def commit(self, text):
+        """Correct the draft to the final ``text`` and leave it on screen"""
+        self._apply(text)
+        self.typed = ""
+
+    def discard(self):
+        """Erase a draft that was never confirmed by a final"""
+        if self.typed:
+            logging.debug(f"Erasing unconfirmed interim text: {self.typed}")
+            self._apply("")
+
+    @property
+    def saved_keystrokes(self):
+        return self.naive_keystrokes - self.keystrokes
+
+    def log_summary(self):
+        if not self.naive_keystrokes:
+            return
+        saved = self.saved_keystrokes / self.naive_keystrokes * 100
+        logging.info(
+            f"Interim typing: {self.revisions} revisions typed, {self.superseded} superseded; "
+            f"{self.keystrokes} keystrokes vs {self.naive_keystrokes} retyping "
+            f"({saved:.0f}% saved)"
+        )
+
+    def _apply(self, text):
+        backspaces, suffix = minimal_edit(self.typed, text)
+        if backspaces:
+            self.sink.backspace(backspaces)
+        if suffix:
+            self.sink.write(suffix)
+
+        cost = backspaces + len(suffix)
+        naive = len(self.typed) + len(text)
+        self.keystrokes += cost
+        self.naive_keystrokes += naive
+        self._refill()
+        self._tokens -= cost
+        _keystrokes["backspace"].inc(backspaces)
+        _keystrokes["typed"].inc(len(suffix))
+        _saved.inc(naive - cost)
+        self.typed = text
+
+    def _refill(self):
+        now = time.monotonic()
+        self._tokens = min(float(self.rate), self._tokens + (now - self._refilled_at) * self.rate)
+        self._refilled_at = now
+        return now
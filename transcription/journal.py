@@ -0,0 +1,229 @@
+import glob
+import json
+import logging
+import os
+import threading
+import time
+
+from transcription.transcript_bus import Subscriber, DROP_NEWEST
+from config import (
+    TRANSCRIPT_DIR,
+    TRANSCRIPT_JOURNAL_QUEUE_SIZE,
+    JOURNAL_FSYNC_POLICY,
+    JOURNAL_FSYNC_BATCH,
+    JOURNAL_FSYNC_INTERVAL,
+)
+
+END_RECORD_TYPE = "end"
+
+
+class TranscriptJournal:
+    """Append-only JSONL journal of a session's final segments.
+
+    Each final segment is one record carrying its text, word timings,
+    confidence, endpoint provenance and latency fields, tagged with the
+    index of the utterance it belongs to. The plain ``.txt`` transcript is
+    derived from it with one line per utterance.
+
+    Every record is flushed to the OS as soon as it is appended, so a crash
+    or kill loses nothing. ``JOURNAL_FSYNC_POLICY`` controls how often the
+    file is also forced to disk ("always", "batch" or "never"). A closed
+    journal ends with an ``end`` record; journals without one are recovered
+    on the next launch.
+    """
+
+    def __init__(
+        self,
+        path,
+        fsync_policy=JOURNAL_FSYNC_POLICY,
+        fsync_batch=JOURNAL_FSYNC_BATCH,
+        fsync_interval=JOURNAL_FSYNC_INTERVAL,
+    ):
+        self.path = path
+        self.fsync_policy = fsync_policy
+        self.fsync_batch = fsync_batch
+        self.fsync_interval = fsync_interval
+        self.records = 0
+        self.utterances = 0
+        self._file = None
+        self._unsynced = 0
+        self._last_sync = time.monotonic()
+        self._lock = threading.Lock()
+
+    def append_utterance(self, segments, endpoint, committed_at=None):
+        """Append the final segments that make up one committed utterance"""
+        if committed_at is None:
+            committed_at = time.time()
+        with self._lock:
+            for segment in segments:
+                self._write(segment.to_record(self.utterances, endpoint, committed_at))
+                self.records += 1
+            self.utterances += 1
+
+    def close(self):
+        """Terminate the journal so it is not treated as a crashed session"""
+        with self._lock:
+            if not self._file:
+                return
+            self._write({"type": END_RECORD_TYPE, "time": time.time()})
+            self._sync()
+            self._file.close()
+            self._file = None
+
+    def export_text(self, txt_path):
+        """Write the plain-text transcript from the journal"""
+        return export_text(self.path, txt_path)
+
+    def _write(self, record):
+        if not self._file:
+            self._file = open(self.path, "a", encoding="utf-8")
+        self._file.write(json.dumps(record, ensure_ascii=False) + "\n")
+        self._file.flush()
+        self._unsynced += 1
+
+        if self.fsync_policy == "always":
+            self._sync()
+        elif self.fsync_policy == "batch":
+            if (
+                self._unsynced >= self.fsync_batch
+                or time.monotonic() - self._last_sync >= self.fsync_interval
+            ):
+                self._sync()
+
+    def _sync(self):
+        if self.fsync_policy == "never" or not self._unsynced:
+            return
+        try:
+            os.fsync(self._file.fileno())
+        except OSError as e:
+            logging.error(f"Failed to fsync transcript journal: {e}")
+        self._unsynced = 0
+        self._last_sync = time.monotonic()
+
+
+class JournalSubscriber(Subscriber):
+    """Bus subscriber that appends committed utterances to a ``TranscriptJournal``.
+
+    Writes and fsyncs happen on the subscriber's thread instead of the
+    websocket receive path. Its queue is large and keeps the oldest
+    utterances, so the journal stays an in-order prefix of the session
+    even if the disk stalls for a long time.
+    """
+
+    name = "journal"
+    durable = True
+
+    def __init__(self, journal, maxsize=TRANSCRIPT_JOURNAL_QUEUE_SIZE):
+        super().__init__(maxsize=maxsize, overflow=DROP_NEWEST)
+        self.journal = journal
+
+    def handle(self, event):
+        self.journal.append_utterance(event.segments, event.endpoint, committed_at=event.at)
+
+
+def iter_records(journal_path):
+    """Yield journal records one at a time, skipping torn or invalid lines"""
+    with open(journal_path, "r", encoding="utf-8", errors="replace") as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                yield json.loads(line)
+            except json.JSONDecodeError:
+                logging.warning(f"Skipping unreadable journal line in {journal_path}")
+
+
+def iter_timed_utterances(journal_path):
+    """Yield (text, wall-clock time) for each utterance in a journal, in order"""
+    current_id = None
+    parts = []
+    started_at = None
+    for record in iter_records(journal_path):
+        record_type = record.get("type")
+        if record_type == "segment":
+            if record.get("utterance") != current_id and parts:
+                yield " ".join(parts), started_at
+                parts = []
+            if not parts:
+                started_at = record.get("received_at")
+            current_id = record.get("utterance")
+            text = record.get("text", "").strip()
+            if text:
+                parts.append(text)
+        elif record_type == "utterance":
+            # Journals written before segment records existed
+            text = record.get("text", "").strip()
+            if text:
+                yield text, record.get("time")
+    if parts:
+        yield " ".join(parts), started_at
+
+
+def iter_utterances(journal_path):
+    """Yield the text of each utterance in a journal, in order"""
+    for text, _ in iter_timed_utterances(journal_path):
+        yield text
+
+
+def export_text(journal_path, txt_path):
+    """Stream a journal into a plain-text transcript; returns the utterance count"""
+    count = 0
+    tmp_path = txt_path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as out:
+        for text in iter_utterances(journal_path):
+            if count:
+                out.write("\n")
+            out.write(text)
+            count += 1
+
+    if count:
+        os.replace(tmp_path, txt_path)
+    else:
+        os.remove(tmp_path)
+    return count
+
+
+def is_terminated(journal_path):
+    """Check whether the journal's last record is an end record"""
+    with open(journal_path, "rb") as f:
+        f.seek(0, os.SEEK_END)
+        size = f.tell()
+        f.seek(max(0, size - 4096))
+        tail = f.read().decode("utf-8", errors="replace")
+
+    lines = [line for line in tail.splitlines() if line.strip()]
+    if not lines:
+        return False
+    try:
+        return json.loads(lines[-1]).get("type") == END_RECORD_TYPE
+    except json.JSONDecodeError:
+        return False
+
+
+def journal_path_for(txt_path):
+    """Journal path that belongs to a transcript text file"""
+    return os.path.splitext(txt_path)[0] + ".jsonl"
+
+
+def recover_journals(directory=TRANSCRIPT_DIR):
+    """Export and terminate journals left behind by a crashed session"""
+    recovered = []
+    for journal_path in sorted(glob.glob(os.path.join(directory, "transcript_*.jsonl"))):
+        try:
+            if is_terminated(journal_path):
+                continue
+
+            txt_path = os.path.splitext(journal_path)[0] + ".txt"
+            count = export_text(journal_path, txt_path)
+            end_record = {"type": END_RECORD_TYPE, "time": time.time(), "recovered": True}
+            with open(journal_path, "a", encoding="utf-8") as f:
+                # Leading newline terminates a torn final line, if any
+                f.write("\n" + json.dumps(end_record) + "\n")
+            logging.info(
+                f"Recovered {count} utterances from unterminated journal: {journal_path}"
+            )
+            recovered.append(txt_path)
+        except Exception as e:
+            logging.error(f"Failed to recover transcript journal {journal_path}: {e}")
+    return recovered
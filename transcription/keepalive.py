@@ -0,0 +1,41 @@
+import logging
+import threading
+import time
+
+from config import KEEPALIVE_INTERVAL_SECONDS
+from utils.metrics import registry
+
+_keepalives_sent = registry.counter("keepalive_messages_total", "KeepAlive messages sent")
+
+
+class KeepAliveTimer:
+    """Sends a Deepgram KeepAlive when no audio has been sent for a while.
+
+    Shared by the audio stages that can withhold audio (pause gate, VAD) so
+    there is a single notion of "last time something went over the socket".
+    """
+
+    def __init__(self, keep_alive, interval=KEEPALIVE_INTERVAL_SECONDS):
+        self.keep_alive = keep_alive
+        self.interval = interval
+        self.sent = 0
+        self._last_send = time.monotonic()
+        self._lock = threading.Lock()
+
+    def mark_sent(self, now=None):
+        """Record that audio was just sent"""
+        self._last_send = now if now is not None else time.monotonic()
+
+    def tick(self, now=None):
+        """Send a KeepAlive if the socket has been idle for the interval"""
+        now = now if now is not None else time.monotonic()
+        with self._lock:
+            if now - self._last_send < self.interval:
+                return
+            self._last_send = now
+        try:
+            self.keep_alive()
+            self.sent += 1
+            _keepalives_sent.inc()
+        except Exception as e:
+            logging.error(f"Failed to send KeepAlive: {e}")
@@ -0,0 +1,223 @@
+import logging
+import queue
+import threading
+import time
+
+from transcription.interim_typing import InterimTypist
+from transcription.sinks import create_sink
+from transcription.transcript_bus import FINAL
+from config import OUTPUT_QUEUE_SIZE, INTERIM_TYPING_ENABLED
+from utils.metrics import registry
+
+_dropped = registry.counter("output_dropped_total", "Utterances dropped because the output queue was full")
+_injections = registry.counter("output_injections_total", "Sink writes after coalescing")
+
+_STOP = object()
+
+
+class OutputQueue:
+    """Bounded queue that hands finished utterances to an output sink on its own thread.
+
+    The Deepgram receive thread only enqueues text and returns immediately.
+    Utterances that are already waiting when the worker wakes up are
+    coalesced into a single injection.
+
+    Latency traces queued with an utterance get their typing start/finish
+    times stamped and are passed to ``on_written`` once the text is out.
+
+    With interim typing, drafts of the utterance in progress are typed as
+    they arrive and corrected in place; only the newest waiting draft is
+    typed, and utterances replace the draft with their final text.
+    """
+
+    def __init__(
+        self, sink=None, maxsize=OUTPUT_QUEUE_SIZE, on_written=None, interim_typing=INTERIM_TYPING_ENABLED
+    ):
+        self.sink = sink or create_sink()
+        self.on_written = on_written
+        self.typist = InterimTypist(self.sink) if interim_typing else None
+        self.dropped = 0
+        self.last_lag = 0.0
+        self._queue = queue.Queue(maxsize=maxsize)
+        self._thread = None
+
+    def start(self):
+        """Start the output worker thread"""
+        if self._thread and self._thread.is_alive():
+            return
+        self._thread = threading.Thread(
+            target=self._worker, name="OutputQueue", daemon=True
+        )
+        self._thread.start()
+
+    def stop(self, timeout=5):
+        """Flush pending utterances and stop the worker thread"""
+        if not self._thread:
+            return
+        try:
+            self._queue.put(_STOP, timeout=timeout)
+        except queue.Full:
+            logging.warning("Output queue full while stopping; pending text dropped.")
+        self._thread.join(timeout=timeout)
+        if self._thread.is_alive():
+            logging.warning("Output worker did not terminate gracefully.")
+        self._thread = None
+        self.sink.close()
+
+    def put(self, text, trace=None):
+        """Hand an utterance to the worker without blocking the caller"""
+        try:
+            self._queue.put_nowait((text, time.monotonic(), trace, False))
+            return True
+        except queue.Full:
+            self.dropped += 1
+            _dropped.inc()
+            logging.error(f"Output queue full, dropping utterance: {text}")
+            return False
+
+    def put_draft(self, text):
+        """Hand over the current draft of the utterance in progress; no-op unless interim typing"""
+        if not self.typist:
+            return False
+        try:
+            self._queue.put_nowait((text, time.monotonic(), None, True))
+            return True
+        except queue.Full:
+            # A newer draft or the final will follow
+            return False
+
+    @property
+    def depth(self):
+        """Number of utterances waiting to be typed"""
+        return self._queue.qsize()
+
+    @property
+    def lag(self):
+        """Seconds the oldest waiting utterance has been queued"""
+        with self._queue.mutex:
+            pending = [item for item in self._queue.queue if item is not _STOP and not item[3]]
+        if not pending:
+            return 0.0
+        return time.monotonic() - pending[0][1]
+
+    def _worker(self):
+        """Drain the queue, coalescing back-to-back utterances"""
+        draft = None  # Newest draft not typed yet, held back by the rate limit
+        stopping = False
+        while not stopping:
+            timeout = self.typist.delay(draft) if draft is not None else None
+            try:
+                item = self._queue.get(timeout=timeout)
+            except queue.Empty:
+                self._revise(draft)
+                draft = None
+                continue
+            if item is _STOP:
+                break
+
+            batch = [item]
+            while True:
+                try:
+                    item = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if item is _STOP:
+                    stopping = True
+                    break
+                batch.append(item)
+
+            # Drafts only matter after the last utterance in the batch
+            utterances = []
+            for item in batch:
+                if item[3]:
+                    if draft is not None:
+                        self.typist.supersede()
+                    draft = item[0]
+                    continue
+                if draft is not None:
+                    self.typist.supersede()
+                    draft = None
+                utterances.append(item)
+            if utterances:
+                self._write(utterances)
+
+        if self.typist:
+            if draft is not None:
+                self.typist.supersede()
+            try:
+                self.typist.discard()
+            except Exception as e:
+                logging.error(f"Error erasing interim text: {e}")
+
+    def _revise(self, draft):
+        try:
+            self.typist.revise(draft)
+        except Exception as e:
+            logging.error(f"Error typing interim text: {e}")
+
+    def _write(self, items):
+        """Type finished utterances as one injection"""
+        texts = [item[0] for item in items]
+        traces = [item[2] for item in items]
+        self.last_lag = time.monotonic() - items[0][1]
+        text = " ".join(texts) + " "
+        if len(texts) > 1:
+            logging.debug(f"Coalesced {len(texts)} utterances into one injection")
+        started = time.monotonic()
+        _injections.inc()
+        try:
+            if self.typist:
+                self.typist.commit(text)
+            else:
+                self.sink.write(text)
+        except Exception as e:
+            logging.error(f"Error typing utterance: {e}")
+        finished = time.monotonic()
+
+        traces = [trace for trace in traces if trace is not None]
+        if traces and self.on_written:
+            for trace in traces:
+                trace.typing_started = started
+                trace.typing_finished = finished
+            try:
+                self.on_written(traces)
+            except Exception as e:
+                logging.error(f"Error recording output latency: {e}")
+
+
+class TypingSubscriber:
+    """Bus subscriber that types events through an ``OutputQueue``.
+
+    The queue is already bounded, refuses new utterances when full and has
+    its own worker, so events are handed straight to it; drafts are only
+    wanted when interim typing is on.
+    """
+
+    name = "typing"
+    durable = False
+    background = False
+
+    def __init__(self, output_queue):
+        self.output_queue = output_queue
+        self.interims = output_queue.typist is not None
+
+    def start(self):
+        self.output_queue.start()
+
+    def offer(self, event):
+        if event.kind == FINAL:
+            return self.output_queue.put(event.text, event.trace)
+        return self.output_queue.put_draft(event.text)
+
+    def drain(self, timeout=None):
+        return True
+
+    def stop(self):
+        pass
+
+    def join(self, timeout=5):
+        """Type what is queued and stop the output worker"""
+        self.output_queue.stop(timeout)
+        if self.output_queue.typist:
+            self.output_queue.typist.log_summary()
+        return True
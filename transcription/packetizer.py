@@ -0,0 +1,149 @@
+import bisect
+import collections
+import logging
+import threading
+import time
+
+from config import (
+    DG_SAMPLE_RATE,
+    SEND_PACKET_MS,
+    SEND_PACKET_ADAPTIVE,
+    SEND_PACKET_MIN_MS,
+    SEND_PACKET_MAX_MS,
+    SEND_PACKET_RTT_FRACTION,
+    SEND_PACKET_MAX_BYTES,
+    SEND_BACKPRESSURE_SECONDS,
+)
+
+BYTES_PER_SAMPLE = 2  # linear16
+
+# Smoothing for the result latency average, and for adaptive hold changes
+LATENCY_SMOOTHING = 0.2
+HOLD_SMOOTHING = 0.25
+# After backpressure the hold only grows for this long
+BACKPRESSURE_COOLDOWN = 2.0
+
+
+class SendPacketizer:
+    """Chooses how long the AudioSender holds frames so they go out as one message.
+
+    Each message has a fixed overhead, and holding frames back adds latency.
+    With a fixed ``packet_ms`` the oldest frame waits at most that long
+    before the frames queued behind it are sent together, up to
+    ``max_bytes`` per message. In adaptive mode the hold tracks
+    ``rtt_fraction`` of the measured result latency: the time from sending
+    audio to receiving a result that covers it. It stays within
+    ``min_ms``..``max_ms`` and grows quickly while sends are slow or frames
+    back up. One packetizer serves the whole session, across reconnects.
+    """
+
+    def __init__(
+        self,
+        packet_ms=SEND_PACKET_MS,
+        adaptive=SEND_PACKET_ADAPTIVE,
+        min_ms=SEND_PACKET_MIN_MS,
+        max_ms=SEND_PACKET_MAX_MS,
+        rtt_fraction=SEND_PACKET_RTT_FRACTION,
+        max_bytes=SEND_PACKET_MAX_BYTES,
+        sample_rate=DG_SAMPLE_RATE,
+        history=2048,
+    ):
+        self.adaptive = adaptive
+        self.min_hold = min_ms / 1000
+        self.max_hold = max_ms / 1000
+        self.rtt_fraction = rtt_fraction
+        self.max_bytes = max_bytes
+        self.hold = packet_ms / 1000
+        if adaptive:
+            self.hold = min(max(self.hold, self.min_hold), self.max_hold)
+        self.bytes_per_second = sample_rate * BYTES_PER_SAMPLE
+        self.packets = 0
+        self.frames = 0
+        self.payload_bytes = 0
+        self.backpressure_events = 0
+        self.result_latency = None  # Smoothed, in seconds
+        self._hold_total = 0.0
+        self._first_send = None
+        self._last_send = None
+        self._last_backpressure = None
+        # Parallel arrays: connection offset where each sent frame ends, and when it was sent
+        self._sent_bytes = 0
+        self._sent_ends = collections.deque(maxlen=history)
+        self._sent_times = collections.deque(maxlen=history)
+        self._lock = threading.Lock()
+
+    def new_connection(self):
+        """Restart the audio timeline; result offsets are per connection"""
+        with self._lock:
+            self._sent_bytes = 0
+            self._sent_ends.clear()
+            self._sent_times.clear()
+
+    def on_audio_sent(self, data):
+        """Record a PCM frame going out (replays included, as they are on the connection timeline)"""
+        now = time.monotonic()
+        with self._lock:
+            self._sent_bytes += len(data)
+            self._sent_ends.append(self._sent_bytes / self.bytes_per_second)
+            self._sent_times.append(now)
+
+    def on_result(self, connection_end):
+        """Measure result latency from a result covering audio up to ``connection_end`` seconds"""
+        now = time.monotonic()
+        with self._lock:
+            index = bisect.bisect_left(self._sent_ends, connection_end - 1e-6)
+            if index >= len(self._sent_times):
+                return
+            latency = now - self._sent_times[index]
+            if self.result_latency is None:
+                self.result_latency = latency
+            else:
+                self.result_latency += (latency - self.result_latency) * LATENCY_SMOOTHING
+            if self.adaptive:
+                self._follow_latency(now)
+
+    def on_packet(self, size, frames, hold, send_seconds, backlog):
+        """Record a sent message and react to backpressure"""
+        now = time.monotonic()
+        with self._lock:
+            self.packets += 1
+            self.frames += frames
+            self.payload_bytes += size
+            self._hold_total += hold
+            if self._first_send is None:
+                self._first_send = now
+            self._last_send = now
+
+            if send_seconds > SEND_BACKPRESSURE_SECONDS or backlog > max(1, frames):
+                self.backpressure_events += 1
+                self._last_backpressure = now
+                if self.adaptive:
+                    self.hold = min(self.max_hold, max(self.hold * 1.5, 0.02))
+
+    @property
+    def message_rate(self):
+        """Messages per second over the time audio was being sent"""
+        if self.packets < 2:
+            return 0.0
+        return (self.packets - 1) / max(self._last_send - self._first_send, 1e-6)
+
+    def log_summary(self):
+        if not self.packets:
+            return
+        latency = f"{self.result_latency * 1000:.0f} ms" if self.result_latency is not None else "n/a"
+        logging.info(
+            f"Send packets: {self.packets} messages ({self.message_rate:.1f}/s), avg payload "
+            f"{self.payload_bytes / self.packets:.0f} bytes ({self.frames / self.packets:.1f} frames); "
+            f"avg hold {self._hold_total / self.packets * 1000:.0f} ms, "
+            f"{'adaptive' if self.adaptive else 'fixed'} hold now {self.hold * 1000:.0f} ms; "
+            f"result latency {latency}; {self.backpressure_events} backpressure event(s)"
+        )
+
+    def _follow_latency(self, now):
+        target = min(max(self.result_latency * self.rtt_fraction, self.min_hold), self.max_hold)
+        recently_pushed_back = (
+            self._last_backpressure is not None and now - self._last_backpressure < BACKPRESSURE_COOLDOWN
+        )
+        if target < self.hold and recently_pushed_back:
+            return
+        self.hold += (target - self.hold) * HOLD_SMOOTHING
@@ -0,0 +1,332 @@
+"""Session audio recordings kept next to their transcripts.
+
+Each session's streamed audio (what Deepgram was sent, after the VAD) is
+written to ``transcript_<timestamp>.wav`` (or ``.flac``), so a journal
+segment's ``start`` is also its offset in the recording. Recordings are
+pruned by total size and age.
+
+Usage:
+    python -m transcription.recording transcripts/transcript_20250101_093000.txt --line 3
+    python -m transcription.recording transcripts/transcript_20250101_093000.txt \\
+        --at "2025-01-01 09:41:07" --extract clip.wav
+"""
+import argparse
+import datetime
+import errno
+import glob
+import logging
+import mmap
+import os
+import queue
+import struct
+import threading
+import time
+import wave
+
+from transcription.journal import iter_records, journal_path_for
+from config import (
+    DG_SAMPLE_RATE,
+    TRANSCRIPT_DIR,
+    RECORDING_FORMAT,
+    RECORDING_PREALLOCATE_SECONDS,
+    RECORDING_MAX_TOTAL_MB,
+    RECORDING_MAX_AGE_DAYS,
+)
+
+BYTES_PER_SAMPLE = 2  # linear16
+WAV_HEADER_SIZE = 44
+RECORDING_EXTENSIONS = (".wav", ".flac")
+
+_STOP = object()
+
+
+class MmapWavWriter:
+    """16-bit mono WAV written through a memory map of a pre-sized file.
+
+    Frames are copied straight into the mapped pages on the caller's
+    thread; the file grows by ``preallocate_seconds`` of audio whenever it
+    fills. The header is rewritten with the real size and the file trimmed
+    on ``close()``. A recording cut short by a crash is still a valid WAV
+    padded with silence.
+
+    Disk space is reserved before it is mapped, so a full disk raises
+    ``OSError`` from ``write()`` instead of SIGBUS on a sparse page.
+    """
+
+    def __init__(self, path, sample_rate=DG_SAMPLE_RATE, preallocate_seconds=RECORDING_PREALLOCATE_SECONDS):
+        self.path = path
+        self.sample_rate = sample_rate
+        self.step = int(preallocate_seconds * sample_rate) * BYTES_PER_SAMPLE
+        self.size = 0  # Audio bytes written
+        self._capacity = self.step
+        self._lock = threading.Lock()
+        self._file = open(path, "w+b")
+        try:
+            self._reserve(WAV_HEADER_SIZE + self._capacity)
+            self._map = mmap.mmap(self._file.fileno(), WAV_HEADER_SIZE + self._capacity)
+        except Exception:
+            self._file.close()
+            raise
+        self._write_header(self._capacity)
+
+    @property
+    def seconds(self):
+        return self.size / (self.sample_rate * BYTES_PER_SAMPLE)
+
+    def write(self, data):
+        with self._lock:
+            if not self._map:
+                return
+            end = self.size + len(data)
+            if end > self._capacity:
+                self._grow(max(end, self._capacity + self.step))
+            self._map[WAV_HEADER_SIZE + self.size:WAV_HEADER_SIZE + end] = data
+            self.size = end
+
+    def close(self):
+        with self._lock:
+            if not self._map:
+                return
+            self._write_header(self.size)
+            self._map.flush()
+            self._map.close()
+            self._map = None
+            self._file.truncate(WAV_HEADER_SIZE + self.size)
+            self._file.close()
+
+    def _grow(self, capacity):
+        """Re-map a larger file; ``mmap.resize`` is missing on macOS.
+
+        If the space cannot be reserved, the old mapping is restored so
+        what was recorded can still be closed and saved.
+        """
+        self._map.flush()
+        self._map.close()
+        try:
+            self._reserve(WAV_HEADER_SIZE + capacity)
+            self._capacity = capacity
+        finally:
+            self._map = mmap.mmap(self._file.fileno(), WAV_HEADER_SIZE + self._capacity)
+        self._write_header(self._capacity)
+
+    def _reserve(self, size):
+        """Allocate real disk blocks for the first ``size`` bytes of the file"""
+        fileno = self._file.fileno()
+        if hasattr(os, "posix_fallocate"):
+            try:
+                os.posix_fallocate(fileno, 0, size)
+                return
+            except OSError as e:
+                if e.errno not in (errno.EOPNOTSUPP, errno.EINVAL):
+                    raise
+        # No fallocate (macOS, Windows, some filesystems): write the zeros out
+        current = os.fstat(fileno).st_size
+        zeros = memoryview(bytes(min(max(size - current, 0), 1024 * 1024)))
+        self._file.seek(current)
+        while current < size:
+            current += self._file.write(zeros[:size - current])
+        self._file.flush()
+
+    def _write_header(self, data_size):
+        byte_rate = self.sample_rate * BYTES_PER_SAMPLE
+        self._map[:WAV_HEADER_SIZE] = struct.pack(
+            "<4sI4s4sIHHIIHH4sI",
+            b"RIFF", 36 + data_size, b"WAVE",
+            b"fmt ", 16, 1, 1, self.sample_rate, byte_rate, BYTES_PER_SAMPLE, 16,
+            b"data", data_size,
+        )
+
+
+class FlacRecorder:
+    """FLAC recording encoded on a background thread (needs ``pyflac``).
+
+    ``write()`` only queues the caller's buffer, so the capture path does
+    no encoding and no copying.
+    """
+
+    def __init__(self, path, sample_rate=DG_SAMPLE_RATE):
+        from transcription.encoders import FlacEncoder
+
+        self.path = path
+        self.sample_rate = sample_rate
+        self.size = 0
+        self._encoder = FlacEncoder(sample_rate)
+        self._file = open(path, "wb")
+        self._queue = queue.Queue()
+        self._thread = threading.Thread(target=self._worker, name="FlacRecorder", daemon=True)
+        self._thread.start()
+
+    @property
+    def seconds(self):
+        return self.size / (self.sample_rate * BYTES_PER_SAMPLE)
+
+    def write(self, data):
+        self.size += len(data)
+        self._queue.put_nowait(data)
+
+    def close(self):
+        if not self._thread:
+            return
+        self._queue.put_nowait(_STOP)
+        self._thread.join()
+        self._thread = None
+
+    def _worker(self):
+        try:
+            while True:
+                data = self._queue.get()
+                if data is _STOP:
+                    self._file.write(self._encoder.flush())
+                    return
+                self._file.write(self._encoder.encode(data))
+        except Exception as e:
+            logging.error(f"FLAC recording failed: {e}")
+        finally:
+            self._file.close()
+
+
+def recording_path_for(txt_path, fmt=RECORDING_FORMAT):
+    """Recording path that belongs to a transcript text file"""
+    return os.path.splitext(txt_path)[0] + "." + fmt
+
+
+def find_recording(txt_path):
+    """The existing recording for a transcript, or None"""
+    for ext in RECORDING_EXTENSIONS:
+        path = os.path.splitext(txt_path)[0] + ext
+        if os.path.exists(path):
+            return path
+    return None
+
+
+def create_recorder(txt_path, fmt=RECORDING_FORMAT):
+    """Start recording the session that writes ``txt_path``"""
+    path = recording_path_for(txt_path, fmt)
+    if fmt == "wav":
+        return MmapWavWriter(path)
+    if fmt == "flac":
+        return FlacRecorder(path)
+    raise ValueError(f"Unknown recording format: {fmt}")
+
+
+def apply_retention(
+    directory=TRANSCRIPT_DIR, max_total_mb=RECORDING_MAX_TOTAL_MB, max_age_days=RECORDING_MAX_AGE_DAYS
+):
+    """Delete recordings older than ``max_age_days``, then the oldest beyond ``max_total_mb``"""
+    recordings = []
+    for ext in RECORDING_EXTENSIONS:
+        for path in glob.glob(os.path.join(directory, "transcript_*" + ext)):
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue
+            recordings.append((stat.st_mtime, stat.st_size, path))
+    recordings.sort()
+
+    cutoff = time.time() - max_age_days * 86400
+    total = sum(size for _, size, _ in recordings)
+    budget = max_total_mb * 1024 * 1024
+    removed = 0
+    for mtime, size, path in recordings:
+        if mtime >= cutoff and total <= budget:
+            break
+        try:
+            os.remove(path)
+        except OSError as e:
+            logging.warning(f"Could not delete old recording {path}: {e}")
+            continue
+        total -= size
+        removed += 1
+    if removed:
+        logging.info(f"Recording retention: deleted {removed} old recording(s)")
+    return removed
+
+
+def iter_utterance_spans(journal_path):
+    """Yield (text, received_at, start, end) per transcript line from a journal"""
+    current_id = None
+    parts, received_at, start, end = [], None, None, None
+    for record in iter_records(journal_path):
+        if record.get("type") != "segment":
+            continue
+        if record.get("utterance") != current_id and parts:
+            yield " ".join(parts), received_at, start, end
+            parts = []
+        if not parts:
+            received_at, start = record.get("received_at"), record.get("start")
+        current_id = record.get("utterance")
+        text = record.get("text", "").strip()
+        if text:
+            parts.append(text)
+            end = record.get("start", 0.0) + record.get("duration", 0.0)
+    if parts:
+        yield " ".join(parts), received_at, start, end
+
+
+def locate(txt_path, line=None, at=None):
+    """Find a transcript line by number or wall-clock time.
+
+    Returns ``(line, text, start, end)`` with ``start``/``end`` as seconds
+    into the session recording, or None if nothing matches.
+    """
+    journal_path = journal_path_for(txt_path)
+    if not os.path.exists(journal_path):
+        raise FileNotFoundError(f"No journal for {txt_path}; audio offsets need one")
+
+    match = None
+    for number, (text, received_at, start, end) in enumerate(iter_utterance_spans(journal_path), 1):
+        if line is not None and number == line:
+            return number, text, start, end
+        # The last line received by ``at``; the first line if ``at`` is earlier
+        if at is not None and received_at is not None:
+            if received_at > at and match:
+                break
+            match = (number, text, start, end)
+    return match
+
+
+def extract_clip(recording_path, start, end, out_path, padding=0.5):
+    """Copy ``start``..``end`` seconds (plus padding) of a WAV recording to ``out_path``"""
+    with wave.open(recording_path, "rb") as src:
+        rate = src.getframerate()
+        first = max(0, int((start - padding) * rate))
+        last = min(src.getnframes(), int((end + padding) * rate))
+        src.setpos(first)
+        frames = src.readframes(last - first)
+        with wave.open(out_path, "wb") as dst:
+            dst.setparams(src.getparams())
+            dst.writeframes(frames)
+    return (last - first) / rate
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Find a transcript line in its session recording")
+    parser.add_argument("transcript", help="transcript_*.txt file")
+    group = parser.add_mutually_exclusive_group(required=True)
+    group.add_argument("--line", type=int, help="Line number in the transcript (1-based)")
+    group.add_argument("--at", help='Wall-clock time as shown by search, "YYYY-MM-DD HH:MM:SS"')
+    parser.add_argument("--extract", help="Write the line's audio to this WAV file")
+    args = parser.parse_args()
+
+    at = None
+    if args.at:
+        at = datetime.datetime.strptime(args.at, "%Y-%m-%d %H:%M:%S").timestamp()
+    found = locate(args.transcript, line=args.line, at=at)
+    if not found:
+        print("No matching transcript line.")
+        raise SystemExit(1)
+
+    number, text, start, end = found
+    recording = find_recording(args.transcript)
+    print(f"Line {number}: {text}")
+    print(f"Audio:  {start:.2f}s - {end:.2f}s in {recording or '(no recording kept)'}")
+    if args.extract:
+        if not recording or not recording.endswith(".wav"):
+            print("Clips can only be extracted from WAV recordings.")
+            raise SystemExit(1)
+        seconds = extract_clip(recording, start, end, args.extract)
+        print(f"Wrote {seconds:.1f}s to {args.extract}")
+
+
+if __name__ == "__main__":
+    main()
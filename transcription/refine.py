@@ -0,0 +1,357 @@
+"""Second-pass refinement of finished sessions.
+
+The live stream is tuned for latency. After a session ends, its recording
+is re-transcribed through the prerecorded API with accuracy-oriented
+settings, and ``refined_<timestamp>.txt`` (with its journal) is written
+next to the live transcript together with ``refined_<timestamp>.diff.txt``,
+a word-level diff between the two passes.
+
+Jobs run in low-priority worker processes and only while no live session
+is running: starting a session stops running jobs and queues them again.
+
+Usage:
+    python -m transcription.refine transcripts/transcript_20250101_093000.txt
+"""
+import argparse
+import asyncio
+import collections
+import datetime
+import difflib
+import logging
+import multiprocessing
+import os
+import re
+import sys
+import textwrap
+import threading
+import time
+
+from config import (
+    DG_URL,
+    DG_LANGUAGE,
+    REFINE_MODEL,
+    REFINE_UTT_SPLIT,
+    REFINE_WORKERS,
+    REFINE_NICE,
+    REFINE_IDLE_DELAY,
+    REFINE_ACTIVE_HOURS,
+)
+
+DIFF_WIDTH = 100
+
+
+def refined_path_for(txt_path):
+    """refined_<timestamp>.txt for transcript_<timestamp>.txt"""
+    directory, name = os.path.split(txt_path)
+    return os.path.join(directory, "refined_" + name[len("transcript_"):])
+
+
+def diff_path_for(txt_path):
+    return os.path.splitext(refined_path_for(txt_path))[0] + ".diff.txt"
+
+
+def _normalize(word):
+    return re.sub(r"[^\w']", "", word.lower())
+
+
+def word_diff(live_text, refined_text):
+    """Inline word diff, ``[-live-]{+refined+}``, and the number of words that differ.
+
+    Words are matched ignoring case and punctuation, so formatting-only
+    differences do not count as changes.
+    """
+    live, refined = live_text.split(), refined_text.split()
+    matcher = difflib.SequenceMatcher(
+        a=[_normalize(w) for w in live], b=[_normalize(w) for w in refined], autojunk=False
+    )
+    parts, changed = [], 0
+    for tag, i1, i2, j1, j2 in matcher.get_opcodes():
+        if tag == "equal":
+            parts.extend(refined[j1:j2])
+            continue
+        changed += max(i2 - i1, j2 - j1)
+        if i2 > i1:
+            parts.append("[-" + " ".join(live[i1:i2]) + "-]")
+        if j2 > j1:
+            parts.append("{+" + " ".join(refined[j1:j2]) + "+}")
+    return " ".join(parts), changed
+
+
+def refine_session(recording_path, live_txt_path):
+    """Re-transcribe a session recording and write the refined transcript and diff"""
+    from deepgram import DeepgramClient, DeepgramClientOptions, PrerecordedOptions
+    from transcription.batch import save_response, transcribe_file
+
+    started = time.monotonic()
+    options = PrerecordedOptions(
+        model=REFINE_MODEL,
+        language=DG_LANGUAGE,
+        smart_format=True,
+        punctuate=True,
+        utterances=True,
+        utt_split=REFINE_UTT_SPLIT,
+    )
+    config = DeepgramClientOptions(url=DG_URL, verbose=logging.CRITICAL)
+    client = DeepgramClient(api_key=os.getenv("DEEPGRAM_API_KEY"), config=config)
+    response = asyncio.run(transcribe_file(client, recording_path, options))
+
+    refined_path = refined_path_for(live_txt_path)
+    written, duration = save_response(response, refined_path, endpoint="refined")
+    refined_text = ""
+    if written:
+        with open(refined_path, "r", encoding="utf-8") as f:
+            refined_text = f.read()
+    live_text = ""
+    if os.path.exists(live_txt_path):
+        with open(live_txt_path, "r", encoding="utf-8") as f:
+            live_text = f.read()
+
+    diff, changed = word_diff(live_text, refined_text)
+    live_words = len(live_text.split())
+    rate = changed / live_words * 100 if live_words else 0.0
+    diff_path = diff_path_for(live_txt_path)
+    with open(diff_path + ".tmp", "w", encoding="utf-8") as f:
+        f.write(f"live:    {live_txt_path} ({live_words} words)\n")
+        f.write(f"refined: {refined_path} ({len(refined_text.split())} words)\n")
+        f.write(f"changed: {changed} words ({rate:.1f}% of live)\n\n")
+        f.write(textwrap.fill(diff, DIFF_WIDTH) + "\n")
+    os.replace(diff_path + ".tmp", diff_path)
+
+    return {
+        "refined": refined_path if written else None,
+        "diff": diff_path,
+        "changed": changed,
+        "live_words": live_words,
+        "audio_seconds": duration,
+        "elapsed": time.monotonic() - started,
+    }
+
+
+def _lower_priority(nice):
+    """Give the worker process below-normal CPU and, where supported, idle I/O priority"""
+    try:
+        import psutil
+    except ImportError:
+        if hasattr(os, "nice"):
+            os.nice(nice)
+        return
+
+    process = psutil.Process()
+    if sys.platform == "win32":
+        process.nice(psutil.BELOW_NORMAL_PRIORITY_CLASS)
+        process.ionice(psutil.IOPRIO_LOW)
+    else:
+        process.nice(nice)
+        if hasattr(psutil, "IOPRIO_CLASS_IDLE"):
+            process.ionice(psutil.IOPRIO_CLASS_IDLE)
+
+
+def _run_job(recording_path, live_txt_path, conn, nice):
+    """Worker process entry point; reports the result or error over ``conn``"""
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+    logging.getLogger("httpx").setLevel(logging.WARNING)
+    try:
+        _lower_priority(nice)
+    except Exception as e:
+        logging.warning(f"Could not lower refinement worker priority: {e}")
+    try:
+        conn.send(refine_session(recording_path, live_txt_path))
+    except Exception as e:
+        conn.send({"error": str(e)})
+    finally:
+        conn.close()
+
+
+def _parse_hours(spec):
+    """(start, end) hours from "22-7", or None for any time"""
+    if not spec:
+        return None
+    start, end = spec.split("-")
+    return int(start) % 24, int(end) % 24
+
+
+class RefinementScheduler:
+    """Runs refinement jobs in worker processes while no live session is running.
+
+    Jobs wait until ``idle_delay`` seconds after the last session ended and,
+    if ``active_hours`` is set (e.g. "22-7"), until the clock is inside that
+    window. At most ``workers`` jobs run at once, each in its own process at
+    reduced priority. A session starting terminates running jobs and puts
+    them back at the front of the queue; with several concurrent sessions
+    (daemon mode) jobs wait until the last one has ended.
+    """
+
+    def __init__(
+        self,
+        workers=REFINE_WORKERS,
+        idle_delay=REFINE_IDLE_DELAY,
+        active_hours=REFINE_ACTIVE_HOURS,
+        nice=REFINE_NICE,
+    ):
+        self.workers = workers
+        self.idle_delay = idle_delay
+        self.active_hours = _parse_hours(active_hours)
+        self.nice = nice
+        self.completed = 0
+        self.failed = 0
+        self.preempted = 0
+        self._pending = collections.deque()
+        self._running = {}  # process -> (job, parent end of pipe)
+        self._live = 0  # Sessions running
+        self._idle_since = time.monotonic()
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._exit = threading.Event()
+        self._thread = None
+        # Spawned workers start clean instead of inheriting the GUI and audio threads
+        self._context = multiprocessing.get_context("spawn")
+
+    def start(self):
+        self._thread = threading.Thread(target=self._loop, name="RefinementScheduler", daemon=True)
+        self._thread.start()
+        return self
+
+    def submit(self, recording_path, live_txt_path):
+        """Queue a finished session for refinement"""
+        with self._lock:
+            self._pending.append((recording_path, live_txt_path))
+        logging.info(f"Queued {recording_path} for refinement")
+        self._wake.set()
+
+    def session_started(self):
+        """Stop refining while a live session runs; returns without waiting"""
+        with self._lock:
+            self._live += 1
+        self._wake.set()
+
+    def session_finished(self):
+        with self._lock:
+            self._live = max(0, self._live - 1)
+            self._idle_since = time.monotonic()
+        self._wake.set()
+
+    @property
+    def pending(self):
+        return len(self._pending) + len(self._running)
+
+    def shutdown(self):
+        """Terminate running jobs; queued jobs are dropped"""
+        self._exit.set()
+        self._wake.set()
+        if self._thread:
+            self._thread.join(timeout=5)
+            self._thread = None
+        with self._lock:
+            for process in list(self._running):
+                self._stop_process(process)
+            self._running.clear()
+            if self._pending:
+                logging.info(f"{len(self._pending)} refinement job(s) not run")
+
+    def _loop(self):
+        while not self._exit.is_set():
+            with self._lock:
+                self._reap()
+                if self._live:
+                    self._preempt()
+                elif self._may_dispatch():
+                    self._dispatch()
+            self._wake.wait(1)
+            self._wake.clear()
+
+    def _may_dispatch(self):
+        if not self._pending or len(self._running) >= self.workers:
+            return False
+        if time.monotonic() - self._idle_since < self.idle_delay:
+            return False
+        if self.active_hours:
+            start, end = self.active_hours
+            hour = datetime.datetime.now().hour
+            inside = start <= hour < end if start <= end else hour >= start or hour < end
+            if not inside:
+                return False
+        return True
+
+    def _dispatch(self):
+        while self._pending and len(self._running) < self.workers:
+            job = self._pending.popleft()
+            parent, child = self._context.Pipe(duplex=False)
+            process = self._context.Process(
+                target=_run_job, args=(*job, child, self.nice), name="Refinement", daemon=True
+            )
+            process.start()
+            child.close()
+            self._running[process] = (job, parent)
+            logging.info(f"Refining {job[0]} (pid {process.pid})")
+
+    def _preempt(self):
+        if not self._running:
+            return
+        for process, (job, _) in list(self._running.items()):
+            self._stop_process(process)
+            self._pending.appendleft(job)
+            self.preempted += 1
+        self._running.clear()
+        logging.info("Refinement stopped for the live session; jobs requeued")
+
+    def _reap(self):
+        for process, (job, conn) in list(self._running.items()):
+            if process.is_alive():
+                continue
+            result = None
+            try:
+                if conn.poll():
+                    result = conn.recv()
+            except (EOFError, OSError):
+                pass
+            conn.close()
+            process.join()
+            del self._running[process]
+            self._log_result(job, process, result)
+
+    def _log_result(self, job, process, result):
+        if not result:
+            self.failed += 1
+            logging.error(f"Refinement of {job[0]} exited with code {process.exitcode}")
+        elif "error" in result:
+            self.failed += 1
+            logging.error(f"Refinement of {job[0]} failed: {result['error']}")
+        else:
+            self.completed += 1
+            rate = result["changed"] / result["live_words"] * 100 if result["live_words"] else 0.0
+            logging.info(
+                f"Refined {job[0]} in {result['elapsed']:.1f}s: {result['changed']} of "
+                f"{result['live_words']} live words changed ({rate:.1f}%); diff: {result['diff']}"
+            )
+
+    def _stop_process(self, process):
+        process.terminate()
+        process.join(timeout=2)
+        if process.is_alive():
+            process.kill()
+            process.join()
+        conn = self._running.get(process, (None, None))[1]
+        if conn:
+            conn.close()
+
+
+def main():
+    from transcription.recording import find_recording
+
+    parser = argparse.ArgumentParser(description="Refine a saved session from its recording")
+    parser.add_argument("transcripts", nargs="+", help="transcript_*.txt files")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+    logging.getLogger("httpx").setLevel(logging.WARNING)
+    for txt_path in args.transcripts:
+        recording = find_recording(txt_path)
+        if not recording:
+            logging.error(f"No recording kept for {txt_path}")
+            continue
+        result = refine_session(recording, txt_path)
+        print(f"{txt_path}: {result['changed']} of {result['live_words']} words changed -> {result['diff']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+import logging
+import threading
+
+from config import DG_SAMPLE_RATE, RECONNECT_BUFFER_SECONDS
+
+BYTES_PER_SAMPLE = 2  # linear16
+
+
+class ReplayBuffer:
+    """Ring buffer of the audio streamed in this session, for replay after a reconnect.
+
+    It is the last stage before ``connection.send``, so its byte offsets are
+    the stream timeline Deepgram reports ``start``/``duration`` against.
+    Finals acknowledge audio up to their end; anything after the last
+    acknowledged offset is replayed onto a new connection.
+    """
+
+    def __init__(self, send, seconds=RECONNECT_BUFFER_SECONDS, sample_rate=DG_SAMPLE_RATE):
+        self.send = send
+        self.bytes_per_second = sample_rate * BYTES_PER_SAMPLE
+        self.capacity = int(seconds * self.bytes_per_second)
+        self.end = 0  # Total bytes written this session
+        self.acked = 0  # Session offset finalized by Deepgram
+        self.connection_base = 0  # Session offset where the current connection starts
+        self._buffer = bytearray(self.capacity)
+        self._lock = threading.Lock()
+
+    def __call__(self, data):
+        """Record a frame and send it on the current connection"""
+        with self._lock:
+            self._write(data)
+            self.send(data)
+
+    @property
+    def connection_base_seconds(self):
+        return self.connection_base / self.bytes_per_second
+
+    def acknowledge(self, connection_seconds):
+        """Mark audio up to ``connection_seconds`` on the current connection as finalized"""
+        offset = self.connection_base + int(connection_seconds * self.bytes_per_second)
+        offset -= offset % BYTES_PER_SAMPLE
+        with self._lock:
+            self.acked = max(self.acked, min(offset, self.end))
+
+    def replay(self, send, resend=None):
+        """Switch to a new connection and resend unacknowledged audio.
+
+        ``resend`` receives the backlog instead of ``send`` when given.
+        Returns the number of seconds replayed.
+        """
+        with self._lock:
+            oldest = max(0, self.end - self.capacity)
+            start = max(self.acked, oldest)
+            if start > self.acked:
+                lost = (start - self.acked) / self.bytes_per_second
+                logging.warning(
+                    f"Outage exceeded replay buffer; {lost:.1f}s of audio could not be replayed"
+                )
+
+            self.send = send
+            self.connection_base = start
+            backlog = self._read(start, self.end)
+            if backlog:
+                (resend or send)(backlog)
+        return len(backlog) / self.bytes_per_second
+
+    def _write(self, data):
+        size = len(data)
+        if size >= self.capacity:
+            data = data[size - self.capacity:]
+            self.end += size - self.capacity
+            size = self.capacity
+
+        pos = self.end % self.capacity
+        first = min(size, self.capacity - pos)
+        self._buffer[pos:pos + first] = data[:first]
+        if first < size:
+            self._buffer[:size - first] = data[first:]
+        self.end += size
+
+    def _read(self, start, end):
+        size = end - start
+        if size <= 0:
+            return b""
+        pos = start % self.capacity
+        first = min(size, self.capacity - pos)
+        data = bytes(self._buffer[pos:pos + first])
+        if first < size:
+            data += bytes(self._buffer[:size - first])
+        return data
@@ -0,0 +1,58 @@
+import math
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+from config import RESAMPLER_TAPS_PER_PHASE, RESAMPLER_KAISER_BETA
+
+
+class PolyphaseResampler:
+    """Streaming rational resampler (e.g. 48 kHz or 44.1 kHz to 16 kHz).
+
+    A Kaiser-windowed sinc low-pass is split into ``up`` polyphase
+    branches of ``taps_per_phase`` taps. Each block is resampled in one
+    vectorized step: the input window behind every output sample is taken
+    from a strided view and dotted with that sample's branch. Filter
+    history and the fractional phase carry over between blocks, so frames
+    of any size join seamlessly.
+    """
+
+    def __init__(self, in_rate, out_rate, taps_per_phase=RESAMPLER_TAPS_PER_PHASE, beta=RESAMPLER_KAISER_BETA):
+        divisor = math.gcd(int(in_rate), int(out_rate))
+        self.in_rate = int(in_rate)
+        self.out_rate = int(out_rate)
+        self.up = self.out_rate // divisor
+        self.down = self.in_rate // divisor
+        self.taps = taps_per_phase
+        self.passthrough = self.up == self.down
+        if self.passthrough:
+            return
+
+        # Cut off just below the lower Nyquist frequency, relative to the upsampled rate
+        length = self.up * taps_per_phase
+        cutoff = 0.5 / max(self.up, self.down) * 0.92
+        t = np.arange(length) - (length - 1) / 2
+        h = 2 * cutoff * np.sinc(2 * cutoff * t) * np.kaiser(length, beta)
+        h *= self.up / h.sum()
+        # branches[p, k] = h[k * up + p], reversed to match the oldest-first input windows
+        self._branches = np.ascontiguousarray(h.reshape(taps_per_phase, self.up).T[:, ::-1], dtype=np.float32)
+        self._history = np.zeros(taps_per_phase - 1, dtype=np.float32)
+        self._time = 0  # Next output position, in upsampled samples from the block start
+
+    def process(self, samples):
+        """Resample a block of mono samples; returns int16 samples at ``out_rate``"""
+        if self.passthrough:
+            return np.asarray(samples, dtype=np.int16)
+
+        block = np.concatenate((self._history, np.asarray(samples, dtype=np.float32)))
+        span = len(samples) * self.up
+        count = max(0, -(-(span - self._time) // self.down))
+        times = self._time + np.arange(count) * self.down
+        newest, phase = np.divmod(times, self.up)
+
+        windows = sliding_window_view(block, self.taps)
+        out = np.einsum("ij,ij->i", windows[newest], self._branches[phase])
+
+        self._time += count * self.down - span
+        self._history = block[len(block) - (self.taps - 1):]
+        return np.clip(np.rint(out), -32768, 32767).astype(np.int16)
@@ -0,0 +1,240 @@
+"""Full-text search over saved transcripts.
+
+Keeps an SQLite FTS5 index of every ``transcript_*.txt`` in TRANSCRIPT_DIR.
+Files are only re-indexed when their mtime or size changed.
+
+Usage:
+    python -m transcription.search_index "phrase to find"
+    python -m transcription.search_index --update
+"""
+import argparse
+import datetime
+import glob
+import logging
+import os
+import sqlite3
+import time
+
+from transcription.journal import iter_timed_utterances, journal_path_for
+from transcription.transcript_bus import Subscriber, DROP_NEWEST
+from config import TRANSCRIPT_DIR, SEARCH_INDEX_PATH, SEARCH_RESULT_LIMIT
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS files (
+    path TEXT PRIMARY KEY,
+    mtime REAL NOT NULL,
+    size INTEGER NOT NULL
+);
+CREATE VIRTUAL TABLE IF NOT EXISTS lines USING fts5(
+    text,
+    path UNINDEXED,
+    line UNINDEXED,
+    timestamp UNINDEXED,
+    tokenize = 'porter unicode61'
+);
+"""
+
+
+class SearchResult:
+    """One matching transcript line"""
+
+    __slots__ = ("path", "line", "timestamp", "snippet", "score")
+
+    def __init__(self, path, line, timestamp, snippet, score):
+        self.path = path
+        self.line = line
+        self.timestamp = timestamp
+        self.snippet = snippet
+        self.score = score
+
+    def format(self):
+        when = (
+            datetime.datetime.fromtimestamp(self.timestamp).strftime("%Y-%m-%d %H:%M:%S")
+            if self.timestamp
+            else "unknown time"
+        )
+        return f"{when}  {os.path.basename(self.path)}:{self.line}  {self.snippet}"
+
+
+class TranscriptIndex:
+    """Incremental FTS5 index over a transcript directory"""
+
+    def __init__(self, db_path=SEARCH_INDEX_PATH, transcript_dir=TRANSCRIPT_DIR):
+        self.db_path = db_path
+        self.transcript_dir = transcript_dir
+        self._conn = sqlite3.connect(db_path, timeout=10)
+        self._conn.executescript(SCHEMA)
+
+    def close(self):
+        self._conn.close()
+
+    def update(self):
+        """Index new or changed transcripts and drop deleted ones"""
+        started = time.perf_counter()
+        on_disk = {}
+        for path in glob.glob(os.path.join(self.transcript_dir, "transcript_*.txt")):
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue
+            on_disk[os.path.abspath(path)] = (stat.st_mtime, stat.st_size)
+
+        indexed = {
+            path: (mtime, size)
+            for path, mtime, size in self._conn.execute("SELECT path, mtime, size FROM files")
+        }
+
+        changed = [path for path, stat in on_disk.items() if indexed.get(path) != stat]
+        removed = [path for path in indexed if path not in on_disk]
+
+        with self._conn:
+            for path in removed:
+                self._remove(path)
+            for path in changed:
+                self._index(path, *on_disk[path])
+
+        if changed or removed:
+            logging.info(
+                f"Search index updated: {len(changed)} indexed, {len(removed)} removed "
+                f"in {(time.perf_counter() - started) * 1000:.0f} ms"
+            )
+        return len(changed), len(removed)
+
+    def index_file(self, path):
+        """Index (or re-index) a single transcript, e.g. when its session closes"""
+        path = os.path.abspath(path)
+        if not os.path.exists(path):
+            return
+        stat = os.stat(path)
+        with self._conn:
+            self._index(path, stat.st_mtime, stat.st_size)
+
+    def add_line(self, path, line, text, timestamp):
+        """Index one line of a transcript still being written; ``index_file`` replaces it on close"""
+        with self._conn:
+            self._conn.execute(
+                "INSERT INTO lines (text, path, line, timestamp) VALUES (?, ?, ?, ?)",
+                (text, os.path.abspath(path), line, timestamp),
+            )
+
+    def search(self, query, limit=SEARCH_RESULT_LIMIT, raw=False):
+        """Return ranked matches for a phrase (or raw FTS5 query)"""
+        match = query if raw else '"' + query.replace('"', '""') + '"'
+        rows = self._conn.execute(
+            """
+            SELECT path, line, timestamp,
+                   snippet(lines, 0, '[', ']', '...', 12), bm25(lines)
+            FROM lines WHERE lines MATCH ?
+            ORDER BY bm25(lines) LIMIT ?
+            """,
+            (match, limit),
+        )
+        return [SearchResult(*row) for row in rows]
+
+    def _remove(self, path):
+        self._conn.execute("DELETE FROM lines WHERE path = ?", (path,))
+        self._conn.execute("DELETE FROM files WHERE path = ?", (path,))
+
+    def _index(self, path, mtime, size):
+        self._remove(path)
+        self._conn.executemany(
+            "INSERT INTO lines (text, path, line, timestamp) VALUES (?, ?, ?, ?)",
+            ((text, path, number, ts) for number, (text, ts) in enumerate(_iter_lines(path), 1)),
+        )
+        self._conn.execute(
+            "INSERT INTO files (path, mtime, size) VALUES (?, ?, ?)", (path, mtime, size)
+        )
+
+
+class SearchIndexSubscriber(Subscriber):
+    """Bus subscriber that indexes each utterance as it is committed, so live sessions are searchable.
+
+    Lines are numbered as the saved transcript will number them; when the
+    session closes ``index_session`` re-indexes the finished file in their place.
+    """
+
+    name = "search_index"
+    durable = True
+
+    def __init__(self, txt_path, db_path=SEARCH_INDEX_PATH):
+        super().__init__(overflow=DROP_NEWEST)
+        self.txt_path = txt_path
+        self.db_path = db_path
+        self._index = None
+
+    def handle(self, event):
+        if self._index is None:
+            # SQLite connections stay on the thread that opened them
+            self._index = TranscriptIndex(self.db_path)
+        timestamp = event.segments[0].received_at if event.segments else event.at
+        self._index.add_line(self.txt_path, event.index + 1, event.text, timestamp)
+
+    def close(self):
+        if self._index:
+            self._index.close()
+            self._index = None
+
+
+def _session_time(path):
+    """Session start time encoded in a transcript_YYYYMMDD_HHMMSS filename"""
+    stem = os.path.splitext(os.path.basename(path))[0]
+    try:
+        return datetime.datetime.strptime(stem[len("transcript_"):], "%Y%m%d_%H%M%S").timestamp()
+    except ValueError:
+        return None
+
+
+def _iter_lines(txt_path):
+    """Yield (text, timestamp) per transcript line, timed from the journal if present"""
+    journal_path = journal_path_for(txt_path)
+    if os.path.exists(journal_path):
+        yield from iter_timed_utterances(journal_path)
+        return
+
+    session_time = _session_time(txt_path)
+    with open(txt_path, "r", encoding="utf-8", errors="replace") as f:
+        for line in f:
+            line = line.strip()
+            if line:
+                yield line, session_time
+
+
+def index_session(txt_path):
+    """Add a just-closed session's transcript to the index"""
+    try:
+        index = TranscriptIndex()
+        try:
+            index.index_file(txt_path)
+        finally:
+            index.close()
+    except Exception as e:
+        logging.error(f"Failed to index transcript {txt_path}: {e}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Search saved transcripts")
+    parser.add_argument("query", nargs="?", help="Phrase to search for")
+    parser.add_argument("--limit", type=int, default=SEARCH_RESULT_LIMIT)
+    parser.add_argument("--raw", action="store_true", help="Treat the query as FTS5 syntax")
+    parser.add_argument("--update", action="store_true", help="Only refresh the index")
+    args = parser.parse_args()
+
+    index = TranscriptIndex()
+    try:
+        indexed, removed = index.update()
+        if args.update or not args.query:
+            print(f"Index up to date ({indexed} indexed, {removed} removed).")
+            return
+
+        started = time.perf_counter()
+        results = index.search(args.query, limit=args.limit, raw=args.raw)
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        for result in results:
+            print(result.format())
+        print(f"\n{len(results)} result(s) in {elapsed_ms:.1f} ms")
+    finally:
+        index.close()
+
+
+if __name__ == "__main__":
+    main()
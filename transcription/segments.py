@@ -0,0 +1,120 @@
+import time
+
+
+class Word:
+    """One recognized word with its timing on the session audio timeline"""
+
+    __slots__ = ("text", "start", "end", "confidence")
+
+    def __init__(self, text, start, end, confidence):
+        self.text = text
+        self.start = start
+        self.end = end
+        self.confidence = confidence
+
+    def to_record(self):
+        return [self.text, round(self.start, 3), round(self.end, 3), round(self.confidence, 4)]
+
+
+class Segment:
+    """Compact record of one final transcript segment.
+
+    Built from a Deepgram result and immediately detached from it, so long
+    sessions only hold these small slotted objects, never SDK responses.
+    Times are seconds on the session's streamed-audio timeline.
+    """
+
+    __slots__ = (
+        "text",
+        "start",
+        "duration",
+        "confidence",
+        "words",
+        "speech_final",
+        "from_finalize",
+        "received_at",
+    )
+
+    def __init__(
+        self,
+        text,
+        start,
+        duration,
+        confidence,
+        words,
+        speech_final=False,
+        from_finalize=False,
+        received_at=None,
+    ):
+        self.text = text
+        self.start = start
+        self.duration = duration
+        self.confidence = confidence
+        self.words = words
+        self.speech_final = speech_final
+        self.from_finalize = from_finalize
+        self.received_at = received_at if received_at is not None else time.time()
+
+    @classmethod
+    def from_result(cls, result, base_seconds=0.0):
+        """Copy the fields we keep out of a Deepgram live result"""
+        alternative = result.channel.alternatives[0]
+        words = tuple(
+            Word(
+                w.punctuated_word or w.word,
+                base_seconds + w.start,
+                base_seconds + w.end,
+                w.confidence,
+            )
+            for w in (alternative.words or ())
+        )
+        return cls(
+            text=alternative.transcript,
+            start=base_seconds + result.start,
+            duration=result.duration,
+            confidence=alternative.confidence,
+            words=words,
+            speech_final=bool(result.speech_final),
+            from_finalize=bool(getattr(result, "from_finalize", False)),
+        )
+
+    @classmethod
+    def from_utterance(cls, utterance):
+        """Copy an utterance out of a Deepgram prerecorded response"""
+        words = tuple(
+            Word(w.punctuated_word or w.word, w.start, w.end, w.confidence)
+            for w in (utterance.words or ())
+        )
+        return cls(
+            text=utterance.transcript,
+            start=utterance.start,
+            duration=utterance.end - utterance.start,
+            confidence=utterance.confidence,
+            words=words,
+        )
+
+    @property
+    def end(self):
+        return self.start + self.duration
+
+    def trim_before(self, seconds):
+        """Drop words that start before ``seconds`` (already committed audio)"""
+        self.words = tuple(w for w in self.words if w.start >= seconds)
+        self.text = " ".join(w.text for w in self.words)
+
+    def to_record(self, utterance, endpoint, committed_at):
+        """Serializable journal record for this segment"""
+        return {
+            "type": "segment",
+            "utterance": utterance,
+            "text": self.text,
+            "start": round(self.start, 3),
+            "duration": round(self.duration, 3),
+            "confidence": round(self.confidence, 4),
+            "speech_final": self.speech_final,
+            "from_finalize": self.from_finalize,
+            "endpoint": endpoint,
+            "received_at": round(self.received_at, 3),
+            "commit_delay": round(committed_at - self.received_at, 3),
+            "words": [w.to_record() for w in self.words],
+        }
@@ -0,0 +1,61 @@
+import asyncio
+import logging
+import threading
+
+
+class SessionLoop:
+    """One asyncio event loop on a background thread for all session I/O.
+
+    The Deepgram websocket, reconnects, the silence deadline and the warm
+    standby connection all run as tasks on this loop. Other threads hand it
+    work with ``submit()`` and ``call_soon()``; nothing on the loop touches
+    Tk directly.
+    """
+
+    def __init__(self):
+        self.loop = asyncio.new_event_loop()
+        self._thread = None
+
+    def start(self):
+        """Start running the loop"""
+        if self._thread and self._thread.is_alive():
+            return
+        self._thread = threading.Thread(target=self._run, name="SessionLoop", daemon=True)
+        self._thread.start()
+
+    def submit(self, coro):
+        """Schedule a coroutine from any thread; returns a concurrent Future"""
+        return asyncio.run_coroutine_threadsafe(coro, self.loop)
+
+    def call_soon(self, callback, *args):
+        """Run a plain callback on the loop thread"""
+        self.loop.call_soon_threadsafe(callback, *args)
+
+    def in_loop_thread(self):
+        return threading.current_thread() is self._thread
+
+    def stop(self, timeout=5):
+        """Cancel outstanding tasks and stop the loop"""
+        if not self._thread:
+            return
+
+        async def cancel_all():
+            tasks = [t for t in asyncio.all_tasks() if t is not asyncio.current_task()]
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+        try:
+            self.submit(cancel_all()).result(timeout)
+        except Exception as e:
+            logging.warning(f"Session loop tasks did not cancel cleanly: {e}")
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self._thread.join(timeout)
+        self._thread = None
+
+    def _run(self):
+        asyncio.set_event_loop(self.loop)
+        try:
+            self.loop.run_forever()
+        finally:
+            self.loop.close()
@@ -0,0 +1,145 @@
+import logging
+import os
+import sys
+import time
+
+from config import OUTPUT_SINK, OUTPUT_FILE_PATH, TYPING_INTERVAL, PASTE_RESTORE_DELAY
+
+STREAM_TAIL_CHARS = 4096  # Longer than any draft interim typing will erase
+
+
+class OutputSink:
+    """Destination for finished transcript text"""
+
+    name = "base"
+
+    def write(self, text):
+        """Deliver text to the destination"""
+        raise NotImplementedError
+
+    def backspace(self, count):
+        """Erase the last ``count`` characters written (used by interim typing)"""
+        raise NotImplementedError
+
+    def close(self):
+        """Release any resources held by the sink"""
+
+
+class TypewriteSink(OutputSink):
+    """Types text one key at a time with a fixed delay between keys"""
+
+    name = "typewrite"
+
+    def __init__(self, interval=TYPING_INTERVAL):
+        # Imported lazily so headless sinks work without a display
+        import pyautogui
+
+        self._pyautogui = pyautogui
+        self.interval = interval
+
+    def write(self, text):
+        self._pyautogui.typewrite(text, interval=self.interval)
+
+    def backspace(self, count):
+        self._pyautogui.press("backspace", presses=count, interval=self.interval)
+
+
+class BulkTypeSink(TypewriteSink):
+    """Injects all keystrokes back-to-back without any per-key delay"""
+
+    name = "bulk"
+
+    def __init__(self):
+        super().__init__(interval=0)
+
+    def write(self, text):
+        self._pyautogui.typewrite(text, interval=0, _pause=False)
+
+    def backspace(self, count):
+        self._pyautogui.press("backspace", presses=count, interval=0, _pause=False)
+
+
+class PasteSink(OutputSink):
+    """Pastes text through the clipboard, restoring its previous contents"""
+
+    name = "paste"
+
+    def __init__(self, restore_delay=PASTE_RESTORE_DELAY):
+        import pyautogui
+        import pyperclip
+
+        self._pyautogui = pyautogui
+        self._pyperclip = pyperclip
+        self.restore_delay = restore_delay
+        self.paste_keys = ("command", "v") if sys.platform == "darwin" else ("ctrl", "v")
+
+    def write(self, text):
+        try:
+            saved = self._pyperclip.paste()
+        except Exception as e:
+            logging.warning(f"Could not read clipboard, it will not be restored: {e}")
+            saved = None
+
+        self._pyperclip.copy(text)
+        self._pyautogui.hotkey(*self.paste_keys, _pause=False)
+
+        if saved is not None:
+            # Give the target application time to read the clipboard
+            time.sleep(self.restore_delay)
+            self._pyperclip.copy(saved)
+
+    def backspace(self, count):
+        self._pyautogui.press("backspace", presses=count, _pause=False)
+
+
+class StreamSink(OutputSink):
+    """Writes text to stdout or an append-mode file for headless use"""
+
+    name = "stream"
+
+    def __init__(self, path=None):
+        self.path = path
+        self._tail = ""  # Recent output, so backspaces know how many bytes to remove
+        if path:
+            self._stream = open(path, "a", encoding="utf-8")
+        else:
+            self._stream = sys.stdout
+
+    def write(self, text):
+        self._stream.write(text)
+        self._stream.flush()
+        self._tail = (self._tail + text)[-STREAM_TAIL_CHARS:]
+
+    def backspace(self, count):
+        count = min(count, len(self._tail))
+        if not count:
+            return
+        erased, self._tail = self._tail[-count:], self._tail[:-count]
+        if self.path:
+            # Append mode keeps writing at the new end of the file
+            fd = self._stream.fileno()
+            os.truncate(fd, os.fstat(fd).st_size - len(erased.encode("utf-8")))
+        else:
+            self._stream.write("\b \b" * count)
+            self._stream.flush()
+
+    def close(self):
+        if self.path and not self._stream.closed:
+            self._stream.close()
+
+
+def create_sink(name=OUTPUT_SINK, path=OUTPUT_FILE_PATH):
+    """Create the output sink selected in config"""
+    if name == "typewrite":
+        return TypewriteSink()
+    if name == "bulk":
+        return BulkTypeSink()
+    if name == "paste":
+        return PasteSink()
+    if name == "stdout":
+        return StreamSink()
+    if name == "file":
+        if not path:
+            raise ValueError("OUTPUT_FILE_PATH must be set for the 'file' output sink.")
+        return StreamSink(path)
+    raise ValueError(f"Unknown output sink: {name}")
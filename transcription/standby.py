@@ -0,0 +1,81 @@
+import asyncio
+import logging
+
+from config import WARM_STANDBY_MICROPHONE
+
+
+class WarmStandby:
+    """Keeps one pre-connected transcription client ready for the next session.
+
+    The standby client has its websocket (and optionally its microphone) open
+    with the audio gate closed. A task on the session loop keeps the socket
+    alive until a session takes the client over with ``acquire()``.
+    """
+
+    def __init__(self, client_factory, session_loop, open_microphone=WARM_STANDBY_MICROPHONE):
+        self.client_factory = client_factory
+        self.session_loop = session_loop
+        self.open_microphone = open_microphone
+        self._client = None
+        self._task = None
+
+    def prepare(self):
+        """Build a standby connection in the background; safe from any thread"""
+        self.session_loop.call_soon(self._prepare)
+
+    def _prepare(self):
+        if self._task and not self._task.done():
+            return
+        self._task = asyncio.ensure_future(self._keep_warm())
+
+    async def acquire(self):
+        """Hand over the standby client, or None if it is not ready"""
+        if self._task:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        client, self._client = self._client, None
+
+        if client and not client.is_connected():
+            logging.warning("Standby connection was lost; falling back to a cold start.")
+            await client.stop(finalize=False)
+            return None
+        return client
+
+    async def shutdown(self):
+        """Close the standby connection without starting a session"""
+        client = await self.acquire()
+        if client:
+            await client.stop(finalize=False)
+
+    async def _keep_warm(self):
+        """Open the standby connection and keep it alive until acquired"""
+        client = None
+        try:
+            client = self.client_factory()
+            if not await client.connect(open_microphone=self.open_microphone):
+                logging.error("Failed to open standby Deepgram connection")
+                await client.stop(finalize=False)
+                return
+            self._client = client
+            logging.info("Standby Deepgram connection ready")
+
+            # Frames only reach the closed gate when the microphone is open, so
+            # tick the keepalive timer here to cover the closed-microphone case.
+            while not client.closed.is_set():
+                try:
+                    await asyncio.wait_for(client.closed.wait(), timeout=1)
+                except asyncio.TimeoutError:
+                    client.keepalive_timer.tick()
+
+            logging.warning("Standby Deepgram connection closed")
+            if self._client is client:
+                self._client = None
+            await client.stop(finalize=False)
+        except asyncio.CancelledError:
+            # Acquired or shut down; a client that never became ready is ours to close
+            if client and self._client is not client and client.connection:
+                await client.stop(finalize=False)
+            raise
+        except Exception as e:
+            logging.error(f"Failed to prepare standby connection: {e}")
@@ -0,0 +1,281 @@
+"""Per-utterance latency tracing from audio capture to keystroke.
+
+Each utterance gets monotonic timestamps for: audio frame captured, frame
+sent, first interim received, final received, endpoint (speech_final or
+UtteranceEnd) received, typing started and typing finished. Stage
+durations go into fixed-bucket histograms per session and every trace is
+written to the session log, so logs can be aggregated afterwards:
+
+    python -m transcription.tracing "logs/session_*"
+"""
+import argparse
+import bisect
+import collections
+import glob
+import gzip
+import json
+import logging
+import math
+import re
+import threading
+import time
+
+from config import DG_SAMPLE_RATE
+
+BYTES_PER_SAMPLE = 2  # linear16
+TRACE_LOG_PREFIX = "Latency trace: "
+SETTINGS_LOG_PREFIX = "Latency settings: "
+
+# (stage name, start timestamp attribute, end timestamp attribute)
+STAGES = (
+    ("capture_to_send", "captured", "sent"),
+    ("send_to_first_interim", "sent", "first_interim"),
+    ("first_interim_to_final", "first_interim", "final"),
+    ("final_to_endpoint", "final", "endpoint"),
+    ("endpoint_to_typing", "endpoint", "typing_started"),
+    ("typing", "typing_started", "typing_finished"),
+    ("capture_to_visible", "captured", "typing_finished"),
+)
+
+
+class LatencyHistogram:
+    """Fixed log-spaced buckets from 1 ms to ~100 s; constant memory"""
+
+    MIN_SECONDS = 0.001
+    BUCKETS_PER_DECADE = 20
+    DECADES = 5
+
+    def __init__(self):
+        self.counts = [0] * (self.BUCKETS_PER_DECADE * self.DECADES + 1)
+        self.total = 0
+        self.maximum = 0.0
+
+    def add(self, seconds):
+        self.total += 1
+        self.maximum = max(self.maximum, seconds)
+        if seconds <= self.MIN_SECONDS:
+            index = 0
+        else:
+            index = int(math.log10(seconds / self.MIN_SECONDS) * self.BUCKETS_PER_DECADE) + 1
+        self.counts[min(index, len(self.counts) - 1)] += 1
+
+    def percentile(self, pct):
+        """Upper bound of the bucket holding the given percentile, in seconds"""
+        if not self.total:
+            return 0.0
+        rank = max(1, math.ceil(self.total * pct / 100))
+        seen = 0
+        for index, count in enumerate(self.counts):
+            seen += count
+            if seen >= rank:
+                upper = self.MIN_SECONDS * 10 ** (index / self.BUCKETS_PER_DECADE)
+                return min(upper, self.maximum)
+        return self.maximum
+
+
+class CapturedFrame(bytes):
+    """Captured audio that carries its capture time down the send pipeline.
+
+    The gates, replay buffer and sender pass frames on unchanged, so the
+    timestamp reaches ``mark_sent`` with the frame itself. Audio copied or
+    re-chunked on the way arrives as plain bytes and is counted as untraced.
+    """
+
+    def __new__(cls, data, captured_at):
+        frame = super().__new__(cls, data)
+        frame.captured_at = captured_at
+        return frame
+
+
+class UtteranceTrace:
+    """Monotonic timestamps for one utterance"""
+
+    __slots__ = (
+        "captured",
+        "sent",
+        "first_interim",
+        "final",
+        "endpoint",
+        "endpoint_kind",
+        "typing_started",
+        "typing_finished",
+    )
+
+    def __init__(self):
+        for name in self.__slots__:
+            setattr(self, name, None)
+
+    def durations(self):
+        """Stage name -> seconds, for the stages whose timestamps are known"""
+        result = {}
+        for name, start, end in STAGES:
+            a, b = getattr(self, start), getattr(self, end)
+            if a is not None and b is not None:
+                result[name] = max(0.0, b - a)
+        return result
+
+
+class LatencyTracer:
+    """Collects utterance traces for one session"""
+
+    def __init__(self, sample_rate=DG_SAMPLE_RATE, frame_history=2048):
+        self.bytes_per_second = sample_rate * BYTES_PER_SAMPLE
+        self.histograms = {name: LatencyHistogram() for name, _, _ in STAGES}
+        self.completed = 0
+        self.untraced_bytes = 0  # Sent audio that arrived without its capture time
+        # Parallel arrays: stream offset where each sent frame ends, and its times
+        self._frame_ends = collections.deque(maxlen=frame_history)
+        self._frame_times = collections.deque(maxlen=frame_history)
+        self._sent_bytes = 0
+        self._current = None
+        self._lock = threading.Lock()
+
+    def mark_captured(self, data):
+        """Stamp a frame as it leaves the capture callback; pass the returned frame on"""
+        return CapturedFrame(data, time.monotonic())
+
+    def mark_sent(self, data):
+        """Record when a frame was handed to the websocket"""
+        now = time.monotonic()
+        captured = getattr(data, "captured_at", None)
+        with self._lock:
+            if captured is None:
+                self.untraced_bytes += len(data)
+            self._sent_bytes += len(data)
+            self._frame_ends.append(self._sent_bytes / self.bytes_per_second)
+            self._frame_times.append((captured, now))
+
+    def on_result(self, stream_start, is_final, has_text):
+        """Record an interim or final result; ``stream_start`` is in session stream seconds"""
+        now = time.monotonic()
+        with self._lock:
+            trace = self._current
+            if trace is None:
+                if not has_text:
+                    return
+                trace = self._current = UtteranceTrace()
+                trace.first_interim = now
+                trace.captured, trace.sent = self._frame_for(stream_start)
+            if is_final and has_text:
+                trace.final = now
+
+    def on_endpoint(self, kind):
+        """Close the current utterance; returns its trace for the output stage"""
+        with self._lock:
+            trace, self._current = self._current, None
+        if trace:
+            trace.endpoint = time.monotonic()
+            trace.endpoint_kind = kind
+        return trace
+
+    def complete(self, traces):
+        """Record traces whose text has been typed"""
+        for trace in traces:
+            if trace is None:
+                continue
+            durations = trace.durations()
+            for name, seconds in durations.items():
+                self.histograms[name].add(seconds)
+            self.completed += 1
+            record = {name: round(seconds * 1000, 1) for name, seconds in durations.items()}
+            record["endpoint"] = trace.endpoint_kind
+            logging.info(TRACE_LOG_PREFIX + json.dumps(record))
+
+    def log_summary(self):
+        """Write p50/p95/p99 per stage to the session log"""
+        if self.untraced_bytes:
+            logging.warning(
+                f"Latency tracing: {self.untraced_bytes / self.bytes_per_second:.1f}s of sent audio "
+                f"had no capture timestamp; capture stages skip those utterances"
+            )
+        if not self.completed:
+            return
+        logging.info(f"Latency summary over {self.completed} utterances (ms):")
+        for line in format_summary(self.histograms):
+            logging.info(line)
+
+    def _frame_for(self, stream_start):
+        """Capture/send times of the frame containing a stream offset"""
+        index = bisect.bisect_right(self._frame_ends, stream_start)
+        if index >= len(self._frame_times):
+            return None, None
+        return self._frame_times[index]
+
+
+def log_settings(endpointing, utterance_end_ms):
+    """Record the endpointing settings a session's traces were taken with"""
+    logging.info(
+        SETTINGS_LOG_PREFIX
+        + json.dumps({"endpointing": endpointing, "utterance_end_ms": utterance_end_ms})
+    )
+
+
+def format_summary(histograms):
+    """Table lines of p50/p95/p99/max per stage, in milliseconds"""
+    lines = [f"{'stage':<24} {'n':>6} {'p50':>9} {'p95':>9} {'p99':>9} {'max':>9}"]
+    for name, _, _ in STAGES:
+        h = histograms[name]
+        if not h.total:
+            continue
+        lines.append(
+            f"{name:<24} {h.total:>6} {h.percentile(50) * 1000:>9.1f} "
+            f"{h.percentile(95) * 1000:>9.1f} {h.percentile(99) * 1000:>9.1f} "
+            f"{h.maximum * 1000:>9.1f}"
+        )
+    return lines
+
+
+def _log_order(path):
+    """Sort a session's rotated logs (``.log.2.gz``, ``.log.1.gz``) before its current one"""
+    match = re.match(r"(.*?\.log)(?:\.(\d+))?(?:\.gz)?$", path)
+    if not match:
+        return path, 0
+    return match.group(1), -int(match.group(2) or 0)
+
+
+def _iter_log_messages(path):
+    """Yield log messages from a text or JSON session log, gzipped or not"""
+    opener = gzip.open if path.endswith(".gz") else open
+    with opener(path, "rt", encoding="utf-8", errors="replace") as f:
+        for line in f:
+            if line.startswith("{"):
+                try:
+                    line = json.loads(line).get("message", "")
+                except json.JSONDecodeError:
+                    pass
+            yield line
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Summarize latency traces from session logs")
+    parser.add_argument("logs", nargs="+", help="Session log files or glob patterns")
+    args = parser.parse_args()
+
+    # Group traces by the endpointing settings in effect for each session
+    groups = collections.OrderedDict()
+    for pattern in args.logs:
+        for path in sorted(glob.glob(pattern), key=_log_order) or [pattern]:
+            settings = "unknown settings"
+            for line in _iter_log_messages(path):
+                if SETTINGS_LOG_PREFIX in line:
+                    settings = line.split(SETTINGS_LOG_PREFIX, 1)[1].strip()
+                elif TRACE_LOG_PREFIX in line:
+                    record = json.loads(line.split(TRACE_LOG_PREFIX, 1)[1])
+                    histograms = groups.setdefault(
+                        settings, {name: LatencyHistogram() for name, _, _ in STAGES}
+                    )
+                    for name, _, _ in STAGES:
+                        if name in record:
+                            histograms[name].add(record[name] / 1000)
+
+    if not groups:
+        print("No latency traces found.")
+        return
+    for settings, histograms in groups.items():
+        print(f"\n{settings}")
+        for line in format_summary(histograms):
+            print(line)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,285 @@
+"""Publish/subscribe fan-out for transcript events.
+
+The Deepgram handlers publish each committed utterance once, and each
+draft of the utterance in progress when some subscriber wants drafts.
+Every subscriber has its own bounded queue and overflow policy and is
+drained by its own thread, so a slow or stalled consumer (a sluggish
+typing target, a disk that blocks on fsync, a stream client that stopped
+reading) only falls behind or loses its own events. Publishing never
+blocks the websocket receive path.
+
+A subscriber is anything with ``name``, ``interims``, ``durable`` and
+``background`` attributes and ``start()``, ``offer(event)``, ``drain(timeout)``,
+``stop()`` and ``join(timeout)`` methods. ``Subscriber`` is the usual
+queued implementation; consumers that already own a queue (typing) adapt
+that instead.
+"""
+import collections
+import logging
+import threading
+import time
+
+from utils.metrics import registry
+from config import TRANSCRIPT_BUS_QUEUE_SIZE
+
+FINAL = "final"
+INTERIM = "interim"
+
+DROP_NEWEST = "drop_newest"  # Refuse new events while full; the queued backlog is kept in order
+DROP_OLDEST = "drop_oldest"  # Evict the oldest queued event; the consumer sees the most recent
+OVERFLOW_POLICIES = (DROP_NEWEST, DROP_OLDEST)
+
+_published = {
+    kind: registry.counter("transcript_events_total", "Transcript events published", {"kind": kind})
+    for kind in (FINAL, INTERIM)
+}
+
+
+class TranscriptEvent:
+    """A committed utterance (``final``) or a draft of the one in progress (``interim``)"""
+
+    __slots__ = ("kind", "text", "segments", "endpoint", "trace", "session", "index", "at")
+
+    def __init__(self, kind, text, segments=(), endpoint=None, trace=None, session=None, index=None):
+        self.kind = kind
+        self.text = text
+        self.segments = segments
+        self.endpoint = endpoint
+        self.trace = trace
+        self.session = session
+        self.index = index  # Utterance number within the session, for finals
+        self.at = time.time()
+
+    @property
+    def is_final(self):
+        return self.kind == FINAL
+
+    def to_dict(self):
+        """JSON-ready form for consumers outside the process"""
+        data = {"kind": self.kind, "text": self.text, "session": self.session, "at": round(self.at, 3)}
+        if self.is_final:
+            data["index"] = self.index
+            data["endpoint"] = self.endpoint
+        if self.segments:
+            data["start"] = round(self.segments[0].start, 3)
+            data["end"] = round(self.segments[-1].end, 3)
+        return data
+
+
+class Subscriber:
+    """A bus consumer with its own bounded queue, drained by its own worker thread.
+
+    Subclasses implement ``handle(event)`` and optionally ``close()``, which
+    runs on the worker thread after the queue has drained at shutdown.
+    A draft waiting in the queue is replaced by a newer draft. When the
+    queue is full, ``overflow`` decides which event is lost, and the loss
+    is counted. ``durable`` subscribers write what is saved with the
+    session, and are drained before the transcript is saved. The session
+    does not wait for ``background`` subscribers when it closes; they
+    finish their queue on their own.
+    """
+
+    name = "subscriber"
+    durable = False
+    background = False
+
+    def __init__(self, maxsize=TRANSCRIPT_BUS_QUEUE_SIZE, overflow=DROP_OLDEST, interims=False, name=None):
+        if overflow not in OVERFLOW_POLICIES:
+            raise ValueError(f"Unknown overflow policy: {overflow}")
+        self.name = name or self.name
+        self.maxsize = maxsize
+        self.overflow = overflow
+        self.interims = interims
+        self.delivered = 0
+        self.dropped = 0
+        self._queue = collections.deque()
+        self._cond = threading.Condition()
+        self._busy = False
+        self._stopping = False
+        self._thread = None
+        self._dropped_metric = registry.counter(
+            "transcript_bus_dropped_total", "Transcript events lost to a full subscriber queue",
+            {"subscriber": self.name},
+        )
+
+    def handle(self, event):
+        raise NotImplementedError
+
+    def close(self):
+        pass
+
+    def start(self):
+        """Start the worker thread"""
+        if self._thread and self._thread.is_alive():
+            return
+        self._stopping = False
+        self._thread = threading.Thread(target=self._worker, name=f"Subscriber-{self.name}", daemon=True)
+        self._thread.start()
+
+    def offer(self, event):
+        """Queue an event without blocking; returns False if an event was dropped"""
+        with self._cond:
+            if self._stopping:
+                return False
+            if event.kind == INTERIM and self._queue and self._queue[-1].kind == INTERIM:
+                self._queue[-1] = event
+                return True
+            accepted = True
+            if len(self._queue) >= self.maxsize:
+                if self.overflow == DROP_NEWEST:
+                    self._count_drop()
+                    return False
+                self._queue.popleft()
+                self._count_drop()
+                accepted = False
+            self._queue.append(event)
+            self._cond.notify_all()
+        return accepted
+
+    def drain(self, timeout=None):
+        """Wait until every queued event has been handled; returns False on timeout"""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._cond:
+            while (self._queue or self._busy) and self._thread and self._thread.is_alive():
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return False
+                self._cond.wait(remaining)
+        return True
+
+    def stop(self):
+        """Ask the worker to handle what is queued and exit; see ``join()``"""
+        with self._cond:
+            self._stopping = True
+            self._cond.notify_all()
+
+    def join(self, timeout=5):
+        """Wait for the worker to exit after ``stop()``; returns False if it is stuck"""
+        if not self._thread:
+            return True
+        self._thread.join(timeout)
+        if self._thread.is_alive():
+            logging.warning(
+                f"Transcript subscriber {self.name} did not finish; {len(self._queue)} event(s) abandoned"
+            )
+            return False
+        self._thread = None
+        return True
+
+    @property
+    def depth(self):
+        return len(self._queue)
+
+    def _count_drop(self):
+        self.dropped += 1
+        self._dropped_metric.inc()
+        if self.dropped == 1:
+            logging.warning(f"Transcript subscriber {self.name} is falling behind; dropping events ({self.overflow})")
+
+    def _worker(self):
+        while True:
+            with self._cond:
+                while not self._queue and not self._stopping:
+                    self._cond.wait()
+                if not self._queue:
+                    break
+                event = self._queue.popleft()
+                self._busy = True
+            try:
+                self.handle(event)
+                self.delivered += 1
+            except Exception as e:
+                logging.error(f"Transcript subscriber {self.name} failed: {e}")
+            finally:
+                with self._cond:
+                    self._busy = False
+                    self._cond.notify_all()
+
+        try:
+            self.close()
+        except Exception as e:
+            logging.error(f"Error closing transcript subscriber {self.name}: {e}")
+        if self.dropped:
+            logging.warning(f"Transcript subscriber {self.name} dropped {self.dropped} event(s)")
+
+
+class CallbackSubscriber(Subscriber):
+    """Calls a user-supplied function with each event, on the subscriber's own thread"""
+
+    name = "callback"
+    background = True
+
+    def __init__(self, callback, **kwargs):
+        super().__init__(**kwargs)
+        self.callback = callback
+
+    def handle(self, event):
+        self.callback(event)
+
+
+class TranscriptBus:
+    """Fans transcript events out to subscribers without ever blocking the publisher"""
+
+    def __init__(self, session=None):
+        self.session = session
+        self.finals = 0
+        self._subscribers = []  # Replaced, never mutated, so publish() needs no lock
+        self._lock = threading.Lock()
+        self._running = False
+
+    def subscribe(self, subscriber):
+        """Add a subscriber; it starts at once if the bus is already running"""
+        with self._lock:
+            self._subscribers = self._subscribers + [subscriber]
+        if self._running:
+            subscriber.start()
+        return subscriber
+
+    @property
+    def subscribers(self):
+        return list(self._subscribers)
+
+    @property
+    def wants_interims(self):
+        return any(subscriber.interims for subscriber in self._subscribers)
+
+    def start(self):
+        """Start every subscriber's worker"""
+        self._running = True
+        for subscriber in self._subscribers:
+            subscriber.start()
+
+    def publish(self, kind, text, segments=(), endpoint=None, trace=None):
+        """Offer one event to every interested subscriber; never blocks"""
+        index = None
+        if kind == FINAL:
+            index = self.finals
+            self.finals += 1
+        event = TranscriptEvent(kind, text, segments, endpoint, trace, self.session, index)
+        _published[kind].inc()
+        for subscriber in self._subscribers:
+            if kind == INTERIM and not subscriber.interims:
+                continue
+            try:
+                subscriber.offer(event)
+            except Exception as e:
+                logging.error(f"Error offering transcript event to {subscriber.name}: {e}")
+        return event
+
+    def drain(self, timeout=5):
+        """Wait for durable subscribers (journal, search index) to catch up"""
+        deadline = time.monotonic() + timeout
+        for subscriber in self._subscribers:
+            if subscriber.durable and not subscriber.drain(max(0.0, deadline - time.monotonic())):
+                logging.warning(f"Transcript subscriber {subscriber.name} still behind after {timeout}s")
+
+    def stop(self, timeout=5):
+        """Let every subscriber finish its queue, waiting at most about ``timeout`` for those that are not background"""
+        self._running = False
+        subscribers = self._subscribers
+        for subscriber in subscribers:
+            subscriber.stop()
+        deadline = time.monotonic() + timeout
+        for subscriber in subscribers:
+            if not subscriber.background:
+                subscriber.join(max(0.0, deadline - time.monotonic()))
@@ -0,0 +1,171 @@
+"""Local Server-Sent Events stream of transcript events for other apps.
+
+Each event is one ``data:`` line of JSON (see ``TranscriptEvent.to_dict``),
+with the event kind as the SSE event name:
+
+    curl -N http://127.0.0.1:8765/events
+    curl -N "http://127.0.0.1:8765/events?session=notes"
+"""
+import json
+import logging
+import threading
+import urllib.parse
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from transcription.transcript_bus import Subscriber, DROP_OLDEST
+from config import TRANSCRIPT_STREAM_PORT, TRANSCRIPT_STREAM_INTERIMS, TRANSCRIPT_STREAM_CLIENT_QUEUE
+
+
+class _StreamClient(Subscriber):
+    """One connected HTTP client; its own thread writes events to the socket"""
+
+    name = "stream_client"
+
+    def __init__(self, wfile, session, maxsize, interims):
+        super().__init__(maxsize=maxsize, overflow=DROP_OLDEST, interims=interims)
+        self.wfile = wfile
+        self.session = session
+        self.disconnected = threading.Event()
+
+    def handle(self, event):
+        if self.disconnected.is_set():
+            return
+        if self.session and event.session != self.session:
+            return
+        message = f"event: {event.kind}\ndata: {json.dumps(event.to_dict(), ensure_ascii=False)}\n\n"
+        try:
+            self.wfile.write(message.encode("utf-8"))
+            self.wfile.flush()
+        except OSError:
+            self.disconnected.set()
+            self.stop()
+
+    def close(self):
+        self.disconnected.set()
+
+
+class _StreamFeed:
+    """Bus subscriber for one session: passes events to every connected client's queue"""
+
+    name = "stream"
+    durable = False
+    background = False
+
+    def __init__(self, server):
+        self.server = server
+        self.interims = server.interims
+
+    def start(self):
+        pass
+
+    def offer(self, event):
+        self.server.broadcast(event)
+        return True
+
+    def drain(self, timeout=None):
+        return True
+
+    def stop(self):
+        pass
+
+    def join(self, timeout=5):
+        return True
+
+
+class TranscriptStreamServer:
+    """Serves transcript events as Server-Sent Events on a background thread.
+
+    One server is shared by every session in the process; each session's
+    bus gets a ``feed()``. Every client has its own bounded queue that
+    drops its oldest events, so a client that stops reading only loses
+    its own events and never holds up a session.
+    """
+
+    def __init__(
+        self,
+        port=TRANSCRIPT_STREAM_PORT,
+        host="127.0.0.1",
+        client_queue=TRANSCRIPT_STREAM_CLIENT_QUEUE,
+        interims=TRANSCRIPT_STREAM_INTERIMS,
+    ):
+        self.host = host
+        self.port = port
+        self.client_queue = client_queue
+        self.interims = interims
+        self._clients = []
+        self._lock = threading.Lock()
+        self._server = None
+        self._thread = None
+
+    def start(self):
+        stream = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                url = urllib.parse.urlsplit(self.path)
+                if url.path != "/events":
+                    self.send_error(404)
+                    return
+                session = urllib.parse.parse_qs(url.query).get("session", [None])[0]
+                self.send_response(200)
+                self.send_header("Content-Type", "text/event-stream; charset=utf-8")
+                self.send_header("Cache-Control", "no-cache")
+                self.end_headers()
+                self.wfile.flush()
+                stream._serve(self.wfile, session)
+
+            def log_message(self, format, *args):
+                pass
+
+        try:
+            self._server = ThreadingHTTPServer((self.host, self.port), Handler)
+        except OSError as e:
+            logging.error(f"Failed to start transcript stream on port {self.port}: {e}")
+            return False
+        self._server.daemon_threads = True
+        self.port = self._server.server_address[1]
+        self._thread = threading.Thread(
+            target=self._server.serve_forever, name="TranscriptStream", daemon=True
+        )
+        self._thread.start()
+        logging.info(f"Transcript stream at http://{self.host}:{self.port}/events")
+        return True
+
+    def stop(self):
+        if not self._server:
+            return
+        with self._lock:
+            clients, self._clients = self._clients, []
+        for client in clients:
+            client.disconnected.set()
+            client.stop()
+        self._server.shutdown()
+        self._server.server_close()
+        self._server = None
+
+    def feed(self):
+        """A bus subscriber that publishes one session's events to this stream"""
+        return _StreamFeed(self)
+
+    def broadcast(self, event):
+        """Queue an event for every connected client; never blocks"""
+        for client in self._clients:
+            client.offer(event)
+
+    @property
+    def client_count(self):
+        return len(self._clients)
+
+    def _serve(self, wfile, session):
+        """Stream to one client on its request thread until it disconnects or the server stops"""
+        client = _StreamClient(wfile, session, self.client_queue, self.interims)
+        client.start()
+        with self._lock:
+            self._clients = self._clients + [client]
+        try:
+            client.disconnected.wait()
+        finally:
+            with self._lock:
+                self._clients = [c for c in self._clients if c is not client]
+            client.stop()
+            client.join(1)
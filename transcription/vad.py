@@ -0,0 +1,145 @@
+import collections
+import logging
+import time
+
+import numpy as np
+
+from config import (
+    DG_SAMPLE_RATE,
+    VAD_WINDOW_MS,
+    VAD_ENERGY_THRESHOLD_DB,
+    VAD_NOISE_MARGIN_DB,
+    VAD_UNVOICED_DB_OFFSET,
+    VAD_UNVOICED_MARGIN_DB,
+    VAD_NOISE_WINDOW_MS,
+    VAD_NOISE_PERCENTILE,
+    VAD_NOISE_RISE_DB_PER_S,
+    VAD_ZCR_THRESHOLD,
+    VAD_HANGOVER_MS,
+    VAD_PREROLL_MS,
+)
+
+BYTES_PER_SAMPLE = 2  # linear16
+
+
+class VoiceActivityGate:
+    """Energy / zero-crossing voice activity gate between capture and the websocket.
+
+    Speech chunks are forwarded to ``send``. Silent chunks are held in a short
+    pre-roll buffer so word onsets are not clipped, and are released once
+    speech starts. A hangover keeps audio flowing after the last speech
+    window so Deepgram can still endpoint the utterance. While silent, the
+    shared keepalive timer sends KeepAlive messages instead of audio.
+
+    The noise floor is a low percentile of the level of every recent
+    window, speech or not, so steady noise louder than the absolute
+    threshold is learned too. It drops at once and rises slowly, so a
+    burst of speech does not lift it. Only windows clearly above the floor
+    count as speech for ``on_speech``.
+    """
+
+    def __init__(self, send, keepalive_timer, on_speech=None, sample_rate=DG_SAMPLE_RATE, clock=time.monotonic):
+        self.send = send
+        self.clock = clock
+        self.keepalive_timer = keepalive_timer
+        self.on_speech = on_speech
+        self.sample_rate = sample_rate
+        self.window = max(1, int(sample_rate * VAD_WINDOW_MS / 1000))
+        self.hangover = VAD_HANGOVER_MS / 1000
+        self.preroll_bytes = int(sample_rate * VAD_PREROLL_MS / 1000) * BYTES_PER_SAMPLE
+        self.noise_floor_db = -60.0
+        self._levels = collections.deque(maxlen=max(1, VAD_NOISE_WINDOW_MS // VAD_WINDOW_MS))
+        self._rise_per_window = VAD_NOISE_RISE_DB_PER_S * VAD_WINDOW_MS / 1000
+
+        self.total_bytes = 0
+        self.sent_bytes = 0
+
+        self._preroll = collections.deque()
+        self._preroll_size = 0
+        self._last_speech = None
+
+    def __call__(self, data):
+        """Classify one captured chunk and forward, buffer or keep alive"""
+        now = self.clock()
+        self.total_bytes += len(data)
+
+        speech, voiced = self._classify(data)
+        if speech:
+            self._last_speech = now
+        # Unvoiced-only windows keep the stream open but do not count as someone speaking
+        if voiced and self.on_speech:
+            self.on_speech()
+
+        in_hangover = self._last_speech is not None and now - self._last_speech <= self.hangover
+        if in_hangover:
+            self._flush_preroll()
+            self._forward(data, now)
+            return
+
+        self._buffer_preroll(data)
+        self.keepalive_timer.tick(now)
+
+    @property
+    def speech_ratio(self):
+        """Fraction of captured audio that was actually streamed"""
+        if not self.total_bytes:
+            return 0.0
+        return self.sent_bytes / self.total_bytes
+
+    def log_summary(self):
+        """Log how much of the session's audio was streamed"""
+        bytes_per_second = self.sample_rate * BYTES_PER_SAMPLE
+        logging.info(
+            f"VAD: streamed {self.sent_bytes / bytes_per_second:.1f}s of "
+            f"{self.total_bytes / bytes_per_second:.1f}s captured "
+            f"(speech ratio {self.speech_ratio:.1%})"
+        )
+
+    def _classify(self, data):
+        """Return (any window looks like speech, any window is voiced above the noise floor)"""
+        samples = np.frombuffer(data, dtype=np.int16)
+        count = len(samples) // self.window
+        if count == 0:
+            return False, False
+
+        frames = samples[: count * self.window].reshape(count, self.window).astype(np.float32)
+        rms = np.sqrt(np.mean(frames * frames, axis=1))
+        energy_db = 20 * np.log10(np.maximum(rms, 1.0) / 32768.0)
+        signs = np.signbit(frames)
+        zcr = np.count_nonzero(signs[:, 1:] != signs[:, :-1], axis=1) / self.window
+
+        threshold = max(VAD_ENERGY_THRESHOLD_DB, self.noise_floor_db + VAD_NOISE_MARGIN_DB)
+        unvoiced_threshold = max(
+            threshold - VAD_UNVOICED_DB_OFFSET, self.noise_floor_db + VAD_UNVOICED_MARGIN_DB
+        )
+        voiced = energy_db > threshold
+        unvoiced = (energy_db > unvoiced_threshold) & (zcr > VAD_ZCR_THRESHOLD)
+
+        self._track_noise_floor(energy_db)
+        return bool((voiced | unvoiced).any()), bool(voiced.any())
+
+    def _track_noise_floor(self, energy_db):
+        """Follow a low percentile of all recent window levels: down at once, up slowly"""
+        self._levels.extend(energy_db.tolist())
+        target = float(np.percentile(self._levels, VAD_NOISE_PERCENTILE))
+        if target < self.noise_floor_db:
+            self.noise_floor_db = target
+        else:
+            self.noise_floor_db = min(target, self.noise_floor_db + self._rise_per_window * len(energy_db))
+
+    def _forward(self, data, now):
+        self.send(data)
+        self.sent_bytes += len(data)
+        self.keepalive_timer.mark_sent(now)
+
+    def _buffer_preroll(self, data):
+        self._preroll.append(data)
+        self._preroll_size += len(data)
+        while len(self._preroll) > 1 and self._preroll_size > self.preroll_bytes:
+            self._preroll_size -= len(self._preroll.popleft())
+
+    def _flush_preroll(self):
+        now = self.clock()
+        while self._preroll:
+            self._forward(self._preroll.popleft(), now)
+        self._preroll_size = 0
@@ -6,7 +6,7 @@ import tkinter as tk
 from PIL import Image, ImageTk  # For loading the icon
 from config import (
     UI_OPACITY, BTN_RECORD_ICON, BTN_STOP_ICON, BTN_PAUSE_ICON, BTN_PLAY_ICON, 
-    BTN_TRANSCRIPT_ICON, BTN_RECORD_SIZE, BTN_CONTROL_SIZE, BTN_RECORD_COLOR,
+    BTN_TRANSCRIPT_ICON, BTN_SEARCH_ICON, BTN_RECORD_SIZE, BTN_CONTROL_SIZE, BTN_RECORD_COLOR,
     BTN_RECORD_ACTIVE_COLOR, BTN_CONTROL_COLOR, BTN_DISABLED_COLOR, BTN_PAUSED_COLOR
 )
 
@@ -116,6 +116,20 @@ class TranscriptionGUI:
         )
         self.transcript_button.pack(side=ctk.RIGHT, padx=(0, 5))
         
+        # Search Button (next to the transcript button)
+        self.search_button = ctk.CTkButton(
+            self.top_frame, 
+            text=BTN_SEARCH_ICON, 
+            width=25, 
+            height=25, 
+            font=icon_font_small,
+            text_color=BTN_CONTROL_COLOR,  
+            fg_color="transparent",
+            hover=False, 
+            command=self.open_search_window
+        )
+        self.search_button.pack(side=ctk.RIGHT)
+        
         # Bottom Control Buttons Area
         self.button_frame = ctk.CTkFrame(self.main_frame, fg_color="transparent")
         self.button_frame.pack(fill=ctk.X, pady=(0, 5))
@@ -199,10 +213,21 @@ class TranscriptionGUI:
         y = self.root.winfo_pointery() - self._drag_data["y"]
         self.root.geometry(f"+{x}+{y}")
     
-    def update_state(self, is_running, is_paused, has_transcript_file):
+    def update_state(self, is_running, is_paused, has_transcript_file, is_finishing=False):
         """Update the UI state based on application state"""
         # Determine icon/text/color based on state
-        if is_running:
+        if is_finishing:
+            # Stop requested; the last words are being flushed and saved
+            record_icon = BTN_RECORD_ICON
+            record_color = BTN_DISABLED_COLOR
+            pause_icon = BTN_PAUSE_ICON
+            pause_color = BTN_DISABLED_COLOR
+            pause_state = ctk.DISABLED
+            stop_state = ctk.DISABLED
+            transcript_state = ctk.DISABLED
+            status_text = "Finishing..."
+            status_color = "yellow"
+        elif is_running:
             record_icon = BTN_RECORD_ICON  # Keep record icon consistent but dim it
             record_color = BTN_RECORD_ACTIVE_COLOR  # Darker red when recording
             pause_icon = BTN_PLAY_ICON if is_paused else BTN_PAUSE_ICON  # Play icon if paused, pause otherwise
@@ -229,7 +254,8 @@ class TranscriptionGUI:
         
         # Update GUI elements
         self.status_label.configure(text=status_text, text_color=status_color)
-        self.record_button.configure(text=record_icon, text_color=record_color, state=ctk.NORMAL)
+        record_state = ctk.DISABLED if is_finishing else ctk.NORMAL
+        self.record_button.configure(text=record_icon, text_color=record_color, state=record_state)
         self.pause_resume_button.configure(text=pause_icon, text_color=pause_color, state=pause_state)
         self.stop_button.configure(state=stop_state)
         self.transcript_button.configure(state=transcript_state)
@@ -241,6 +267,12 @@ class TranscriptionGUI:
         self.transcript_button.configure(command=transcript_func)
         self.stop_button.configure(command=stop_func)
     
+    def open_search_window(self):
+        """Open the transcript search window"""
+        # Imported here so the index module is only loaded when searching
+        from ui.search_window import SearchWindow
+        SearchWindow(self.root)
+    
     def add_escape_handler(self, handler):
         """Add escape key handler to close application"""
         self.root.bind("<Escape>", lambda e: handler())
@@ -0,0 +1,80 @@
+import heapq
+import itertools
+import logging
+import threading
+import time
+
+
+class HeadlessGUI:
+    """Stand-in for TranscriptionGUI when running without a display.
+
+    Implements the subset of the GUI interface the agent uses. Scheduled
+    tasks run on the thread that calls ``start()``, like Tk's mainloop, so
+    agent code keeps its single "GUI thread" assumption.
+    """
+
+    def __init__(self):
+        self.state = {
+            "is_running": False,
+            "is_paused": False,
+            "is_finishing": False,
+            "has_transcript_file": False,
+        }
+        self.callbacks = {}
+        self._tasks = []
+        self._counter = itertools.count()
+        self._cond = threading.Condition()
+        self._running = False
+
+    def set_command_callbacks(self, toggle_func, pause_func, transcript_func, stop_func):
+        """Record the callbacks a GUI would bind to its buttons"""
+        self.callbacks = {
+            "toggle": toggle_func,
+            "pause": pause_func,
+            "transcript": transcript_func,
+            "stop": stop_func,
+        }
+
+    def update_state(self, is_running, is_paused, has_transcript_file, is_finishing=False):
+        """Record agent state instead of drawing it"""
+        self.state = {
+            "is_running": is_running,
+            "is_paused": is_paused,
+            "is_finishing": is_finishing,
+            "has_transcript_file": has_transcript_file,
+        }
+        logging.debug(f"Headless GUI state: {self.state}")
+
+    def add_escape_handler(self, handler):
+        self.callbacks["escape"] = handler
+
+    def schedule_task(self, delay, callback):
+        """Schedule a task to run after delay milliseconds on the loop thread"""
+        due = time.monotonic() + delay / 1000
+        with self._cond:
+            heapq.heappush(self._tasks, (due, next(self._counter), callback))
+            self._cond.notify()
+
+    def start(self):
+        """Run scheduled tasks until ``quit()`` is called"""
+        self._running = True
+        while True:
+            with self._cond:
+                while self._running and (
+                    not self._tasks or self._tasks[0][0] > time.monotonic()
+                ):
+                    timeout = self._tasks[0][0] - time.monotonic() if self._tasks else None
+                    self._cond.wait(timeout)
+                if not self._running:
+                    return
+                _, _, callback = heapq.heappop(self._tasks)
+            try:
+                callback()
+            except Exception as e:
+                logging.exception(f"Error in scheduled task: {e}")
+
+    def quit(self):
+        """Stop the task loop"""
+        with self._cond:
+            self._running = False
+            self._cond.notify()
@@ -0,0 +1,86 @@
+import customtkinter as ctk
+import logging
+import queue
+import threading
+import time
+
+from transcription.search_index import TranscriptIndex
+
+INDEX_POLL_MS = 100
+
+
+class SearchWindow:
+    """Small window for phrase search across saved transcripts"""
+
+    def __init__(self, root):
+        self.window = ctk.CTkToplevel(root)
+        self.window.title("Search Transcripts")
+        self.window.geometry("640x360")
+        self.window.wm_attributes("-topmost", True)
+
+        self.query_entry = ctk.CTkEntry(self.window, placeholder_text="Search phrase...")
+        self.query_entry.pack(fill=ctk.X, padx=8, pady=(8, 4))
+        self.query_entry.bind("<Return>", lambda e: self.run_search())
+
+        self.status_label = ctk.CTkLabel(self.window, text="Updating index...", anchor="w")
+        self.status_label.pack(fill=ctk.X, padx=8)
+
+        self.results_box = ctk.CTkTextbox(self.window, wrap="word")
+        self.results_box.pack(fill=ctk.BOTH, expand=True, padx=8, pady=(4, 8))
+        self.results_box.configure(state=ctk.DISABLED)
+
+        self.query_entry.focus_set()
+
+        # Refresh changed files off the Tk thread; only the Tk thread touches widgets
+        self._index_status = queue.Queue()
+        threading.Thread(target=self._update_index, daemon=True).start()
+        self._poll_index_status()
+
+    def run_search(self):
+        """Search for the entered phrase and show ranked results"""
+        query = self.query_entry.get().strip()
+        if not query:
+            return
+
+        try:
+            index = TranscriptIndex()
+            try:
+                started = time.perf_counter()
+                results = index.search(query)
+                elapsed_ms = (time.perf_counter() - started) * 1000
+            finally:
+                index.close()
+        except Exception as e:
+            logging.error(f"Transcript search failed: {e}")
+            self.status_label.configure(text=f"Search failed: {e}")
+            return
+
+        self.results_box.configure(state=ctk.NORMAL)
+        self.results_box.delete("1.0", ctk.END)
+        self.results_box.insert(ctk.END, "\n\n".join(r.format() for r in results))
+        self.results_box.configure(state=ctk.DISABLED)
+        self.status_label.configure(text=f"{len(results)} result(s) in {elapsed_ms:.1f} ms")
+
+    def _update_index(self):
+        try:
+            index = TranscriptIndex()
+            try:
+                indexed, _ = index.update()
+            finally:
+                index.close()
+            text = f"Index ready ({indexed} file(s) updated)"
+        except Exception as e:
+            logging.error(f"Failed to update search index: {e}")
+            text = "Index update failed"
+        self._index_status.put(text)
+
+    def _poll_index_status(self):
+        """Show the index update result once the worker has posted it"""
+        if not self.window.winfo_exists():
+            return
+        try:
+            text = self._index_status.get_nowait()
+        except queue.Empty:
+            self.window.after(INDEX_POLL_MS, self._poll_index_status)
+            return
+        self.status_label.configure(text=text)
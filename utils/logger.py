@@ -1,28 +1,260 @@
+import contextvars
+import glob
+import gzip
+import json
 import logging
+import logging.handlers
+import os
+import queue
+import shutil
 import sys
+import threading
 
-def setup_session_logger(filename):
-    """Configure logging for a new session"""
-    log_formatter = logging.Formatter('%(asctime)s - %(levelname)s - %(message)s')
-    
-    # File handler for saving logs to file
-    log_handler = logging.FileHandler(filename, mode='a')
-    log_handler.setFormatter(log_formatter)
+from config import (
+    LOG_DIR,
+    LOG_FORMAT,
+    LOG_QUEUE_SIZE,
+    LOG_BATCH_SIZE,
+    LOG_MAX_BYTES,
+    LOG_BACKUP_COUNT,
+    LOG_MAX_TOTAL_MB,
+)
+
+TEXT_FORMAT = '%(asctime)s - %(levelname)s - %(message)s'
+
+_STOP = object()
+
+# Name of the daemon session the current task belongs to, for log prefixes
+session_context = contextvars.ContextVar("session", default=None)
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line, so logs can be analyzed without regex parsing"""
+
+    def format(self, record):
+        entry = {
+            "time": self.formatTime(record),
+            "ts": round(record.created, 6),
+            "level": record.levelname,
+            "logger": record.name,
+            "thread": record.threadName,
+            "message": record.getMessage(),
+        }
+        if record.exc_info:
+            entry["exception"] = self.formatException(record.exc_info)
+        return json.dumps(entry, ensure_ascii=False)
+
+
+class SessionContextFilter(logging.Filter):
+    """Prefixes records logged from a named session's tasks with ``[name]``"""
+
+    def filter(self, record):
+        name = session_context.get()
+        if name:
+            record.msg = f"[{name}] {record.getMessage()}"
+            record.args = None
+        return True
+
+
+class SessionLogHandler(logging.handlers.QueueHandler):
+    """Root handler that only enqueues records; a listener thread writes them.
+
+    The calling thread merges the message arguments and returns. The
+    ``SessionLogWriter`` thread formats records and writes everything
+    waiting as one batch. When the bounded queue is full, records are
+    dropped and counted instead of blocking the caller.
+    """
+
+    def __init__(self, writer):
+        super().__init__(writer.queue)
+        self.writer = writer
+
+    def prepare(self, record):
+        # Freeze the message now; formatting happens on the writer thread
+        record.msg = record.getMessage()
+        record.args = None
+        return record
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.writer.dropped += 1
+
+    def close(self):
+        self.writer.stop()
+        super().close()
+
+
+class SessionLogWriter:
+    """Writes queued log records to a size-rotated session log and the console.
+
+    Rotated files become ``<log>.1.gz``, ``<log>.2.gz``... with at most
+    ``backup_count`` kept per session.
+    """
+
+    def __init__(
+        self,
+        path,
+        formatter,
+        console=True,
+        max_bytes=LOG_MAX_BYTES,
+        backup_count=LOG_BACKUP_COUNT,
+        batch_size=LOG_BATCH_SIZE,
+        queue_size=LOG_QUEUE_SIZE,
+    ):
+        self.path = path
+        self.formatter = formatter
+        self.console = console
+        self.max_bytes = max_bytes
+        self.backup_count = backup_count
+        self.batch_size = batch_size
+        self.queue = queue.Queue(maxsize=queue_size)
+        self.dropped = 0
+        self.batches = 0
+        self.records = 0
+        self._file = open(path, "a", encoding="utf-8")
+        self._thread = threading.Thread(target=self._run, name="SessionLogWriter", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout=5):
+        """Write everything queued, then close the log file"""
+        if not self._thread:
+            return
+        self.queue.put(_STOP)
+        self._thread.join(timeout)
+        self._thread = None
+
+    def _run(self):
+        try:
+            while True:
+                records = [self.queue.get()]
+                while records[-1] is not _STOP and len(records) < self.batch_size:
+                    try:
+                        records.append(self.queue.get_nowait())
+                    except queue.Empty:
+                        break
+                stopping = records[-1] is _STOP
+                if stopping:
+                    records.pop()
+                if records:
+                    self._write(records)
+                if stopping:
+                    return
+        finally:
+            self._file.close()
+
+    def _write(self, records):
+        lines = []
+        if self.dropped:
+            dropped, self.dropped = self.dropped, 0
+            notice = logging.makeLogRecord({
+                "name": "root",
+                "msg": f"Log queue full; {dropped} record(s) dropped",
+                "levelno": logging.WARNING,
+                "levelname": "WARNING",
+                "threadName": threading.current_thread().name,
+            })
+            lines.append(self.formatter.format(notice))
+        for record in records:
+            try:
+                lines.append(self.formatter.format(record))
+            except Exception:
+                lines.append(f"Unformattable log record: {record.msg!r}")
+        text = "\n".join(lines) + "\n"
+
+        try:
+            self._file.write(text)
+            self._file.flush()
+            if self.console:
+                sys.stdout.write(text)
+                sys.stdout.flush()
+        except Exception as e:
+            sys.stderr.write(f"Failed to write session log: {e}\n")
+        self.batches += 1
+        self.records += len(records)
+
+        if self.max_bytes and self._file.tell() >= self.max_bytes:
+            self._rotate()
+
+    def _rotate(self):
+        self._file.close()
+        oldest = f"{self.path}.{self.backup_count}.gz"
+        if os.path.exists(oldest):
+            os.remove(oldest)
+        for i in range(self.backup_count - 1, 0, -1):
+            source = f"{self.path}.{i}.gz"
+            if os.path.exists(source):
+                os.replace(source, f"{self.path}.{i + 1}.gz")
+        rolled = f"{self.path}.1"
+        os.replace(self.path, rolled)
+        self._file = open(self.path, "a", encoding="utf-8")
+        compress_logs([rolled])
+
+
+def compress_logs(paths):
+    """Gzip log files on a background thread, replacing each with ``<path>.gz``"""
+    def run():
+        for path in paths:
+            try:
+                with open(path, "rb") as src, gzip.open(path + ".gz", "wb") as dst:
+                    shutil.copyfileobj(src, dst)
+                os.remove(path)
+            except OSError as e:
+                logging.warning(f"Failed to compress log {path}: {e}")
+    if paths:
+        threading.Thread(target=run, name="LogCompressor", daemon=True).start()
+
+
+def prune_logs(log_dir=LOG_DIR, max_total_mb=LOG_MAX_TOTAL_MB):
+    """Delete the oldest compressed session logs beyond ``max_total_mb``"""
+    logs = []
+    for path in glob.glob(os.path.join(log_dir, "session_*.gz")):
+        try:
+            stat = os.stat(path)
+        except OSError:
+            continue
+        logs.append((stat.st_mtime, stat.st_size, path))
+    total = sum(size for _, size, _ in logs)
+    for _, size, path in sorted(logs):
+        if total <= max_total_mb * 1024 * 1024:
+            break
+        try:
+            os.remove(path)
+            total -= size
+        except OSError:
+            pass
+
+
+def setup_session_logger(filename, session_prefixes=False):
+    """Configure logging for a new session.
+
+    With ``session_prefixes`` (daemon mode, several sessions in one log),
+    lines are prefixed with the session they came from.
+    """
+    log_formatter = JsonFormatter() if LOG_FORMAT == "json" else logging.Formatter(TEXT_FORMAT)
 
     # Get root logger
     root_logger = logging.getLogger()
-    
+
     # Remove existing handlers to avoid duplicate logs if restarting
     for h in root_logger.handlers[:]:
         root_logger.removeHandler(h)
         h.close()  # Close the handler properly
-    
+
+    # Earlier sessions' logs (including any left by a crash) are compressed
+    log_dir = os.path.dirname(filename) or "."
+    prune_logs(log_dir)
+    compress_logs([
+        path for path in glob.glob(os.path.join(log_dir, "session_*.log"))
+        if os.path.abspath(path) != os.path.abspath(filename)
+    ])
+
+    # File and console output are written by the listener thread
+    log_handler = SessionLogHandler(SessionLogWriter(filename, log_formatter))
+    if session_prefixes:
+        log_handler.addFilter(SessionContextFilter())
     root_logger.setLevel(logging.INFO)
     root_logger.addHandler(log_handler)
 
-    # Also log to console for debugging
-    console_handler = logging.StreamHandler(sys.stdout)
-    console_handler.setFormatter(log_formatter)
-    root_logger.addHandler(console_handler)
-
-    return log_handler
\ No newline at end of file
+    return log_handler
@@ -0,0 +1,284 @@
+"""Process-wide counters and gauges for long-running sessions.
+
+Counters are bumped from the audio send path and the Deepgram handlers;
+gauges are read from callbacks when metrics are collected, so nothing is
+sampled between scrapes. With ``METRICS_ENABLED`` off every metric is a
+shared no-op object and neither the HTTP endpoint nor the log reporter
+starts.
+
+The endpoint serves Prometheus text format at
+``http://127.0.0.1:<METRICS_PORT>/metrics``. Process and per-thread CPU and
+memory use ``psutil`` when it is installed and ``/proc`` on Linux otherwise.
+"""
+import logging
+import os
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from config import METRICS_ENABLED, METRICS_PORT, METRICS_LOG_INTERVAL
+
+
+class _NullMetric:
+    """Stands in for every metric when metrics are disabled"""
+
+    def inc(self, amount=1):
+        pass
+
+    def set(self, value):
+        pass
+
+
+_NULL_METRIC = _NullMetric()
+
+
+class Counter:
+    """Monotonically increasing value"""
+
+    kind = "counter"
+
+    def __init__(self):
+        self.value = 0
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1):
+        with self._lock:
+            self.value += amount
+
+
+class Gauge:
+    """Value that can go up and down, or is read from a callback on collection"""
+
+    kind = "gauge"
+
+    def __init__(self, fn=None):
+        self.value = 0
+        self.fn = fn
+
+    def set(self, value):
+        self.value = value
+
+    def read(self):
+        if self.fn is None:
+            return self.value
+        try:
+            return self.fn()
+        except Exception:
+            return None
+
+
+class MetricsRegistry:
+    """Named metrics with optional labels"""
+
+    def __init__(self, enabled=METRICS_ENABLED):
+        self.enabled = enabled
+        self._metrics = {}  # (name, labels) -> metric
+        self._help = {}
+        self._lock = threading.Lock()
+
+    def counter(self, name, help_text="", labels=None):
+        return self._get(Counter, name, help_text, labels)
+
+    def gauge(self, name, help_text="", labels=None, fn=None):
+        """Register a gauge; ``fn`` replaces any earlier callback for the same series"""
+        gauge = self._get(Gauge, name, help_text, labels)
+        if fn is not None and gauge is not _NULL_METRIC:
+            gauge.fn = fn
+        return gauge
+
+    def _get(self, cls, name, help_text, labels):
+        if not self.enabled:
+            return _NULL_METRIC
+        key = (name, tuple(sorted((labels or {}).items())))
+        with self._lock:
+            metric = self._metrics.get(key)
+            if metric is None:
+                metric = self._metrics[key] = cls()
+                self._help.setdefault(name, (cls.kind, help_text))
+            return metric
+
+    def collect(self):
+        """Snapshot of (name, labels, value) for every series with a value"""
+        with self._lock:
+            items = list(self._metrics.items())
+        samples = []
+        for (name, labels), metric in items:
+            value = metric.read() if isinstance(metric, Gauge) else metric.value
+            if value is not None:
+                samples.append((name, labels, value))
+        for name, labels, value in _process_samples():
+            samples.append((name, labels, value))
+        return samples
+
+    def render_prometheus(self):
+        """Prometheus text exposition format"""
+        lines = []
+        seen = set()
+        for name, labels, value in sorted(self.collect(), key=lambda s: s[0]):
+            if name not in seen:
+                seen.add(name)
+                kind, help_text = self._help.get(name, _PROCESS_HELP.get(name, ("gauge", "")))
+                if help_text:
+                    lines.append(f"# HELP {name} {help_text}")
+                lines.append(f"# TYPE {name} {kind}")
+            label_text = ",".join(f'{k}="{_escape(v)}"' for k, v in labels)
+            series = f"{name}{{{label_text}}}" if label_text else name
+            lines.append(f"{series} {_format_value(value)}")
+        return "\n".join(lines) + "\n"
+
+    def summary_line(self):
+        """Compact one-line summary for the session log"""
+        parts = []
+        for name, labels, value in self.collect():
+            if name == "thread_cpu_seconds_total":
+                continue  # One entry per thread is too noisy for the log
+            label_text = ",".join(str(v) for _, v in labels)
+            key = f"{name}[{label_text}]" if label_text else name
+            parts.append(f"{key}={_format_value(value)}")
+        return " ".join(parts)
+
+
+_PROCESS_HELP = {
+    "process_cpu_seconds_total": ("counter", "User and system CPU time of the process"),
+    "process_resident_memory_bytes": ("gauge", "Resident set size"),
+    "thread_cpu_seconds_total": ("counter", "User and system CPU time per thread"),
+}
+
+
+def _process_samples():
+    """CPU, RSS and per-thread CPU of this process"""
+    names = {t.native_id: t.name for t in threading.enumerate()}
+    try:
+        import psutil
+    except ImportError:
+        psutil = None
+
+    samples = []
+    if psutil is not None:
+        process = psutil.Process()
+        cpu = process.cpu_times()
+        samples.append(("process_cpu_seconds_total", (), cpu.user + cpu.system))
+        samples.append(("process_resident_memory_bytes", (), process.memory_info().rss))
+        for thread in process.threads():
+            name = names.get(thread.id, str(thread.id))
+            samples.append(
+                ("thread_cpu_seconds_total", (("thread", name),), thread.user_time + thread.system_time)
+            )
+        return samples
+
+    if not os.path.exists("/proc/self/stat"):
+        return samples
+    ticks = os.sysconf("SC_CLK_TCK")
+    page_size = os.sysconf("SC_PAGE_SIZE")
+    samples.append(("process_cpu_seconds_total", (), _proc_cpu("/proc/self/stat", ticks)))
+    with open("/proc/self/statm") as f:
+        samples.append(("process_resident_memory_bytes", (), int(f.read().split()[1]) * page_size))
+    for tid in os.listdir("/proc/self/task"):
+        try:
+            seconds = _proc_cpu(f"/proc/self/task/{tid}/stat", ticks)
+        except OSError:
+            continue  # Thread exited while listing
+        name = names.get(int(tid), tid)
+        samples.append(("thread_cpu_seconds_total", (("thread", name),), seconds))
+    return samples
+
+
+def _proc_cpu(path, ticks):
+    with open(path) as f:
+        # The command name may contain spaces; fields resume after its ")"
+        fields = f.read().rsplit(")", 1)[1].split()
+    return (int(fields[11]) + int(fields[12])) / ticks
+
+
+def _format_value(value):
+    if isinstance(value, float):
+        return f"{value:.3f}".rstrip("0").rstrip(".")
+    return str(value)
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+class MetricsServer:
+    """Serves the registry in Prometheus format on a background thread"""
+
+    def __init__(self, registry, port=METRICS_PORT, host="127.0.0.1"):
+        self.registry = registry
+        self.host = host
+        self.port = port
+        self._server = None
+        self._thread = None
+
+    def start(self):
+        registry = self.registry
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split("?")[0] != "/metrics":
+                    self.send_error(404)
+                    return
+                body = registry.render_prometheus().encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass  # Scrapes would flood the session log
+
+        try:
+            self._server = ThreadingHTTPServer((self.host, self.port), Handler)
+        except OSError as e:
+            logging.error(f"Failed to start metrics endpoint on port {self.port}: {e}")
+            return False
+        self.port = self._server.server_address[1]
+        self._thread = threading.Thread(
+            target=self._server.serve_forever, name="MetricsServer", daemon=True
+        )
+        self._thread.start()
+        logging.info(f"Metrics endpoint at http://{self.host}:{self.port}/metrics")
+        return True
+
+    def stop(self):
+        if self._server:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+
+
+class MetricsLogger:
+    """Writes a metrics summary line to the log at a fixed interval"""
+
+    def __init__(self, registry, interval=METRICS_LOG_INTERVAL):
+        self.registry = registry
+        self.interval = interval
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="MetricsLogger", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """Stop reporting, logging one final line"""
+        if not self._thread:
+            return
+        self._stop.set()
+        self._thread.join(timeout=2)
+        self._thread = None
+        self.log_once()
+
+    def log_once(self):
+        try:
+            logging.info(f"Metrics: {self.registry.summary_line()}")
+        except Exception as e:
+            logging.error(f"Failed to collect metrics: {e}")
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self.log_once()
+
+
+registry = MetricsRegistry()